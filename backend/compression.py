@@ -0,0 +1,249 @@
+"""
+Compressió de les respostes (gzip / brotli)
+===========================================
+
+Middleware ASGI que comprimeix les respostes JSON, NDJSON i de text segons
+l'`Accept-Encoding` del client: brotli si el client l'accepta i el mòdul
+`brotli` està instal·lat (pip install brotli), si no gzip.
+
+- Les respostes més petites que `minimum_size` s'envien sense comprimir
+  (la capçalera gzip i la feina no hi surten a compte).
+- Les respostes senceres (un sol missatge) es comprimeixen d'un cop i el
+  resultat es guarda en una memòria cau LRU indexada pel hash del cos:
+  el llistat de la Pokédex, els moviments d'un Pokémon... són idèntics
+  entre peticions mentre les dades no canvien, i no es tornen a comprimir.
+- Les respostes en streaming (NDJSON, exportacions) es comprimeixen tros a
+  tros amb un flush després de cada tros, de manera que el client les pot
+  continuar processant a mesura que arriben.
+
+Configuració (variables d'entorn):
+    POKEBUILDER_COMPRESSION_MIN_SIZE   Mida mínima en bytes (per defecte 1024)
+    POKEBUILDER_GZIP_LEVEL             Nivell de gzip, 1-9 (per defecte 6)
+    POKEBUILDER_BROTLI_QUALITY         Qualitat de brotli, 0-11 (per defecte 5)
+    POKEBUILDER_COMPRESSION_CACHE_MB   Mida de la memòria cau (per defecte 32, 0 = sense)
+"""
+import gzip
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MINIMUM_SIZE = int(os.environ.get("POKEBUILDER_COMPRESSION_MIN_SIZE", "1024"))
+DEFAULT_GZIP_LEVEL = int(os.environ.get("POKEBUILDER_GZIP_LEVEL", "6"))
+DEFAULT_BROTLI_QUALITY = int(os.environ.get("POKEBUILDER_BROTLI_QUALITY", "5"))
+DEFAULT_CACHE_BYTES = int(float(os.environ.get("POKEBUILDER_COMPRESSION_CACHE_MB", "32")) * 1024 * 1024)
+
+# Tipus de contingut que val la pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Codificació que fem servir per a un Accept-Encoding: "br", "gzip" o
+    None. Es respecten els q=0 ("gzip;q=0") i el comodí "*".
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class CompressedCache:
+    """Memòria cau LRU de cossos comprimits, limitada pel total de bytes guardats."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value: bytes):
+        if len(value) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def info(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressió negociada.
+
+    Ús:
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    """
+
+    def __init__(
+            self,
+            app,
+            minimum_size: int = DEFAULT_MINIMUM_SIZE,
+            gzip_level: int = DEFAULT_GZIP_LEVEL,
+            brotli_quality: int = DEFAULT_BROTLI_QUALITY,
+            cache_bytes: int = DEFAULT_CACHE_BYTES
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedCache(cache_bytes) if cache_bytes > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        """Comprimeix un cos sencer (o el recupera de la memòria cau)."""
+        key = None
+        if self.cache is not None:
+            key = (encoding, len(body), hashlib.blake2b(body, digest_size=16).digest())
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            # mtime=0: la mateixa entrada dona sempre els mateixos bytes
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+    def stream_compressor(self, encoding: str):
+        """Compressor incremental per a les respostes en streaming."""
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _CompressionResponder:
+    """Intercepta els missatges d'una resposta i els envia comprimits si cal."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message = None
+        self.passthrough = False
+        self.stream = None
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # S'espera al primer tros del cos per decidir si es comprimeix
+            self.start_message = message
+            return
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            data = self.stream.chunk(body) if more_body else self.stream.chunk(body) + self.stream.finish()
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        content_type = headers.get("content-type", "")
+        if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+            self.passthrough = True
+        elif not more_body and len(body) < self.middleware.minimum_size:
+            self.passthrough = True
+
+        if self.passthrough:
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        if not more_body:
+            compressed = self.middleware.compress(self.encoding, body)
+            headers["Content-Length"] = str(len(compressed))
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        # Streaming: la mida final no es coneix
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        self.stream = self.middleware.stream_compressor(self.encoding)
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": self.stream.chunk(body), "more_body": True})
@@ -0,0 +1,45 @@
+"""
+Serialització JSON ràpida de les respostes
+==========================================
+
+Totes les respostes del backend passen per `FastJSONResponse` (la classe de
+resposta per defecte de l'app). Si `orjson` està instal·lat, el JSON es
+genera amb orjson (molt més ràpid que el mòdul `json`); si no, es fa servir
+`json` amb la mateixa configuració que la JSONResponse de Starlette, de
+manera que el backend funciona igual sense la dependència:
+
+    pip install orjson
+
+`dumps()` és la mateixa serialització per a qui necessita els bytes
+directament (fragments en memòria cau, línies NDJSON...).
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Serialitza a JSON compacte en UTF-8 (orjson si està disponible)."""
+    if orjson is not None:
+        # Claus no textuals (IDs numèrics) com fa el mòdul json
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serialitza amb dumps() (orjson o json)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
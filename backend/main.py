@@ -1,9 +1,10 @@
 
 
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, ValidationError
 from typing import List, Optional, Dict
 from elasticsearch import Elasticsearch
 # Assegura't d'haver instal·lat la versió correcta! ("pip install 'elasticsearch<9.0.0'")
@@ -11,12 +12,28 @@ from elasticsearch.exceptions import ConnectionError as ESConnectionError
 import sys
 import os
 import time
+import base64
+import codecs
+import json
+import uuid
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 # --- IMPORTS DE SEGURETAT ---
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from starlette import status
+from starlette.concurrency import run_in_threadpool
+
+# Mòduls compartits amb els scripts d'ingesta (common/ a l'arrel del repositori)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from common.name_index import get_name_index
+from common.stats import normalize_evs
+from common.team_validator import get_team_validator
+from showdown_format import ShowdownParser, format_showdown_team
+from fast_json import FastJSONResponse, dumps
+from compression import CompressionMiddleware
 
 # Afegir el directori 'ia' al path per importar els mòduls
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ia'))
@@ -27,6 +44,14 @@ except ImportError as e:
     print(f"⚠️ No s'ha pogut carregar el servei d'IA: {e}")
     AI_ENABLED = False
 
+# Llistes de prohibits per format, compilades en memòria (no depenen del servei d'IA)
+try:
+    from format_rules import FormatRegistry
+    format_registry = FormatRegistry.load()
+except (ImportError, OSError, ValueError) as e:
+    print(f"⚠️ No s'han pogut carregar les llistes de prohibits: {e}")
+    format_registry = None
+
 # --- CONFIGURACIÓ DE SEGURETAT ---
 SECRET_KEY = "clau_super_secreta_del_pokebuilder_canviar_en_produccio"
 ALGORITHM = "HS256"
@@ -36,7 +61,8 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 # Creem una instància de l'aplicació
-app = FastAPI()
+# Totes les respostes es serialitzen amb orjson si està instal·lat (fast_json.py)
+app = FastAPI(default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +71,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compressió gzip/brotli negociada de les respostes grans (configuració a compression.py)
+app.add_middleware(CompressionMiddleware)
 # Inicialitzar servei d'IA
 ai_service = None
 if AI_ENABLED:
@@ -56,6 +84,13 @@ if AI_ENABLED:
         AI_ENABLED = False
 
 
+@app.on_event("shutdown")
+def shutdown_ai_service():
+    # Atura els pools de processos del servei d'IA i allibera la memòria compartida
+    if ai_service is not None:
+        ai_service.close()
+
+
 # --- MODELS DE PYDANTIC (Inputs) ---
 
 class UserRegister(BaseModel):
@@ -78,6 +113,7 @@ class Token(BaseModel):
     # Model per als membres de l'equip (Pokémon individuals)
 class TeamMember(BaseModel):
     base_pokemon: str
+    pokedex_id: Optional[int] = None # Es resol a partir de base_pokemon si no s'envia
     nickname: Optional[str] = None
     item: Optional[str] = None
     ability: Optional[str] = None
@@ -115,6 +151,228 @@ STAT_MAPPING = {
     "special_defense": "special_defense"
 }
 
+# Camps del Pokémon que calen per pintar-lo (sense abilities ni moves_pool).
+# 'display_name' i 'sprite_url' es calculen a la ingesta (ingesta_pokemon.py).
+POKEMON_SUMMARY_FIELDS = ["pokedex_id", "name", "display_name", "sprite_url", "types", "stats", "is_banned"]
+
+# Fragments JSON dels resums (LRU): (content_hash, is_banned) → bytes
+POKEMON_FRAGMENT_CACHE_SIZE = 4096
+_pokemon_fragments: "OrderedDict[tuple, bytes]" = OrderedDict()
+_pokemon_fragments_lock = threading.Lock()
+
+
+def format_pokemon_summary(pokemon: dict) -> dict:
+    """
+    Format resumit d'un Pokémon (el mateix que retorna /pokemon/search).
+    Els documents antics, sense els camps de visualització precalculats,
+    els calculen aquí.
+    """
+    return {
+        "pokedex_id": pokemon.get("pokedex_id"),
+        "name": pokemon.get("display_name") or pokemon.get("name", "N/A").capitalize(),
+        "types": pokemon.get("types"),
+        "sprite_url": pokemon.get("sprite_url") or f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon.get('pokedex_id')}.png",
+        "stats": pokemon.get("stats"),
+        "is_banned": pokemon.get("is_banned", False) # Retornem l'estat per si el frontend vol posar una icona 🚫
+    }
+
+
+def pokemon_summary_fragment(hit: dict) -> bytes:
+    """
+    Resum d'un Pokémon ja serialitzat en JSON, a partir d'un hit d'una
+    cerca que inclou el camp 'content_hash'. El fragment es guarda en
+    memòria per al contingut del document: el content_hash l'escriu la
+    ingesta (bulk_writer.py) i només canvia si canvien les dades, sigui quin
+    sigui l'índex on es van escriure; 'is_banned' l'escriu
+    marcar_pokemon_prohibits.py sense tocar el hash, i per això també forma
+    part de la clau. Les cerques seguides no tornen a construir ni a
+    serialitzar els mateixos Pokémon.
+    """
+    source = hit['_source']
+    content_hash = source.get("content_hash")
+    if content_hash is None:
+        return dumps(format_pokemon_summary(source))
+
+    key = (content_hash, source.get("is_banned", False))
+    with _pokemon_fragments_lock:
+        fragment = _pokemon_fragments.get(key)
+        if fragment is not None:
+            _pokemon_fragments.move_to_end(key)
+            return fragment
+
+    fragment = dumps(format_pokemon_summary(source))
+    with _pokemon_fragments_lock:
+        _pokemon_fragments[key] = fragment
+        if len(_pokemon_fragments) > POKEMON_FRAGMENT_CACHE_SIZE:
+            _pokemon_fragments.popitem(last=False)
+    return fragment
+
+
+# Resultats per pàgina quan una resposta NDJSON es llegeix d'Elasticsearch per trossos
+STREAM_PAGE_SIZE = 100
+
+
+def ndjson_line(row) -> bytes:
+    """
+    Una fila d'una resposta NDJSON (JSON en una sola línia). Les files que
+    ja són bytes (fragments serialitzats) s'envien tal qual.
+    """
+    return (row if isinstance(row, bytes) else dumps(row)) + b"\n"
+
+
+def ndjson_response(rows) -> StreamingResponse:
+    """
+    Resposta NDJSON (un objecte JSON per línia) que s'envia a mesura que el
+    generador 'rows' produeix files: el client pot començar a pintar-les
+    abans que arribi l'última i el servidor no construeix mai la llista
+    sencera.
+    """
+    return StreamingResponse((ndjson_line(row) for row in rows), media_type="application/x-ndjson")
+
+
+def type_combination_filter(
+        weak_to: Optional[List[str]],
+        resists: Optional[List[str]],
+        immune_to: Optional[List[str]]
+) -> dict:
+    """
+    Filtre d'Elasticsearch amb les combinacions de tipus que són febles,
+    resistents o immunes als tipus indicats (tots alhora). Les combinacions
+    surten de la taula de perfils defensius precalculada pel motor d'IA.
+    """
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Els filtres per debilitat/resistència necessiten el servei d'IA, que no està disponible."
+        )
+
+    profiles = ai_service.engine.type_profiles
+    requested = [t.lower() for t in (weak_to or []) + (resists or []) + (immune_to or [])]
+    unknown = sorted({t for t in requested if t not in profiles.bits})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Tipus desconeguts: {', '.join(unknown)}")
+
+    combos = profiles.combinations_matching(
+        weak_to=profiles.mask(t.lower() for t in weak_to or []),
+        resists=profiles.mask(t.lower() for t in resists or []),
+        immune_to=profiles.mask(t.lower() for t in immune_to or [])
+    )
+    if not combos:
+        return {"terms": {"types": []}}  # Cap combinació: no coincideix cap Pokémon
+
+    should = []
+    for combo in combos:
+        clause = {"bool": {"filter": [{"term": {"types": t}} for t in combo]}}
+        if len(combo) == 1:
+            # Monotipus: que no tingui cap altre tipus
+            clause["bool"]["must_not"] = [{"terms": {"types": [t for t in profiles.type_names if t != combo[0]]}}]
+        should.append(clause)
+    return {"bool": {"should": should, "minimum_should_match": 1}}
+
+
+def get_format_rules(format_name: Optional[str]):
+    """
+    Regles compilades d'un format (nom o àlies, p. ex. "VGC Reg G" o
+    "smogon"); sense nom, les del format principal. 400 si el format és
+    desconegut i 503 si les llistes de prohibits no s'han pogut carregar.
+    """
+    if format_registry is None:
+        raise HTTPException(status_code=503, detail="Les llistes de prohibits no estan disponibles")
+
+    rules = format_registry.resolve(format_name)
+    if rules is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format desconegut: {format_name}. Formats disponibles: {', '.join(format_registry.formats)}"
+        )
+    return rules
+
+
+def team_legality_errors(validator, rules, members: List[dict]) -> List[dict]:
+    """
+    Errors de legalitat d'un equip (membres amb 'pokedex_id' resolt): els
+    del validador (habilitats, moviments, objectes, EVs...) i els de les
+    llistes de prohibits del format. Tot en memòria, sense consultes.
+    """
+    errors = validator.validate_team(members)
+    for index, member in enumerate(members):
+        for error in rules.check_member(member):
+            errors.append({"member": index, **error})
+    return errors
+
+
+def banned_species_filter(format_name: Optional[str]) -> dict:
+    """
+    Filtre d'Elasticsearch que descarta els Pokémon prohibits al format, a
+    partir de les regles compilades (sense dependre de 'is_banned'). Si les
+    llistes no s'han pogut carregar, es fan servir els camps de l'índex.
+    """
+    if format_registry is None:
+        if format_name:
+            return {"bool": {"must_not": {"terms": {"banned_formats": [format_name.lower()]}}}}
+        return {"term": {"is_banned": False}}
+
+    rules = get_format_rules(format_name)
+    return {"bool": {"must_not": {"terms": {"pokedex_id": list(rules.species_ids)}}}}
+
+
+def resolve_member_ids(es_client: Elasticsearch, members: List[dict]):
+    """
+    Omple el 'pokedex_id' dels membres que encara no en tenen (equips antics)
+    a partir del seu 'base_pokemon', amb l'índex de noms en memòria.
+    """
+    pending = [member for member in members if member.get("pokedex_id") is None]
+    if not pending:
+        return
+
+    name_index = get_name_index(es_client)
+    for member in pending:
+        member["pokedex_id"] = name_index.resolve(member.get("base_pokemon"))
+
+
+def resolve_team_ids(es_client: Elasticsearch, team_ids: Optional[List[int]], team_names: Optional[List[str]]) -> List[int]:
+    """
+    Combina els IDs i els noms d'un equip en una sola llista d'IDs de Pokédex.
+    Els noms es resolen amb l'índex de noms; si algun no existeix, retorna 400.
+    """
+    resolved = list(team_ids or [])
+    if team_names:
+        name_index = get_name_index(es_client)
+        unknown = []
+        for name in team_names:
+            pokedex_id = name_index.resolve(name)
+            if pokedex_id is None:
+                unknown.append(name)
+            else:
+                resolved.append(pokedex_id)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Pokémon desconeguts: {', '.join(unknown)}")
+    return resolved
+
+
+def hydrate_team_members(es_client: Elasticsearch, teams: List[dict]):
+    """
+    Afegeix a cada membre dels equips el resum del seu Pokémon ('pokemon').
+    Tots els Pokémon de tots els equips es llegeixen amb una sola consulta.
+    """
+    members = [member for team in teams for member in team.get("team_members", [])]
+    resolve_member_ids(es_client, members)
+
+    ids = sorted({member["pokedex_id"] for member in members if member.get("pokedex_id") is not None})
+    summaries = {}
+    if ids:
+        response = es_client.search(index="pokemon", body={
+            "query": {"terms": {"pokedex_id": ids}},
+            "_source": POKEMON_SUMMARY_FIELDS,
+            "size": len(ids)
+        })
+        for hit in response['hits']['hits']:
+            summaries[hit['_source']['pokedex_id']] = format_pokemon_summary(hit['_source'])
+
+    for member in members:
+        member["pokemon"] = summaries.get(member.get("pokedex_id"))
+
+
 # --- FUNCIONS AUXILIARS DE SEGURETAT ---
 
 def verify_password(plain_password, hashed_password):
@@ -325,6 +583,8 @@ def create_team(
     """
     Desa un nou equip a la base de dades.
     Requereix estar autenticat. El 'user_id' s'agafa automàticament del token.
+    L'equip ha de ser legal al seu format (les mateixes comprovacions que
+    /api/v1/teams/validate); si no, 400 amb la llista d'errors.
     """
     try:
         # Convertim el model a diccionari
@@ -336,10 +596,26 @@ def create_team(
         # Injectem l'usuari (Seguretat: sempre el del token)
         team_doc["user_id"] = current_user["username"]
 
+        # Guardem el pokedex_id de cada membre perquè ningú hagi de tornar a resoldre el nom
+        resolve_member_ids(es, team_doc["team_members"])
+        # EVs amb les claus de l'índex ('special_attack' del frontend → 'sp_atk')
+        for member in team_doc["team_members"]:
+            member["evs"] = normalize_evs(member.get("evs"))
+
+        # Legalitat de l'equip (habilitats, moviments, objectes... i prohibits del format): en memòria.
+        # Un format desconegut és un 400
+        rules = get_format_rules(team_doc["format"])
+        errors = team_legality_errors(get_team_validator(es), rules, team_doc["team_members"])
+        if errors:
+            raise HTTPException(status_code=400, detail={"message": "L'equip no és legal", "errors": errors})
+
         # --- BLOC DE DATES CORREGIT ---
         now_iso = datetime.now().isoformat()
         team_doc["updated_at"] = now_iso # Sempre actualitzem la data de modificació
 
+        # ID estable de l'equip (també es guarda al document per desempatar l'ordenació)
+        team_doc["team_id"] = target_id or uuid.uuid4().hex
+
         if target_id:
             # CAS ACTUALITZAR: Recuperem la data original per no perdre-la
             try:
@@ -355,8 +631,8 @@ def create_team(
         # ------------------------------
 
         # GUARDAR A ELASTICSEARCH
-        # Si passem 'id', Elasticsearch sobreescriu (Update). Si és None, crea nou.
-        response = es.index(index="teams", id=target_id, document=team_doc)
+        # Si l'ID ja existeix, Elasticsearch sobreescriu (Update). Si no, crea nou.
+        response = es.index(index="teams", id=team_doc["team_id"], document=team_doc)
 
         return {
             "success": True,
@@ -365,6 +641,8 @@ def create_team(
             "team_name": team_doc["team_name"]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error guardant equip: {e}")
         raise HTTPException(status_code=500, detail=f"Error guardant l'equip: {str(e)}")
@@ -396,11 +674,295 @@ def delete_team(
         raise HTTPException(status_code=404, detail="Equip no trobat o error esborrant.")
 
 
+# Endpoint: Validar un equip contra les regles del seu format
+@app.post("/api/v1/teams/validate")
+def validate_team(team_data: TeamCreate, es: Elasticsearch = Depends(get_es_client)):
+    """
+    Comprova si un equip és legal: que cada membre pugui tenir la seva
+    habilitat i aprendre els seus moviments, que l'objecte, la natura i els
+    EVs siguin vàlids (team_validator.py) i que res no estigui prohibit al
+    format de l'equip ("VGC Reg G", "OU"...). Les dades i les regles estan
+    en memòria, de manera que no cal cap consulta més enllà de resoldre els
+    noms.
+
+    Returns:
+        'valid' i la llista d'errors (membre, camp, valor i motiu)
+    """
+    rules = get_format_rules(team_data.format)
+
+    members = [member.dict() for member in team_data.team_members]
+    resolve_member_ids(es, members)
+
+    errors = team_legality_errors(get_team_validator(es), rules, members)
+
+    return {
+        "success": True,
+        "valid": not errors,
+        **rules.info(),
+        "errors": errors
+    }
+
+
+# --- IMPORTACIÓ I EXPORTACIÓ MASSIVES D'EQUIPS ---
+
+# Equips per petició bulk a Elasticsearch (importació) i per pàgina (exportació)
+IMPORT_BATCH_SIZE = 200
+EXPORT_PAGE_SIZE = 200
+
+# Camps dels equips exportats en JSON lines (els que entén la importació, més l'ID i les dates)
+EXPORT_FIELDS = ["team_id", "team_name", "description", "format", "team_members", "created_at", "updated_at"]
+
+
+class TeamImport:
+    """
+    Equips d'una importació massiva: cada equip es valida en memòria (índex
+    de noms, validador d'equips i prohibits del seu format) i els vàlids s'escriuen per lots amb
+    l'API bulk d'Elasticsearch.
+    """
+
+    def __init__(self, es_client: Elasticsearch, username: str, name_index, validator):
+        self.es = es_client
+        self.username = username
+        self.name_index = name_index
+        self.validator = validator
+        self.count = 0
+        self.pending = []      # (posició, línia, document)
+        self.imported = []     # team_id dels equips escrits
+        self.rejected = []     # {"team", "line", "team_name", "errors"}
+
+    def add(self, data, line: int):
+        """Valida un equip (diccionari amb els camps de TeamCreate) i l'encua per escriure'l."""
+        position = self.count
+        self.count += 1
+
+        try:
+            team = TeamCreate(**data)
+        except (ValidationError, TypeError) as e:
+            name = data.get("team_name") if isinstance(data, dict) else None
+            self._reject(position, line, name, [_team_error(str(e))])
+            return
+
+        # Sempre es crea un equip nou de l'usuari autenticat (mai se sobreescriu un 'team_id' existent)
+        team_doc = team.dict()
+        team_doc.pop("team_id", None)
+        for member in team_doc["team_members"]:
+            if member.get("pokedex_id") is None:
+                member["pokedex_id"] = self.name_index.resolve(member.get("base_pokemon"))
+            member["evs"] = normalize_evs(member.get("evs"))
+
+        # Cada equip es valida amb les regles del seu format; un format desconegut el rebutja
+        try:
+            rules = get_format_rules(team_doc["format"])
+        except HTTPException as e:
+            self._reject(position, line, team_doc["team_name"], [_team_error(e.detail)])
+            return
+
+        errors = team_legality_errors(self.validator, rules, team_doc["team_members"])
+        if errors:
+            self._reject(position, line, team_doc["team_name"], errors)
+            return
+
+        now_iso = datetime.now().isoformat()
+        team_doc["user_id"] = self.username
+        team_doc["team_id"] = uuid.uuid4().hex
+        team_doc["created_at"] = now_iso
+        team_doc["updated_at"] = now_iso
+        self.pending.append((position, line, team_doc))
+
+    def flush(self):
+        """Escriu els equips encuats amb una sola petició bulk."""
+        if not self.pending:
+            return
+
+        operations = []
+        for _, _, team_doc in self.pending:
+            operations.append({"index": {"_index": "teams", "_id": team_doc["team_id"]}})
+            operations.append(team_doc)
+
+        response = self.es.bulk(operations=operations)
+        for (position, line, team_doc), item in zip(self.pending, response["items"]):
+            error = item["index"].get("error")
+            if error:
+                reason = error.get("reason", str(error)) if isinstance(error, dict) else str(error)
+                self._reject(position, line, team_doc["team_name"], [_team_error(reason)])
+            else:
+                self.imported.append(team_doc["team_id"])
+        self.pending = []
+
+    def add_invalid(self, line: int, reason: str):
+        """Compta com a rebutjat un equip que no s'ha pogut llegir."""
+        self._reject(self.count, line, None, [_team_error(reason)])
+        self.count += 1
+
+    def _reject(self, position: int, line: int, team_name: Optional[str], errors: List[dict]):
+        self.rejected.append({"team": position, "line": line, "team_name": team_name, "errors": errors})
+
+
+def _team_error(reason: str) -> dict:
+    """Error de l'equip sencer, amb el mateix format que els del validador."""
+    return {"member": None, "field": None, "value": None, "reason": reason}
+
+
+async def iter_body_lines(request: Request):
+    """Línies del cos de la petició a mesura que arriben (sense llegir-lo sencer)."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+def iter_user_teams(es_client: Elasticsearch, user_id: str, source_fields: Optional[List[str]] = None,
+                    search_after: Optional[list] = None, page_size: int = EXPORT_PAGE_SIZE):
+    """
+    Pàgines d'equips d'un usuari (llistes de hits), en l'ordre de
+    TEAMS_SORT, llegides d'una en una amb search_after. Si la cerca falla
+    (p. ex. l'índex no existeix), s'atura sense error.
+    """
+    while True:
+        query = {
+            "query": {"term": {"user_id": user_id}},
+            "sort": TEAMS_SORT,
+            "size": page_size
+        }
+        if source_fields:
+            query["_source"] = source_fields
+        if search_after:
+            query["search_after"] = search_after
+        try:
+            response = es_client.search(index="teams", body=query)
+        except Exception as e:
+            print(f"Error llegint equips: {e}")
+            return
+
+        hits = response['hits']['hits']
+        if hits:
+            yield hits
+        if len(hits) < page_size:
+            return
+        search_after = hits[-1]['sort']
+
+
+# Endpoint: Importació massiva d'equips
+@app.post("/api/v1/teams/import", status_code=201)
+async def import_teams(
+        request: Request,
+        source: str = Query("showdown"), # showdown: paste de Showdown | jsonl: un equip JSON per línia
+        default_format: Optional[str] = Query(None), # Format dels equips que no l'indiquen
+        current_user: dict = Depends(get_current_user),
+        es: Elasticsearch = Depends(get_es_client)
+):
+    """
+    Importa molts equips d'un sol cop per a l'usuari autenticat. El cos és
+    text: un paste de Showdown amb diversos equips (capçaleres
+    `=== [format] nom ===`) o JSON lines amb un equip per línia (els camps
+    de POST /api/v1/teams, o el que genera /teams/export?fmt=jsonl).
+
+    El cos es llegeix i es processa a mesura que arriba: cada equip es
+    resol i es valida en memòria i els vàlids s'escriuen per lots de
+    IMPORT_BATCH_SIZE amb l'API bulk. Els equips amb errors no s'importen
+    i es retornen a 'rejected' amb la seva posició, la línia on comencen i
+    els errors.
+    """
+    if source not in ["showdown", "jsonl"]:
+        raise HTTPException(status_code=400, detail="L'origen ha de ser 'showdown' o 'jsonl'")
+
+    try:
+        name_index = await run_in_threadpool(get_name_index, es)
+        validator = await run_in_threadpool(get_team_validator, es)
+        importer = TeamImport(es, current_user["username"], name_index, validator)
+        parser = ShowdownParser(default_format) if source == "showdown" else None
+
+        line_number = 0
+        async for line in iter_body_lines(request):
+            line_number += 1
+            if parser is not None:
+                for team in parser.feed(line):
+                    importer.add(team, team.pop("line"))
+            elif line.strip():
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    importer.add_invalid(line_number, f"JSON invàlid: {e}")
+                    continue
+                if isinstance(data, dict) and default_format and not data.get("format"):
+                    data["format"] = default_format
+                importer.add(data, line_number)
+
+            if len(importer.pending) >= IMPORT_BATCH_SIZE:
+                await run_in_threadpool(importer.flush)
+
+        if parser is not None:
+            for team in parser.close():
+                importer.add(team, team.pop("line"))
+        await run_in_threadpool(importer.flush)
+
+        if importer.imported:
+            await run_in_threadpool(es.indices.refresh, index="teams")
+
+        return {
+            "success": True,
+            "total": importer.count,
+            "imported": len(importer.imported),
+            "team_ids": importer.imported,
+            "rejected": sorted(importer.rejected, key=lambda entry: entry["team"])
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error important equips: {e}")
+        raise HTTPException(status_code=500, detail=f"Error important els equips: {str(e)}")
+
+
+# Endpoint: Exportació de tots els equips de l'usuari
+@app.get("/api/v1/teams/export")
+def export_teams(
+        fmt: str = Query("showdown"), # showdown: paste de Showdown | jsonl: un equip JSON per línia
+        current_user: dict = Depends(get_current_user),
+        es: Elasticsearch = Depends(get_es_client)
+):
+    """
+    Exporta tota la biblioteca d'equips de l'usuari autenticat. La resposta
+    s'envia a trossos: els equips es llegeixen per pàgines (search_after,
+    en el mateix ordre que el llistat) i cada equip s'escriu tan bon punt
+    es llegeix, sense tenir mai la biblioteca sencera en memòria.
+    """
+    if fmt not in ["showdown", "jsonl"]:
+        raise HTTPException(status_code=400, detail="El format ha de ser 'showdown' o 'jsonl'")
+
+    def generate():
+        for page in iter_user_teams(es, current_user["username"]):
+            for hit in page:
+                team = hit['_source']
+                if fmt == "showdown":
+                    yield format_showdown_team(team).encode("utf-8")
+                else:
+                    team.setdefault("team_id", hit['_id'])
+                    yield ndjson_line({field: team[field] for field in EXPORT_FIELDS if field in team})
+
+    extension, media_type = ("txt", "text/plain; charset=utf-8") if fmt == "showdown" \
+        else ("jsonl", "application/x-ndjson")
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="pokebuilder_teams.{extension}"'}
+    )
+
+
     # --- ENDPOINT D'ANÀLISI DE VULNERABILITAT (IA) ---
 @app.get("/api/v1/teams/vulnerability")
 def get_team_vulnerability(
-        team_ids: List[int] = Query(..., description="Llista d'IDs de Pokédex dels 6 Pokémon de l'equip."),
-        current_user: dict = Depends(get_current_user) # Protecció de la ruta
+        team_ids: List[int] = Query(None, description="Llista d'IDs de Pokédex dels 6 Pokémon de l'equip."),
+        team_names: List[str] = Query(None, description="Alternativa a team_ids: noms dels Pokémon de l'equip."),
+        current_user: dict = Depends(get_current_user), # Protecció de la ruta
+        es_client: Elasticsearch = Depends(get_es_client)
 ):
     """
     Analitza un equip de 6 Pokémon i retorna el tipus elemental al qual l'equip
@@ -409,6 +971,7 @@ def get_team_vulnerability(
     if not AI_ENABLED or ai_service is None:
         raise HTTPException(status_code=503, detail="El servei d'Intel·ligència Artificial no està disponible.")
 
+    team_ids = resolve_team_ids(es_client, team_ids, team_names)
     if len(team_ids) != 6:
         raise HTTPException(status_code=400, detail="L'equip ha de tenir exactament 6 Pokémon.")
 
@@ -428,6 +991,11 @@ def search_pokemon(
         order: str = "desc",    # Opcional: direcció (asc/desc)
         types: List[str] = Query(None), # Opcional: Llista de tipus
 
+        # --- Filtres de perfil defensiu (han de complir-se tots) ---
+        weak_to: List[str] = Query(None),   # Febles a aquests tipus (x2 o x4)
+        resists: List[str] = Query(None),   # Resisteixen aquests tipus (x0.5 o x0.25)
+        immune_to: List[str] = Query(None), # Immunes a aquests tipus
+
         # --- Filtres d'Estadístiques (Min/Max) ---
         hp_min: int = None, hp_max: int = None,
         attack_min: int = None, attack_max: int = None,
@@ -438,10 +1006,12 @@ def search_pokemon(
 
         # --- Filtre de Banejats ---
         exclude_banned: bool = Query(False), # Si és True, amaga els banejats
+        format: Optional[str] = Query(None), # Format dels banejats (per defecte, el principal)
 
         # AFEGEIX AIXÒ AL FINAL DELS PARÀMETRES:
         limit: int = Query(50, le=1000), # Per defecte 50, màxim 1000
         offset: int = Query(0, ge=0), # <--- AFEGEIX AQUEST PARÀMETRE NOU
+        stream: bool = Query(False), # Si és True, resposta NDJSON: {"total": N} i després un Pokémon per línia
 
         es_client: Elasticsearch = Depends(get_es_client)
 ):
@@ -449,9 +1019,12 @@ def search_pokemon(
     Endpoint Unificat:
     - Cerca per nom o ID (autocompletar).
     - Filtre per tipus (paràmetre 'types').
+    - Filtre per perfil defensiu (weak_to, resists, immune_to).
     - Filtre per rang d'estadístiques (hp_min, speed_max, etc.).
-    - Filtre per banejats (exclude_banned=True).
+    - Filtre per banejats (exclude_banned=True), del format indicat a 'format'.
     - Ordenació per stats, id o nom (paràmetre 'stat').
+    - stream=True: resposta NDJSON llegida d'Elasticsearch per pàgines
+      (primer {"total": N} i després un Pokémon per línia).
     """
 
     # Construïm una consulta "bool" que permet combinar condicions
@@ -499,7 +1072,9 @@ def search_pokemon(
             speed_min, speed_max
         ])
 
-        if not types and not has_stats_filters and not exclude_banned:
+        has_defense_filters = any([weak_to, resists, immune_to])
+
+        if not types and not has_stats_filters and not exclude_banned and not has_defense_filters:
             must_clauses.append({"match_all": {}})
 
     # 2. Filtre per Tipus (si n'hi ha) -> Va al 'filter'
@@ -511,13 +1086,13 @@ def search_pokemon(
             }
         })
 
-    # 3. Filtre per Banejats (NOU) -> Va al 'filter'
+    # 2b. Filtre per perfil defensiu (combinacions de tipus precalculades)
+    if weak_to or resists or immune_to:
+        filter_clauses.append(type_combination_filter(weak_to, resists, immune_to))
+
+    # 3. Filtre per Banejats -> Va al 'filter' (regles compilades del format)
     if exclude_banned:
-        filter_clauses.append({
-            "term": {
-                "is_banned": False  # Només volem els que NO estan banejats
-            }
-        })
+        filter_clauses.append(banned_species_filter(format))
 
     # 4. Filtres per Rang d'Estadístiques -> Va al 'filter'
     # Creem una llista amb la configuració de cada filtre
@@ -588,28 +1163,56 @@ def search_pokemon(
         "from": offset  # <--- AFEGEIX AIXÒ AQUÍ (Elasticsearch fa servir "from")
     }
 
+    # Només els camps del resum (sense abilities ni moves_pool, que són el gruix del document),
+    # i el hash del contingut per reaprofitar-ne el fragment JSON
+    query["_source"] = POKEMON_SUMMARY_FIELDS + ["content_hash"]
+
+    if stream:
+        return ndjson_response(stream_pokemon_search(es_client, query))
+
     # 7. Executar i Retornar
     response = es_client.search(index="pokemon", body=query)
 
     # AFEGEIX AIXÒ: Obtenir el número total real de coincidències
     total_hits = response['hits']['total']['value']
 
-    results = []
-    for hit in response['hits']['hits']:
-        pokemon = hit['_source']
-        results.append({
-            "pokedex_id": pokemon.get("pokedex_id"),
-            "name": pokemon.get("name", "N/A").capitalize(),
-            "types": pokemon.get("types"),
-            "sprite_url": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon.get('pokedex_id')}.png",
-            "stats": pokemon.get("stats"),
-            "is_banned": pokemon.get("is_banned", False) # Retornem l'estat per si el frontend vol posar una icona 🚫
-        })
-    # CANVIA EL RETURN PER AQUEST OBJECTE:
-    return {
-        "total": total_hits,
-        "results": results
-    }
+    # Resposta {"total": N, "results": [...]} muntada amb els fragments JSON de cada Pokémon
+    results = b",".join(pokemon_summary_fragment(hit) for hit in response['hits']['hits'])
+    return Response(
+        content=b'{"total":' + str(total_hits).encode() + b',"results":[' + results + b']}',
+        media_type="application/json"
+    )
+
+def stream_pokemon_search(es_client: Elasticsearch, query: dict):
+    """
+    Files de la resposta NDJSON de /pokemon/search: {"total": N} i els
+    Pokémon, llegits en pàgines de STREAM_PAGE_SIZE (la primera amb 'from'
+    i la resta amb search_after) fins a arribar a 'size'.
+    """
+    remaining = query["size"]
+    page = dict(query, size=min(STREAM_PAGE_SIZE, remaining))
+    # Desempat estable per poder continuar amb search_after
+    if not any("pokedex_id" in criterion for criterion in page["sort"]):
+        page["sort"] = page["sort"] + [{"pokedex_id": {"order": "asc"}}]
+
+    first = True
+    while remaining > 0:
+        response = es_client.search(index="pokemon", body=page)
+        if first:
+            yield {"total": response['hits']['total']['value']}
+            first = False
+
+        hits = response['hits']['hits']
+        for hit in hits:
+            yield pokemon_summary_fragment(hit)
+
+        remaining -= len(hits)
+        if len(hits) < page["size"] or remaining <= 0:
+            return
+        page.pop("from", None)
+        page["search_after"] = hits[-1]['sort']
+        page["size"] = min(STREAM_PAGE_SIZE, remaining)
+
 
 # Endpoint: Cercador d'Habilitats
 @app.get("/api/v1/pokemon/{pokedex_id}/abilities")
@@ -660,20 +1263,23 @@ def get_pokemon_abilities(
 def get_pokemon_moves(
         pokedex_id: int,
         q: Optional[str] = None,
+        stream: bool = Query(False), # Si és True, resposta NDJSON (un moviment per línia)
         es_client: Elasticsearch = Depends(get_es_client)
 ):
     """
     Retorna la llista de moviments (moves_pool) d'un Pokémon específic.
     Si s'envia 'q', filtra els moviments que continguin aquest text al nom.
+    Amb stream=True, els moviments s'envien en NDJSON a mesura que es filtren.
     """
 
-    # 1. Primer busquem el Pokémon a Elasticsearch pel seu ID
+    # 1. Primer busquem el Pokémon a Elasticsearch pel seu ID (només els moviments)
     query = {
         "query": {
             "term": {
                 "pokedex_id": pokedex_id
             }
-        }
+        },
+        "_source": ["moves_pool"]
     }
 
     response = es_client.search(index="pokemon", body=query)
@@ -686,6 +1292,10 @@ def get_pokemon_moves(
     pokemon_data = response['hits']['hits'][0]['_source']
     moves_pool = pokemon_data.get("moves_pool", [])
 
+    if stream:
+        q_lower = q.lower() if q else None
+        return ndjson_response(move for move in moves_pool if not q_lower or q_lower in move['name'].lower())
+
     # 3. Si hi ha un terme de cerca 'q', filtrem la llista amb Python
     if q:
         q = q.lower()
@@ -734,34 +1344,172 @@ def search_items_by_name(q: str, es_client: Elasticsearch = Depends(get_es_clien
 
     return results
 
+# Camps de la vista resumida d'un equip (per a llistats: sense moviments, EVs...)
+TEAM_SUMMARY_FIELDS = ["team_id", "team_name", "format", "created_at", "updated_at",
+                      "team_members.pokedex_id", "team_members.base_pokemon"]
+
+# Ordre dels llistats d'equips: primer els modificats més recentment.
+# 'team_id' desempata equips amb la mateixa data perquè el cursor sigui estable.
+# Ha de ser keyword: els índexs antics es migren amb scripts_bd/migrar_teams.py
+# (mapping i team_id dels equips que no en tenen).
+TEAMS_SORT = [
+    {"updated_at": {"order": "desc", "unmapped_type": "date"}},
+    {"team_id": {"order": "desc", "unmapped_type": "keyword"}}
+]
+
+
+def encode_cursor(sort_values: list) -> str:
+    """Converteix els valors d'ordenació de l'últim resultat en un cursor opac."""
+    return base64.urlsafe_b64encode(json.dumps(sort_values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Inversa d'encode_cursor. Retorna 400 si el cursor no és vàlid."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(TEAMS_SORT):
+        raise HTTPException(status_code=400, detail="Cursor de paginació invàlid")
+    return values
+
+
+def format_team_summary(team_id: str, team: dict) -> dict:
+    """Vista resumida d'un equip: nom, format, dates i IDs dels membres."""
+    return {
+        "id": team_id,
+        "team_name": team.get("team_name"),
+        "format": team.get("format"),
+        "created_at": team.get("created_at"),
+        "updated_at": team.get("updated_at"),
+        "member_ids": [member.get("pokedex_id") for member in team.get("team_members", [])]
+    }
+
+
+def format_team_page(es_client: Elasticsearch, hits: list, view: str, hydrate: bool) -> List[dict]:
+    """Equips d'una pàgina de resultats en la vista demanada ('summary' o 'full')."""
+    results = []
+    for hit in hits:
+        team = hit['_source']
+        if view == "summary":
+            # Equips antics sense pokedex_id: es resolen amb l'índex de noms (en memòria)
+            resolve_member_ids(es_client, team.get("team_members", []))
+            results.append(format_team_summary(hit['_id'], team))
+        else:
+            # És molt útil retornar també l'ID del document d'Elastic per poder editar/esborrar l'equip després
+            team['id'] = hit['_id']
+            results.append(team)
+
+    if hydrate and view == "full":
+        hydrate_team_members(es_client, results)
+    return results
+
+
 # Endpoint: Equips d'un Usuari ---
 @app.get("/api/v1/teams/user/{user_id}")
-def get_user_teams(user_id: str, es_client: Elasticsearch = Depends(get_es_client)):
+def get_user_teams(
+        user_id: str,
+        limit: int = Query(20, ge=1, le=100), # Equips per pàgina
+        cursor: Optional[str] = None, # 'next_cursor' de la pàgina anterior
+        view: str = "summary", # summary: només nom, format i IDs | full: documents complets
+        hydrate: bool = Query(False), # Només amb view=full: cada membre porta el resum del seu Pokémon
+        stream: bool = Query(False), # Si és True, tots els equips (des del cursor) en NDJSON
+        es_client: Elasticsearch = Depends(get_es_client)
+):
     """
-    Retorna tots els equips creats per un usuari específic (filtrant per user_id).
+    Retorna els equips d'un usuari, paginats i ordenats per data de
+    modificació (els més recents primer).
+
+    - view=summary (per defecte): només nom, format, dates i 'member_ids'.
+      L'equip complet es demana després amb GET /api/v1/teams/{team_id}.
+    - view=full: documents complets. Amb hydrate=true, cada membre inclou un
+      camp 'pokemon' (sprite, tipus i stats), llegits tots d'una sola vegada.
+
+    La paginació és per cursor: si 'next_cursor' no és null, es passa com a
+    'cursor' per obtenir la pàgina següent.
+
+    Amb stream=true no hi ha pàgines: la resposta és NDJSON amb tots els
+    equips a partir del cursor (un per línia, en la vista demanada), que es
+    llegeixen d'Elasticsearch en pàgines de 'limit' i s'envien a mesura que
+    arriben.
+
+    Accés: ni aquest llistat ni GET /api/v1/teams/{team_id} demanen
+    autenticació. Qualsevol que conegui un 'team_id' (un UUID aleatori) pot
+    llegir l'equip complet, i qualsevol que conegui un 'user_id' pot llistar
+    els seus equips.
     """
+    if view not in ["summary", "full"]:
+        raise HTTPException(status_code=400, detail="La vista ha de ser 'summary' o 'full'")
+
+    if stream:
+        pages = iter_user_teams(
+            es_client, user_id,
+            source_fields=TEAM_SUMMARY_FIELDS if view == "summary" else None,
+            search_after=decode_cursor(cursor) if cursor else None,
+            page_size=limit
+        )
+        return ndjson_response(
+            team for page in pages for team in format_team_page(es_client, page, view, hydrate)
+        )
+
     query = {
         "query": {
             "term": {
                 "user_id": user_id # user_id és keyword, cerca exacta
             }
-        }
+        },
+        "sort": TEAMS_SORT,
+        "size": limit
     }
+    if view == "summary":
+        query["_source"] = TEAM_SUMMARY_FIELDS
+    if cursor:
+        query["search_after"] = decode_cursor(cursor)
 
     try:
         response = es_client.search(index="teams", body=query)
     except Exception:
         # Si l'índex no existeix o falla, retornem llista buida
-        return []
+        return {"total": 0, "results": [], "next_cursor": None}
 
-    results = []
-    for hit in response['hits']['hits']:
-        team = hit['_source']
-        # És molt útil retornar també l'ID del document d'Elastic per poder editar/esborrar l'equip després
-        team['id'] = hit['_id']
-        results.append(team)
+    hits = response['hits']['hits']
+    results = format_team_page(es_client, hits, view, hydrate)
 
-    return results
+    # Si la pàgina és plena, pot haver-n'hi més
+    next_cursor = encode_cursor(hits[-1]['sort']) if len(hits) == limit else None
+
+    return {
+        "total": response['hits']['total']['value'],
+        "results": results,
+        "next_cursor": next_cursor
+    }
+
+# Endpoint: Equip complet ---
+@app.get("/api/v1/teams/{team_id}")
+def get_team(
+        team_id: str,
+        hydrate: bool = Query(False), # Si és True, cada membre porta el resum del seu Pokémon
+        es_client: Elasticsearch = Depends(get_es_client)
+):
+    """
+    Retorna el document complet d'un equip (membres, moviments, EVs...).
+    Pensat per carregar-lo quan l'usuari l'obre des del llistat resumit.
+
+    No demana autenticació: l'equip és visible per a qualsevol que en tingui
+    l'ID (vegeu el llistat d'equips d'un usuari).
+    """
+    try:
+        response = es_client.get(index="teams", id=team_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Equip no trobat")
+
+    team = response['_source']
+    team['id'] = response['_id']
+
+    if hydrate:
+        hydrate_team_members(es_client, [team])
+
+    return team
 
 # Endpoint: Obtenir detalls d'un Pokémon
 @app.get("/api/v1/pokemon/{pokedex_id}")
@@ -785,16 +1533,18 @@ def get_pokemon_details(pokedex_id: int, es_client: Elasticsearch = Depends(get_
 # --- ENDPOINTS D'IA ---
 
 class TeamRequest(BaseModel):
-    """Model per a les peticions d'equip."""
-    team_ids: List[int]
+    """Model per a les peticions d'equip (per IDs, per noms o combinant-los)."""
+    team_ids: List[int] = []
+    team_names: List[str] = []
+    format: Optional[str] = None     # Format les prohibicions del qual s'apliquen (per defecte, el principal)
 
 @app.post("/api/v1/ai/recommend")
-def recommend_pokemon(request: TeamRequest):
+def recommend_pokemon(request: TeamRequest, es_client: Elasticsearch = Depends(get_es_client)):
     """
     Retorna recomanacions de Pokémon basades en l'equip actual.
     
     Args:
-        request: Objecte amb la llista d'IDs de l'equip actual
+        request: Objecte amb la llista d'IDs (o noms) de l'equip actual
         
     Returns:
         Llista de recomanacions amb puntuacions i raonament
@@ -806,7 +1556,7 @@ def recommend_pokemon(request: TeamRequest):
         )
     
     try:
-        team_ids = request.team_ids
+        team_ids = resolve_team_ids(es_client, request.team_ids, request.team_names)
         
         # Validar que no hi hagi més de 5 Pokémon
         if len(team_ids) >= 6:
@@ -815,8 +1565,11 @@ def recommend_pokemon(request: TeamRequest):
                 detail="L'equip ja està complet (6 Pokémon)"
             )
         
+        if format_registry is not None:
+            get_format_rules(request.format)
+
         # Generar recomanacions
-        recommendations = ai_service.recommend_pokemon(team_ids, top_n=5)
+        recommendations = ai_service.recommend_pokemon(team_ids, top_n=5, format_name=request.format)
         
         return {
             "success": True,
@@ -833,12 +1586,12 @@ def recommend_pokemon(request: TeamRequest):
         )
 
 @app.post("/api/v1/ai/analyze")
-def analyze_team(request: TeamRequest):
+def analyze_team(request: TeamRequest, es_client: Elasticsearch = Depends(get_es_client)):
     """
     Analitza un equip i retorna les seves fortaleses i debilitats.
     
     Args:
-        request: Objecte amb la llista d'IDs de l'equip
+        request: Objecte amb la llista d'IDs (o noms) de l'equip
         
     Returns:
         Anàlisi detallat de l'equip
@@ -850,19 +1603,374 @@ def analyze_team(request: TeamRequest):
         )
     
     try:
-        analysis = ai_service.analyze_team(request.team_ids)
+        team_ids = resolve_team_ids(es_client, request.team_ids, request.team_names)
+        analysis = ai_service.analyze_team(team_ids)
         
         return {
             "success": True,
             "analysis": analysis
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error analitzant equip: {str(e)}"
         )
 
+class CompleteTeamRequest(TeamRequest):
+    """Model per completar un equip: membres fixos i paràmetres de la cerca."""
+    top_k: int = 3
+    time_budget: float = 1.0
+
+@app.post("/api/v1/ai/complete")
+def complete_team(request: CompleteTeamRequest, es_client: Elasticsearch = Depends(get_es_client)):
+    """
+    Proposa equips complets de 6 a partir de 0-5 membres fixos.
+
+    Fa una cerca en feix sobre la puntuació del motor de recomanació, amb
+    poda per cota superior i un pressupost de temps (time_budget, en segons).
+
+    Args:
+        request: Membres fixos (IDs i/o noms) i paràmetres de la cerca
+
+    Returns:
+        Els top_k equips, amb l'explicació de cada membre afegit
+    """
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servei d'IA no està disponible"
+        )
+
+    try:
+        team_ids = resolve_team_ids(es_client, request.team_ids, request.team_names)
+
+        if len(team_ids) > 6:
+            raise HTTPException(status_code=400, detail="Un equip no pot tenir més de 6 Pokémon")
+        if not 1 <= request.top_k <= 20:
+            raise HTTPException(status_code=400, detail="top_k ha d'estar entre 1 i 20")
+        if not 0 < request.time_budget <= 10:
+            raise HTTPException(status_code=400, detail="time_budget ha d'estar entre 0 i 10 segons")
+        if format_registry is not None:
+            get_format_rules(request.format)
+
+        result = ai_service.complete_team(
+            team_ids,
+            top_k=request.top_k,
+            time_budget=request.time_budget,
+            format_name=request.format
+        )
+
+        return {
+            "success": True,
+            "team_size": len(team_ids),
+            **result
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error completant l'equip: {str(e)}"
+        )
+
+class BatchTeamsRequest(BaseModel):
+    """Model per a l'anàlisi en lot: una llista d'equips (per IDs i/o noms)."""
+    teams: List[TeamRequest]
+
+# Màxim d'equips per petició en lot
+MAX_BATCH_TEAMS = 5000
+
+@app.post("/api/v1/ai/analyze/batch")
+def analyze_teams_batch(request: BatchTeamsRequest, es_client: Elasticsearch = Depends(get_es_client)):
+    """
+    Analitza molts equips en una sola petició.
+
+    Per a cada equip retorna l'anàlisi (com /ai/analyze) i la vulnerabilitat
+    (com /teams/vulnerability). Els Pokémon repetits entre equips només es
+    llegeixen una vegada i la puntuació es fa en paral·lel.
+
+    Args:
+        request: Objecte amb la llista d'equips
+
+    Returns:
+        Llista de resultats en el mateix ordre que els equips enviats.
+        Un equip amb noms desconeguts porta un camp 'error' en lloc de l'anàlisi.
+    """
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servei d'IA no està disponible"
+        )
+
+    if len(request.teams) > MAX_BATCH_TEAMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Com a màxim es poden analitzar {MAX_BATCH_TEAMS} equips per petició"
+        )
+
+    # Resoldre els noms de tots els equips (índex en memòria, sense consultes)
+    team_ids_list = []
+    errors = {}
+    for index, team in enumerate(request.teams):
+        try:
+            team_ids_list.append(resolve_team_ids(es_client, team.team_ids, team.team_names))
+        except HTTPException as e:
+            errors[index] = e.detail
+            team_ids_list.append([])
+
+    try:
+        scored = ai_service.analyze_teams_batch(team_ids_list)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error analitzant equips: {str(e)}"
+        )
+
+    results = []
+    for index, result in enumerate(scored):
+        if index in errors:
+            results.append({"index": index, "error": errors[index]})
+        else:
+            results.append({"index": index, **result})
+
+    return {
+        "success": True,
+        "total": len(results),
+        "results": results
+    }
+
+class MatchupRequest(TeamRequest):
+    """Model per a amenaces i counters: Pokémon (IDs i/o noms), filtres i top-K."""
+    exclude_ids: List[int] = []      # Llista de prohibits pròpia (IDs)
+    exclude_names: List[str] = []    # Llista de prohibits pròpia (noms)
+    top_k: int = 10
+
+def resolve_matchup_request(request: MatchupRequest, es_client: Elasticsearch):
+    """Valida una petició d'amenaces/counters i en resol els noms. Retorna (IDs, IDs exclosos)."""
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servei d'IA no està disponible"
+        )
+
+    team_ids = resolve_team_ids(es_client, request.team_ids, request.team_names)
+    if not team_ids:
+        raise HTTPException(status_code=400, detail="Cal indicar almenys un Pokémon")
+    if len(team_ids) > 6:
+        raise HTTPException(status_code=400, detail="Un equip no pot tenir més de 6 Pokémon")
+    if not 1 <= request.top_k <= 50:
+        raise HTTPException(status_code=400, detail="top_k ha d'estar entre 1 i 50")
+
+    if format_registry is not None:
+        get_format_rules(request.format)
+
+    exclude_ids = resolve_team_ids(es_client, request.exclude_ids, request.exclude_names)
+    return team_ids, exclude_ids
+
+MATCHUPS_UNAVAILABLE = "La matriu d'enfrontaments no està disponible (cal generar-la amb build_matchup_matrix.py)"
+
+@app.post("/api/v1/ai/threats")
+def find_threats(request: MatchupRequest, es_client: Elasticsearch = Depends(get_es_client)):
+    """
+    Retorna els Pokémon que més amenacen un equip.
+
+    Cada rival es puntua contra tots els membres amb la matriu
+    d'enfrontaments precalculada i s'ordena per la puntuació mitjana.
+    Es descarten els prohibits del format i els de la llista pròpia.
+
+    Args:
+        request: Membres de l'equip, format, llista de prohibits i top_k
+
+    Returns:
+        Les top_k amenaces, amb la puntuació contra cada membre
+    """
+    team_ids, exclude_ids = resolve_matchup_request(request, es_client)
+
+    try:
+        threats = ai_service.find_threats(team_ids, request.format, exclude_ids, request.top_k)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculant les amenaces: {str(e)}"
+        )
+
+    if threats is None:
+        raise HTTPException(status_code=503, detail=MATCHUPS_UNAVAILABLE)
+
+    return {
+        "success": True,
+        "team_ids": team_ids,
+        "format": request.format,
+        "threats": threats
+    }
+
+@app.post("/api/v1/ai/counters")
+def find_counters(request: MatchupRequest, es_client: Elasticsearch = Depends(get_es_client)):
+    """
+    Retorna els millors counters de cada Pokémon indicat (de 1 a 6), amb
+    la matriu d'enfrontaments precalculada i els mateixos filtres que
+    /ai/threats.
+    """
+    pokedex_ids, exclude_ids = resolve_matchup_request(request, es_client)
+
+    try:
+        counters = ai_service.find_counters(pokedex_ids, request.format, exclude_ids, request.top_k)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculant els counters: {str(e)}"
+        )
+
+    if counters is None:
+        raise HTTPException(status_code=503, detail=MATCHUPS_UNAVAILABLE)
+
+    return {
+        "success": True,
+        "format": request.format,
+        "results": counters
+    }
+
+@app.get("/api/v1/ai/matchup/{attacker_id}/{defender_id}")
+def pokemon_matchup(attacker_id: int, defender_id: int):
+    """
+    Retorna la puntuació de l'enfrontament entre dos Pokémon de la matriu
+    d'enfrontaments precalculada (de -1 a 1, positiva si guanya l'atacant).
+    """
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servei d'IA no està disponible"
+        )
+
+    try:
+        result = ai_service.matchup(attacker_id, defender_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error consultant l'enfrontament: {str(e)}"
+        )
+
+    if result is None:
+        raise HTTPException(status_code=503, detail=MATCHUPS_UNAVAILABLE)
+    if result["score"] is None:
+        raise HTTPException(status_code=404, detail="Pokémon no trobat a la matriu d'enfrontaments")
+
+    return {
+        "success": True,
+        **result
+    }
+
+class TeamMatchupRequest(BaseModel):
+    """Model per simular l'enfrontament entre dos equips guardats."""
+    team_id: str
+    opponent_team_id: str
+    rollouts: int = 2000
+    seed: Optional[int] = None   # Mateixa llavor i mateixes partides → mateix resultat
+    tera: bool = False
+
+# Màxim de partides per simulació
+MAX_ROLLOUTS = 50000
+
+def get_team_members(es_client: Elasticsearch, team_id: str) -> List[dict]:
+    """Membres d'un equip guardat, amb el 'pokedex_id' resolt (404 si l'equip no existeix)."""
+    try:
+        response = es_client.get(index="teams", id=team_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail=f"Equip no trobat: {team_id}")
+
+    members = response['_source'].get("team_members", [])
+    resolve_member_ids(es_client, members)
+    return members
+
+@app.post("/api/v1/ai/matchup")
+def simulate_team_matchup(request: TeamMatchupRequest, es_client: Elasticsearch = Depends(get_es_client)):
+    """
+    Estima la probabilitat que un equip guardat guanyi un altre.
+
+    Fa partides simplificades (millor moviment de cada membre, ordre per
+    velocitat, tirades de precisió i de dany a l'atzar) repartides entre un
+    pool de processos. Amb la mateixa llavor el resultat és reproduïble.
+
+    Returns:
+        Probabilitat de victòria amb interval de confiança del 95%,
+        victòries/derrotes/empats i les amenaces clau de l'equip rival
+    """
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servei d'IA no està disponible"
+        )
+
+    if not 1 <= request.rollouts <= MAX_ROLLOUTS:
+        raise HTTPException(status_code=400, detail=f"rollouts ha d'estar entre 1 i {MAX_ROLLOUTS}")
+
+    members = get_team_members(es_client, request.team_id)
+    opponent_members = get_team_members(es_client, request.opponent_team_id)
+
+    try:
+        result = ai_service.simulate_team_matchup(
+            members,
+            opponent_members,
+            rollouts=request.rollouts,
+            seed=request.seed,
+            terastallized=request.tera
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error simulant l'enfrontament: {str(e)}"
+        )
+
+    return {
+        "success": True,
+        "team_id": request.team_id,
+        "opponent_team_id": request.opponent_team_id,
+        **result
+    }
+
+@app.get("/api/v1/ai/damage/{team_id}")
+def team_damage(
+        team_id: str,
+        top_n: int = Query(5, ge=1, le=50), # Objectius a mostrar per membre
+        tera: bool = Query(False), # Si és True, els membres ataquen terastal·litzats
+        es_client: Elasticsearch = Depends(get_es_client)
+):
+    """
+    Calcula el dany real de cada membre d'un equip guardat (EVs, natura,
+    objecte, habilitat, Tera i moviments) contra tot el roster.
+
+    Returns:
+        Per a cada membre: estadístiques finals, KOs d'un i de dos cops i
+        els objectius als quals fa més dany (moviment i rang en % de PS)
+    """
+    if not AI_ENABLED or ai_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servei d'IA no està disponible"
+        )
+
+    members = get_team_members(es_client, team_id)
+
+    try:
+        report = ai_service.team_damage_report(members, top_n=top_n, terastallized=tera)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculant el dany de l'equip: {str(e)}"
+        )
+
+    return {
+        "success": True,
+        "team_id": team_id,
+        **report
+    }
+
 @app.get("/api/v1/ai/status")
 def ai_status():
     """
@@ -0,0 +1,198 @@
+"""
+Format de text de Pokémon Showdown (pastes d'equips)
+====================================================
+
+Conversió entre el format d'exportació de Showdown i els documents de
+l'índex 'teams', per a la importació i l'exportació massives d'equips.
+
+    === [gen9vgc2024regg] Equip de Sol ===
+
+    Volcano (Torkoal) @ Charcoal
+    Ability: Drought
+    Tera Type: Fire
+    EVs: 252 HP / 252 SpA / 4 SpD
+    Quiet Nature
+    - Eruption
+    - Heat Wave
+
+Cada equip comença amb una capçalera `=== [format] nom ===` i els membres
+se separen amb línies en blanc. Un paste sense capçaleres és un sol equip.
+
+El parser és incremental: rep les línies d'una en una (`feed`) i retorna
+cada equip tan bon punt es tanca, de manera que una importació de centenars
+d'equips no s'ha de tenir sencera en memòria.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from common.stats import EV_KEYS, normalize_evs
+
+HEADER_RE = re.compile(r"^===\s*(?:\[(?P<format>[^\]]*)\]\s*)?(?P<name>.*?)\s*===$")
+GENDER_RE = re.compile(r"\s+\((?:M|F)\)$")
+
+# Abreviatures de Showdown ↔ claus d'EVs dels documents (common/stats.py), en el mateix ordre
+SHOWDOWN_STATS = dict(zip(("HP", "Atk", "Def", "SpA", "SpD", "Spe"), EV_KEYS))
+EV_LABELS = {key: label for label, key in SHOWDOWN_STATS.items()}
+
+
+class ShowdownParser:
+    """
+    Parser incremental de pastes de Showdown.
+
+    Ús:
+        parser = ShowdownParser()
+        for line in lines:
+            for team in parser.feed(line):
+                ...
+        for team in parser.close():
+            ...
+    """
+
+    def __init__(self, default_format: Optional[str] = None):
+        """
+        Args:
+            default_format: Format dels equips sense capçalera o sense [format]
+        """
+        self.default_format = default_format
+        self.line_number = 0
+        self._team = None
+        self._member = None
+        self._count = 0
+
+    def feed(self, line: str) -> List[Dict]:
+        """Processa una línia. Retorna els equips que s'han tancat (0 o 1)."""
+        self.line_number += 1
+        line = line.strip()
+
+        header = HEADER_RE.match(line)
+        if header:
+            finished = self._finish_team()
+            self._team = self._new_team(header.group("name"), header.group("format"))
+            return finished
+
+        if not line:
+            self._finish_member()
+            return []
+
+        if self._team is None:
+            self._team = self._new_team(None, None)
+
+        if self._member is None:
+            self._member = parse_member_header(line)
+        else:
+            parse_member_line(self._member, line)
+        return []
+
+    def close(self) -> List[Dict]:
+        """Tanca l'últim equip (al final de l'entrada)."""
+        return self._finish_team()
+
+    def _new_team(self, name: Optional[str], format_name: Optional[str]) -> Dict:
+        self._count += 1
+        return {
+            "team_name": name or f"Equip importat {self._count}",
+            "format": format_name or self.default_format,
+            "team_members": [],
+            "line": self.line_number
+        }
+
+    def _finish_member(self):
+        if self._member is not None:
+            self._team["team_members"].append(self._member)
+            self._member = None
+
+    def _finish_team(self) -> List[Dict]:
+        self._finish_member()
+        team, self._team = self._team, None
+        return [team] if team is not None and team["team_members"] else []
+
+
+def parse_showdown(lines: Iterable[str], default_format: Optional[str] = None) -> Iterator[Dict]:
+    """Equips d'un paste de Showdown, a mesura que es llegeixen les línies."""
+    parser = ShowdownParser(default_format)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
+def parse_member_header(line: str) -> Dict:
+    """Primera línia d'un membre: "Sobrenom (Espècie) (M) @ Objecte"."""
+    name, _, item = line.partition(" @ ")
+    name = GENDER_RE.sub("", name.strip())
+
+    nickname = None
+    if name.endswith(")") and " (" in name:
+        nickname, _, species = name[:-1].rpartition(" (")
+    else:
+        species = name
+
+    return {
+        "base_pokemon": species.strip(),
+        "nickname": nickname.strip() if nickname else None,
+        "item": item.strip() or None,
+        "ability": None,
+        "tera_type": None,
+        "nature": None,
+        "moves": [],
+        "evs": {}
+    }
+
+
+def parse_member_line(member: Dict, line: str):
+    """Línies següents d'un membre (habilitat, Tera, EVs, natura, moviments)."""
+    if line.startswith("-"):
+        member["moves"].append(line[1:].strip())
+    elif line.startswith("Ability:"):
+        member["ability"] = line[len("Ability:"):].strip()
+    elif line.startswith("Tera Type:"):
+        member["tera_type"] = line[len("Tera Type:"):].strip()
+    elif line.startswith("EVs:"):
+        member["evs"] = parse_evs(line[len("EVs:"):])
+    elif line.endswith(" Nature"):
+        member["nature"] = line[:-len(" Nature")].strip()
+    # Level, IVs, Shiny, Happiness...: no es guarden als equips
+
+
+def parse_evs(text: str) -> Dict[str, int]:
+    """ "252 HP / 4 SpD" → {"hp": 252, "sp_def": 4} (les parts il·legibles s'ignoren)."""
+    evs = {}
+    for part in text.split("/"):
+        value, _, label = part.strip().partition(" ")
+        key = SHOWDOWN_STATS.get(label.strip())
+        if key and value.isdigit():
+            evs[key] = int(value)
+    return evs
+
+
+def format_showdown_team(team: Dict) -> str:
+    """Document de l'índex 'teams' → text de Showdown (amb capçalera i línia en blanc final)."""
+    format_name = team.get("format")
+    header = f"=== [{format_name}] {team.get('team_name', '')} ===" if format_name \
+        else f"=== {team.get('team_name', '')} ==="
+    blocks = [header]
+    for member in team.get("team_members", []):
+        blocks.append(format_showdown_member(member))
+    return "\n\n".join(blocks) + "\n\n"
+
+
+def format_showdown_member(member: Dict) -> str:
+    species = member.get("base_pokemon", "")
+    nickname = member.get("nickname")
+    first = f"{nickname} ({species})" if nickname and nickname != species else species
+    if member.get("item"):
+        first += f" @ {member['item']}"
+
+    lines = [first]
+    if member.get("ability"):
+        lines.append(f"Ability: {member['ability']}")
+    if member.get("tera_type"):
+        lines.append(f"Tera Type: {member['tera_type']}")
+    # Els equips desats des del frontend poden tenir 'special_attack'/'special_defense'
+    member_evs = normalize_evs(member.get("evs"))
+    evs = [f"{member_evs[key]} {EV_LABELS[key]}" for key in EV_KEYS if member_evs.get(key)]
+    if evs:
+        lines.append("EVs: " + " / ".join(evs))
+    if member.get("nature"):
+        lines.append(f"{member['nature']} Nature")
+    lines.extend(f"- {move}" for move in member.get("moves") or [])
+    return "\n".join(lines)
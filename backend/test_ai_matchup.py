@@ -0,0 +1,66 @@
+"""
+Tests de la consulta d'enfrontaments entre dos Pokémon
+======================================================
+
+GET /api/v1/ai/matchup/{attacker_id}/{defender_id} retorna la puntuació de
+la matriu d'enfrontaments; 404 si algun Pokémon no hi és i 503 si la
+matriu no està disponible.
+
+Ús:
+    python3 -m pytest -q backend/test_ai_matchup.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException
+
+import main
+
+
+class FakeAIService:
+    """Servei d'IA amb una matriu d'enfrontaments de dos Pokémon."""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def matchup(self, attacker_id, defender_id):
+        if self.scores is None:
+            return None
+        return {
+            "attacker": {"pokedex_id": attacker_id},
+            "defender": {"pokedex_id": defender_id},
+            "score": self.scores.get((attacker_id, defender_id))
+        }
+
+
+def call(monkeypatch, scores, attacker_id, defender_id):
+    monkeypatch.setattr(main, "AI_ENABLED", True)
+    monkeypatch.setattr(main, "ai_service", FakeAIService(scores))
+    try:
+        return main.pokemon_matchup(attacker_id, defender_id)
+    except HTTPException as e:
+        return e.status_code
+
+
+def test_matchup_returns_the_pair_score(monkeypatch):
+    scores = {(445, 25): 0.86, (25, 445): -0.86}
+    result = call(monkeypatch, scores, 445, 25)
+    assert result["success"] and result["score"] == 0.86
+    assert result["attacker"]["pokedex_id"] == 445 and result["defender"]["pokedex_id"] == 25
+
+
+def test_matchup_errors(monkeypatch):
+    assert call(monkeypatch, {(445, 25): 0.86}, 445, 99999) == 404
+    assert call(monkeypatch, None, 445, 25) == 503
+
+    monkeypatch.setattr(main, "ai_service", None)
+    try:
+        main.pokemon_matchup(445, 25)
+    except HTTPException as e:
+        assert e.status_code == 503
+    else:
+        raise AssertionError("S'ha respost sense servei d'IA")
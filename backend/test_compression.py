@@ -0,0 +1,125 @@
+"""
+Tests del middleware de compressió
+==================================
+
+La codificació es negocia amb l'Accept-Encoding (q=0 i comodí), les
+respostes petites passen sense comprimir, les senceres es comprimeixen d'un
+cop (amb Content-Length, Vary i memòria cau) i les de streaming tros a tros,
+de manera que cada tros rebut ja es pot descomprimir.
+
+Ús:
+    python3 -m pytest -q backend/test_compression.py
+"""
+
+import sys
+import os
+import asyncio
+import gzip
+import json
+import zlib
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import compression
+from compression import CompressionMiddleware, negotiate_encoding
+
+
+def json_app(body: bytes, content_type: bytes = b"application/json"):
+    """Aplicació ASGI que respon el cos sencer en un sol missatge."""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type), (b"content-length", str(len(body)).encode())
+        ]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def streaming_app(chunks):
+    """Aplicació ASGI que respon NDJSON tros a tros."""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/x-ndjson")
+        ]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def request(middleware, accept_encoding="gzip"):
+    """Executa una petició GET i retorna (capçaleres, trossos del cos)."""
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = {key.decode().lower(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, [message.get("body", b"") for message in messages[1:]]
+
+
+def test_negotiate_encoding(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("br, gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip;q=0, *") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("*;q=0") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("GZIP; q=0.5") == "gzip"
+    assert negotiate_encoding("gzip;q=abc") is None
+
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+    assert negotiate_encoding("*") == "br"
+
+
+def test_small_and_non_json_responses_pass_through():
+    small = json.dumps({"ok": True}).encode()
+    headers, body = request(CompressionMiddleware(json_app(small), minimum_size=1024))
+    assert "content-encoding" not in headers and body == [small]
+
+    image = bytes(5000)
+    headers, body = request(CompressionMiddleware(json_app(image, b"image/png"), minimum_size=10))
+    assert "content-encoding" not in headers and body == [image]
+
+    # Sense Accept-Encoding compatible tampoc es comprimeix
+    large = json.dumps(list(range(2000))).encode()
+    headers, body = request(CompressionMiddleware(json_app(large), minimum_size=10), "identity")
+    assert "content-encoding" not in headers and body == [large]
+
+
+def test_whole_body_is_compressed_and_cached():
+    large = json.dumps([{"pokedex_id": i, "name": f"pokemon-{i}"} for i in range(500)]).encode()
+    middleware = CompressionMiddleware(json_app(large), minimum_size=1024, gzip_level=6)
+
+    headers, body = request(middleware, "gzip, deflate")
+    assert headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in headers["vary"].lower()
+    assert len(body) == 1 and int(headers["content-length"]) == len(body[0]) < len(large)
+    assert gzip.decompress(body[0]) == large
+    assert middleware.cache.info()["misses"] == 1
+
+    # La segona vegada surt de la memòria cau, amb els mateixos bytes
+    _, again = request(middleware)
+    assert again == body and middleware.cache.info()["hits"] == 1
+
+
+def test_streaming_is_decompressed_chunk_by_chunk():
+    chunks = [json.dumps({"line": i, "data": "x" * 50}).encode() + b"\n" for i in range(5)]
+    headers, body = request(CompressionMiddleware(streaming_app(chunks), minimum_size=10))
+    assert headers["content-encoding"] == "gzip" and "content-length" not in headers
+    assert len(body) == len(chunks)
+
+    # Cada tros enviat es pot descomprimir sense esperar els següents
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for sent, received in zip(chunks, body):
+        assert decompressor.decompress(received) == sent
+    assert decompressor.eof
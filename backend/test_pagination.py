@@ -0,0 +1,127 @@
+"""
+Tests de la paginació per cursor dels equips
+============================================
+
+El cursor de GET /api/v1/teams/user/{user_id} ha de tornar els mateixos
+valors d'ordenació que s'hi van posar, un cursor manipulat s'ha de
+rebutjar amb un 400 i recórrer totes les pàgines ha de donar tots els
+equips de l'usuari, un sol cop i en ordre (amb un Elasticsearch fals en
+memòria).
+
+Ús:
+    python3 -m pytest -q backend/test_pagination.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException
+
+from main import TEAM_SUMMARY_FIELDS, TEAMS_SORT, decode_cursor, encode_cursor, get_user_teams
+
+
+class FakeTeamsES:
+    """Índex 'teams' en memòria amb la consulta del llistat: term, sort, search_after i _source."""
+
+    def __init__(self, teams):
+        self.teams = teams
+        self.queries = []
+
+    def search(self, index, body):
+        self.queries.append(body)
+        hits = [
+            {"_id": team["team_id"], "_source": team, "sort": [team["updated_at"], team["team_id"]]}
+            for team in self.teams if team["user_id"] == body["query"]["term"]["user_id"]
+        ]
+        hits.sort(key=lambda hit: hit["sort"], reverse=True)
+        total = len(hits)
+        if "search_after" in body:
+            hits = [hit for hit in hits if hit["sort"] < body["search_after"]]
+        hits = hits[:body["size"]]
+        if "_source" in body:
+            for hit in hits:
+                hit["_source"] = project(hit["_source"], body["_source"])
+        return {"hits": {"total": {"value": total}, "hits": hits}}
+
+
+def project(source, fields):
+    """Camps de _source (amb camps niats com 'team_members.pokedex_id')."""
+    result = {}
+    for field in fields:
+        top, _, nested = field.partition(".")
+        if top not in source:
+            continue
+        if nested:
+            members = result.setdefault(top, [{} for _ in source[top]])
+            for member, original in zip(members, source[top]):
+                member[nested] = original.get(nested)
+        else:
+            result[top] = source[top]
+    return result
+
+
+def build_teams():
+    teams = []
+    for i in range(7):
+        teams.append({
+            "team_id": f"equip-{i}", "user_id": "ash", "team_name": f"Equip {i}", "format": "ou",
+            # Dos equips amb la mateixa data: desempata el team_id
+            "updated_at": f"2024-01-0{min(i, 5) + 1}T00:00:00", "created_at": "2024-01-01T00:00:00",
+            "team_members": [{"base_pokemon": "pikachu", "pokedex_id": 25, "moves": ["thunderbolt"]}]
+        })
+    teams.append(dict(teams[0], team_id="altre", user_id="misty"))
+    return teams
+
+
+def test_cursor_round_trip():
+    for values in ([1718000000000, "a1b2c3"], [0, ""], [1718000000000, "equip/ñ?=&"]):
+        cursor = encode_cursor(values)
+        assert decode_cursor(cursor) == values
+        # El cursor va a la query string sense escapar
+        assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+def test_invalid_cursor_is_rejected():
+    wrong_length = encode_cursor([1] * (len(TEAMS_SORT) + 1))
+    for cursor in ("no-és-base64", "e30=", encode_cursor({"a": 1}), wrong_length):
+        try:
+            decode_cursor(cursor)
+        except HTTPException as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"S'ha acceptat el cursor {cursor!r}")
+
+
+def test_pages_cover_all_teams_in_order():
+    es = FakeTeamsES(build_teams())
+    seen, cursor = [], None
+    while True:
+        page = get_user_teams("ash", limit=3, cursor=cursor, view="summary", hydrate=False,
+                              stream=False, es_client=es)
+        assert page["total"] == 7
+        seen.extend(team["id"] for team in page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ["equip-6", "equip-5", "equip-4", "equip-3", "equip-2", "equip-1", "equip-0"]
+    assert all(query["sort"] == TEAMS_SORT for query in es.queries)
+
+
+def test_summary_view_is_projected():
+    es = FakeTeamsES(build_teams())
+    page = get_user_teams("ash", limit=2, cursor=None, view="summary", hydrate=False,
+                          stream=False, es_client=es)
+    assert es.queries[0]["_source"] == TEAM_SUMMARY_FIELDS
+    assert page["results"][0] == {
+        "id": "equip-6", "team_name": "Equip 6", "format": "ou",
+        "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-06T00:00:00", "member_ids": [25]
+    }
+
+    full = get_user_teams("ash", limit=2, cursor=None, view="full", hydrate=False,
+                          stream=False, es_client=es)
+    assert "_source" not in es.queries[1]
+    assert full["results"][0]["team_members"][0]["moves"] == ["thunderbolt"]
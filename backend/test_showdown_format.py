@@ -0,0 +1,98 @@
+"""
+Tests del format de Showdown
+============================
+
+Un equip exportat a Showdown i tornat a importar ha de quedar igual, també
+si es va desar des del frontend (EVs amb 'special_attack'), i el parser
+retorna cada equip tan bon punt es tanca.
+
+Ús:
+    python3 -m pytest -q backend/test_showdown_format.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual i l'arrel del repositori al path
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from showdown_format import ShowdownParser, format_showdown_team, parse_showdown
+
+TEAM = {
+    "team_name": "Equip de Sol",
+    "format": "gen9vgc2024regg",
+    "team_members": [
+        {
+            "base_pokemon": "Torkoal", "nickname": "Volcano", "item": "Charcoal",
+            "ability": "Drought", "tera_type": "Fire", "nature": "Quiet",
+            "moves": ["Eruption", "Heat Wave", "Earth Power", "Protect"],
+            "evs": {"hp": 252, "sp_atk": 252, "sp_def": 4}
+        },
+        {
+            "base_pokemon": "Lilligant-Hisui", "nickname": None, "item": "Focus Sash",
+            "ability": "Chlorophyll", "tera_type": None, "nature": "Jolly",
+            "moves": ["Close Combat", "Leaf Blade"],
+            "evs": {"attack": 252, "defense": 4, "speed": 252}
+        }
+    ]
+}
+
+
+def round_trip(team):
+    teams = list(parse_showdown(format_showdown_team(team).splitlines()))
+    assert len(teams) == 1
+    return teams[0]
+
+
+def test_round_trip():
+    parsed = round_trip(TEAM)
+    assert parsed["team_name"] == TEAM["team_name"]
+    assert parsed["format"] == TEAM["format"]
+    assert parsed["team_members"] == TEAM["team_members"]
+
+
+def test_ui_evs_are_exported():
+    member = dict(TEAM["team_members"][0], evs={"hp": 252, "special_attack": 252, "special_defense": 4})
+    text = format_showdown_team(dict(TEAM, team_members=[member]))
+    assert "EVs: 252 HP / 252 SpA / 4 SpD" in text
+    assert round_trip(dict(TEAM, team_members=[member]))["team_members"][0]["evs"] == {
+        "hp": 252, "sp_atk": 252, "sp_def": 4
+    }
+
+
+def test_several_teams_and_defaults():
+    paste = [
+        "Pikachu (M) @ Light Ball",
+        "- Thunderbolt",
+        "",
+        "Garchomp",
+        "EVs: 252 Atk / 4 Foo / 252 Spe",
+        "=== Segon ===",
+        "Eevee",
+    ]
+    first, second = parse_showdown(paste, default_format="ou")
+    assert [m["base_pokemon"] for m in first["team_members"]] == ["Pikachu", "Garchomp"]
+    assert first["team_members"][0]["item"] == "Light Ball"
+    assert first["team_members"][1]["evs"] == {"attack": 252, "speed": 252}
+    assert first["format"] == "ou" and second["format"] == "ou"
+    assert second["team_name"] == "Segon" and second["line"] == 6
+
+
+def test_parser_is_incremental():
+    parser = ShowdownParser()
+    lines = format_showdown_team(TEAM).splitlines() + ["=== [ou] Segon ===", "Eevee @ Eviolite"]
+    finished = []
+    for number, line in enumerate(lines, 1):
+        teams = parser.feed(line)
+        if teams:
+            finished.append((number, teams))
+
+    # El primer equip surt en llegir la capçalera del segon, sense esperar el final
+    assert len(finished) == 1
+    number, (team,) = finished[0]
+    assert lines[number - 1] == "=== [ou] Segon ===" and team["team_name"] == "Equip de Sol"
+
+    (last,) = parser.close()
+    assert last["team_name"] == "Segon" and last["team_members"][0]["item"] == "Eviolite"
+    assert parser.close() == []
@@ -0,0 +1,89 @@
+"""
+Tests de la legalitat dels equips en desar-los i importar-los
+=============================================================
+
+Desar un equip (POST /api/v1/teams) i la importació massiva han d'aplicar
+les mateixes regles que /api/v1/teams/validate: el validador i les
+llistes de prohibits del format de l'equip. Un format desconegut es
+rebutja.
+
+Ús:
+    python3 -m pytest -q backend/test_team_legality.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import HTTPException
+
+from common.team_validator import TeamValidator
+from main import TeamCreate, TeamImport, create_team
+
+
+class FakeES:
+    """Elasticsearch buit que guarda els documents indexats."""
+
+    def __init__(self):
+        self.indexed = {}
+
+    def search(self, index, body):
+        return {"hits": {"total": {"value": 0}, "hits": []}}
+
+    def index(self, index, id, document):
+        self.indexed[id] = document
+        return {"_id": id}
+
+
+def team(format_name, pokedex_id, name="Equip"):
+    return {
+        "team_name": name,
+        "format": format_name,
+        "team_members": [{"base_pokemon": "pokemon", "pokedex_id": pokedex_id, "moves": []}]
+    }
+
+
+def create(es, data):
+    return create_team(TeamCreate(**data), current_user={"username": "ash"}, es=es)
+
+
+def test_create_team_applies_format_bans():
+    es = FakeES()
+    assert create(es, team("ou", 25))["success"]
+
+    # Mewtwo (150) està prohibit a OU
+    try:
+        create(es, team("ou", 150))
+    except HTTPException as e:
+        assert e.status_code == 400
+        assert [error["member"] for error in e.detail["errors"]] == [0]
+    else:
+        raise AssertionError("S'ha desat un equip amb un Pokémon prohibit")
+    assert len(es.indexed) == 1
+
+
+def test_create_team_rejects_unknown_format():
+    es = FakeES()
+    try:
+        create(es, team("format-inventat", 25))
+    except HTTPException as e:
+        assert e.status_code == 400 and "Format desconegut" in e.detail
+    else:
+        raise AssertionError("S'ha desat un equip d'un format desconegut")
+    assert es.indexed == {}
+
+
+def test_import_applies_format_bans():
+    importer = TeamImport(FakeES(), "ash", name_index=None, validator=TeamValidator())
+    importer.add(team("ou", 25, "legal"), line=1)
+    importer.add(team("ou", 150, "prohibit"), line=2)
+    importer.add(team("format-inventat", 25, "desconegut"), line=3)
+
+    assert [document["team_name"] for _, _, document in importer.pending] == ["legal"]
+    rejected = {entry["team_name"]: entry for entry in importer.rejected}
+    assert set(rejected) == {"prohibit", "desconegut"}
+    assert rejected["prohibit"]["errors"][0]["member"] == 0
+    assert rejected["desconegut"]["line"] == 3
+    assert "Format desconegut" in rejected["desconegut"]["errors"][0]["reason"]
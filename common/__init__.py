@@ -0,0 +1,16 @@
+"""
+Mòduls compartits de PokeBuilder
+================================
+
+Codi que fan servir alhora el backend (backend/), el servei d'IA (ia/) i
+els scripts d'ingesta (scripts_bd/), de manera que tots normalitzen i
+validen les dades de la mateixa manera.
+
+Mòduls:
+    - name_index: Normalització de noms de Pokémon i índex nom → pokedex_id
+    - team_validator: Validador de legalitat dels membres d'un equip
+    - stats: Claus dels EVs dels equips i els seus àlies (normalize_evs)
+
+Ús (amb l'arrel del repositori al sys.path):
+    from common.name_index import normalize_name
+"""
@@ -0,0 +1,145 @@
+"""
+Índex de noms de Pokémon → pokedex_id
+=====================================
+
+Els equips guarden el Pokémon base com a text lliure ("Urshifu-Rapid-Strike",
+"Flutter Mane", "mr. mime"...). Aquest mòdul normalitza els noms (sense
+majúscules, espais, guions ni accents) i els resol a un pokedex_id amb un
+diccionari en memòria, sense haver de fer cerques per prefix a Elasticsearch.
+
+La clau normalitzada (`name_key`) es calcula en el moment de la ingesta
+(`scripts_bd/ingesta_pokemon.py`) i es guarda a cada document de l'índex
+`pokemon`. El backend carrega totes les claus una sola vegada.
+
+Ordre de resolució d'un nom:
+    1. Coincidència exacta de la clau ("Flutter Mane" → "fluttermane")
+    2. Prefix de la clau ("Urshifu" → "urshifusinglestrike"), només si és
+       prou llarg (MIN_PREFIX_LENGTH) o si només hi ha una clau que el
+       comparteix: "P" no es resol a cap Pokémon
+    3. Es treuen segments finals separats per guió i es torna a provar
+       ("Lilligant-Hisui" → "Lilligant", "Urshifu-Rapid-Strike" → "Urshifu")
+"""
+import bisect
+import threading
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+# Longitud mínima d'un prefix ambigu (que comparteixen diverses claus) per
+# resoldre'l al Pokémon d'ID més baix ("Deoxys" → "deoxysnormal")
+MIN_PREFIX_LENGTH = 6
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalitza un nom de Pokémon: minúscules, sense accents i només lletres
+    i números ("Farfetch'd" → "farfetchd", "Type: Null" → "typenull").
+    """
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+class PokemonNameIndex:
+    """
+    Diccionari en memòria de clau de nom normalitzada → pokedex_id.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            entries: Diccionari {nom (normalitzat o no): pokedex_id}
+        """
+        self._ids = {}
+        self._sorted_keys = None
+        for name, pokedex_id in (entries or {}).items():
+            self.add(name, pokedex_id)
+
+    def add(self, name: str, pokedex_id: int):
+        key = normalize_name(name)
+        if not key:
+            return
+        # Si dues formes comparteixen clau, ens quedem amb la de l'ID més baix
+        if key not in self._ids or pokedex_id < self._ids[key]:
+            self._ids[key] = pokedex_id
+        self._sorted_keys = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def resolve(self, name: str) -> Optional[int]:
+        """
+        Retorna el pokedex_id d'un nom, o None si no es pot resoldre.
+        """
+        if not name:
+            return None
+
+        segments = name.replace("_", "-").split("-")
+        while segments:
+            key = normalize_name("-".join(segments))
+            if key:
+                if key in self._ids:
+                    return self._ids[key]
+                pokedex_id = self._resolve_prefix(key)
+                if pokedex_id is not None:
+                    return pokedex_id
+            segments.pop()
+
+        return None
+
+    def resolve_many(self, names: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Resol diversos noms alhora: {nom original: pokedex_id o None}."""
+        return {name: self.resolve(name) for name in set(names) if name}
+
+    def _resolve_prefix(self, key: str) -> Optional[int]:
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._ids)
+
+        # Totes les claus que comencen per 'key' són contigües a la llista ordenada
+        start = bisect.bisect_left(self._sorted_keys, key)
+        candidates = set()
+        for candidate in self._sorted_keys[start:]:
+            if not candidate.startswith(key):
+                break
+            candidates.add(self._ids[candidate])
+
+        # Un prefix curt i ambigu ("P", "char") no identifica cap Pokémon
+        if len(candidates) > 1 and len(key) < MIN_PREFIX_LENGTH:
+            return None
+        return min(candidates, default=None)
+
+    @classmethod
+    def from_elasticsearch(cls, es_client, index: str = "pokemon") -> "PokemonNameIndex":
+        """
+        Construeix l'índex llegint el nom de tots els Pokémon d'Elasticsearch.
+        """
+        response = es_client.search(index=index, body={
+            "query": {"match_all": {}},
+            "_source": ["pokedex_id", "name", "name_key"],
+            "size": 10000
+        })
+
+        name_index = cls()
+        for hit in response['hits']['hits']:
+            data = hit['_source']
+            # Documents antics (sense name_key): la calculem a partir del nom
+            name_index.add(data.get("name_key") or data.get("name", ""), data['pokedex_id'])
+        return name_index
+
+
+# --- Instància compartida pel backend ---
+_name_index = None
+_lock = threading.Lock()
+
+
+def get_name_index(es_client, reload: bool = False) -> PokemonNameIndex:
+    """
+    Retorna l'índex de noms compartit, carregant-lo d'Elasticsearch el
+    primer cop (o si està buit, per exemple abans de la ingesta).
+    """
+    global _name_index
+    with _lock:
+        if reload or _name_index is None or len(_name_index) == 0:
+            _name_index = PokemonNameIndex.from_elasticsearch(es_client)
+            print(f"✓ Índex de noms carregat ({len(_name_index)} Pokémon)")
+        return _name_index
@@ -0,0 +1,46 @@
+"""
+Claus de les estadístiques (EVs)
+================================
+
+Els documents de l'índex 'teams' guarden els EVs amb les claus curtes
+d'EV_KEYS (hp, attack, defense, sp_atk, sp_def, speed), però les
+estadístiques arriben amb altres noms: el frontend i el motor d'IA fan
+servir 'special_attack' / 'special_defense' (com els camps 'stats' de
+l'índex 'pokemon') i PokéAPI 'special-attack' / 'special-defense'.
+
+`normalize_evs()` és l'única conversió: la fan servir el backend en desar
+un equip, el validador, l'exportació a Showdown i el càlcul de dany, de
+manera que un equip desat des del frontend es llegeix igual a tot arreu.
+"""
+from typing import Dict, Optional
+
+# Claus dels EVs als documents d'equip, en l'ordre de les estadístiques
+EV_KEYS = ("hp", "attack", "defense", "sp_atk", "sp_def", "speed")
+
+# Altres noms de cada estadística → clau d'EV_KEYS
+EV_ALIASES = {
+    "special_attack": "sp_atk",
+    "special_defense": "sp_def",
+    "special-attack": "sp_atk",
+    "special-defense": "sp_def"
+}
+
+
+def stat_key(name: str) -> Optional[str]:
+    """Clau d'EV_KEYS d'una estadística ("special_attack" → "sp_atk"), o None si no n'és cap."""
+    if name in EV_KEYS:
+        return name
+    return EV_ALIASES.get(name)
+
+
+def normalize_evs(evs: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """
+    EVs amb les claus d'EV_KEYS. Les claus desconegudes es conserven tal
+    qual (perquè el validador les pugui rebutjar); si una estadística arriba
+    amb dos noms, se sumen.
+    """
+    normalized = {}
+    for name, value in (evs or {}).items():
+        key = stat_key(name) or name
+        normalized[key] = normalized[key] + value if key in normalized else value
+    return normalized
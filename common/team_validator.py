@@ -0,0 +1,233 @@
+"""
+Validador de legalitat d'equips
+===============================
+
+Comprova que cada membre d'un equip és legal per a la seva espècie:
+habilitat que pot tenir, moviments que pot aprendre, objecte i natura
+existents i EVs dins dels límits del joc.
+
+Fer-ho amb consultes a Elasticsearch en caldrien diverses per membre. En
+lloc d'això, el validador es carrega una sola vegada (com l'índex de noms)
+amb tot el que necessita, precalculat en memòria:
+
+- Un registre de noms de moviments i un altre d'habilitats (clau
+  normalitzada → bit) i, per a cada espècie, una màscara (int) amb els que
+  té: saber si un Pokémon pot aprendre un moviment és una consulta al
+  diccionari i una AND.
+- Els conjunts de claus d'objectes i de natures vàlids.
+
+Validar un equip de 6 no fa cap crida de xarxa, de manera que es pot fer
+a cada desat i a cada importació massiva. Els errors tenen el mateix
+format que els de les llistes de prohibits (format_rules.py):
+{"member", "field", "value", "reason"}.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from common.name_index import normalize_name
+from common.stats import EV_KEYS, normalize_evs
+
+# Límits del joc
+MAX_TEAM_SIZE = 6
+MAX_MOVES = 4
+MAX_EVS_PER_STAT = 252
+MAX_EVS_TOTAL = 510
+
+
+class SpeciesRules:
+    """Habilitats i moviments d'una espècie (màscares sobre els registres del validador)."""
+
+    __slots__ = ('name', 'abilities', 'moves')
+
+    def __init__(self, name: str, abilities: int, moves: int):
+        self.name = name
+        self.abilities = abilities
+        self.moves = moves
+
+
+class TeamValidator:
+    """
+    Dades de legalitat precalculades: espècie → habilitats i moviments
+    possibles, i objectes i natures vàlids.
+    """
+
+    def __init__(self):
+        self._species: Dict[int, SpeciesRules] = {}
+        self._ability_bits: Dict[str, int] = {}
+        self._move_bits: Dict[str, int] = {}
+        self._items = set()
+        self._natures = set()
+
+    def __len__(self):
+        return len(self._species)
+
+    # ------------------------------------------------------------------
+    # Construcció
+    # ------------------------------------------------------------------
+    def add_species(self, pokedex_id: int, name: str, abilities: Iterable[str], moves: Iterable[str]):
+        """Afegeix una espècie amb els noms de les seves habilitats i dels moviments que pot aprendre."""
+        self._species[pokedex_id] = SpeciesRules(
+            name,
+            self._mask(self._ability_bits, abilities),
+            self._mask(self._move_bits, moves)
+        )
+
+    def add_items(self, names: Iterable[str]):
+        self._items.update(key for key in map(normalize_name, names) if key)
+
+    def add_natures(self, names: Iterable[str]):
+        self._natures.update(key for key in map(normalize_name, names) if key)
+
+    @staticmethod
+    def _mask(registry: Dict[str, int], names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            key = normalize_name(name)
+            if key:
+                mask |= 1 << registry.setdefault(key, len(registry))
+        return mask
+
+    @classmethod
+    def from_sources(
+            cls,
+            pokemon: Iterable[Dict],
+            items: Iterable[Dict] = (),
+            natures: Iterable[Dict] = ()
+    ) -> "TeamValidator":
+        """
+        Construeix el validador a partir de documents de l'índex 'pokemon'
+        (amb 'abilities' i 'moves_pool') i dels índexs 'items' i 'natures'.
+        """
+        validator = cls()
+        for data in pokemon:
+            validator.add_species(
+                data["pokedex_id"],
+                data.get("name", ""),
+                (ability["name"] for ability in data.get("abilities") or []),
+                (move["name"] for move in data.get("moves_pool") or [])
+            )
+        validator.add_items(item["name"] for item in items if item.get("name"))
+        validator.add_natures(nature["name"] for nature in natures if nature.get("name"))
+        return validator
+
+    @classmethod
+    def from_elasticsearch(cls, es_client) -> "TeamValidator":
+        """
+        Construeix el validador llegint els Pokémon, els objectes i les
+        natures d'Elasticsearch (una consulta per índex).
+        """
+        def sources(index: str, fields: List[str]) -> List[Dict]:
+            response = es_client.search(index=index, body={
+                "query": {"match_all": {}},
+                "_source": fields,
+                "size": 10000
+            })
+            return [hit['_source'] for hit in response['hits']['hits']]
+
+        return cls.from_sources(
+            sources("pokemon", ["pokedex_id", "name", "abilities.name", "moves_pool.name"]),
+            sources("items", ["name"]),
+            sources("natures", ["name"])
+        )
+
+    # ------------------------------------------------------------------
+    # Validació
+    # ------------------------------------------------------------------
+    def validate_team(self, members: List[Dict]) -> List[Dict]:
+        """
+        Errors de legalitat d'un equip (membres amb 'pokedex_id' resolt).
+
+        Returns:
+            Llista de {"member", "field", "value", "reason"} (buida si és
+            legal); "member" és la posició del membre, o None si l'error és
+            de l'equip sencer
+        """
+        errors = []
+        if len(members) > MAX_TEAM_SIZE:
+            errors.append({"member": None, "field": "team_members", "value": len(members),
+                           "reason": f"Un equip no pot tenir més de {MAX_TEAM_SIZE} membres"})
+        for index, member in enumerate(members):
+            for error in self.validate_member(member):
+                errors.append({"member": index, **error})
+        return errors
+
+    def validate_member(self, member: Dict) -> List[Dict]:
+        """
+        Errors de legalitat d'un membre (document de l'índex 'teams').
+        Les comprovacions sense dades (espècie sense moviments a l'índex,
+        índexs de Pokémon, habilitats o objectes buits...) no es fan. Els EVs
+        s'accepten amb qualsevol nom de common/stats.py ("special_attack" o
+        "sp_atk").
+
+        Returns:
+            Llista de {"field", "value", "reason"}
+        """
+        errors = []
+        species = self._species.get(member.get("pokedex_id"))
+        if species is None and self._species:
+            errors.append(_error("base_pokemon", member.get("base_pokemon"), "Pokémon desconegut"))
+
+        ability = member.get("ability")
+        if ability and self._ability_bits:
+            bit = self._ability_bits.get(normalize_name(ability))
+            if bit is None:
+                errors.append(_error("ability", ability, "Habilitat desconeguda"))
+            elif species is not None and species.abilities and not species.abilities >> bit & 1:
+                errors.append(_error("ability", ability, f"{species.name.capitalize()} no pot tenir aquesta habilitat"))
+
+        moves = member.get("moves") or []
+        if len(moves) > MAX_MOVES:
+            errors.append(_error("moves", len(moves), f"Un Pokémon no pot tenir més de {MAX_MOVES} moviments"))
+        seen = set()
+        for move in moves:
+            key = normalize_name(move)
+            bit = self._move_bits.get(key)
+            if bit is None and self._move_bits:
+                errors.append(_error("moves", move, "Moviment desconegut"))
+            elif bit is not None and species is not None and species.moves and not species.moves >> bit & 1:
+                errors.append(_error("moves", move, f"{species.name.capitalize()} no pot aprendre aquest moviment"))
+            elif key in seen:
+                errors.append(_error("moves", move, "Moviment repetit"))
+            seen.add(key)
+
+        item = member.get("item")
+        if item and self._items and normalize_name(item) not in self._items:
+            errors.append(_error("item", item, "Objecte desconegut"))
+
+        nature = member.get("nature")
+        if nature and self._natures and normalize_name(nature) not in self._natures:
+            errors.append(_error("nature", nature, "Natura desconeguda"))
+
+        evs = normalize_evs(member.get("evs"))
+        for stat, value in evs.items():
+            if stat not in EV_KEYS:
+                errors.append(_error("evs", stat, "Estadística desconeguda"))
+            elif not 0 <= value <= MAX_EVS_PER_STAT:
+                errors.append(_error("evs", {stat: value}, f"Els EVs han d'estar entre 0 i {MAX_EVS_PER_STAT}"))
+        total = sum(evs.values())
+        if total > MAX_EVS_TOTAL:
+            errors.append(_error("evs", total, f"El total d'EVs no pot superar {MAX_EVS_TOTAL}"))
+
+        return errors
+
+
+def _error(field: str, value, reason: str) -> Dict:
+    return {"field": field, "value": value, "reason": reason}
+
+
+# --- Instància compartida pel backend ---
+_validator: Optional[TeamValidator] = None
+_lock = threading.Lock()
+
+
+def get_team_validator(es_client, reload: bool = False) -> TeamValidator:
+    """
+    Retorna el validador compartit, carregant-lo d'Elasticsearch el primer
+    cop (o si està buit, per exemple abans de la ingesta).
+    """
+    global _validator
+    with _lock:
+        if reload or _validator is None or len(_validator) == 0:
+            _validator = TeamValidator.from_elasticsearch(es_client)
+            print(f"✓ Validador d'equips carregat ({len(_validator)} Pokémon)")
+        return _validator
@@ -0,0 +1,133 @@
+"""
+Tests del validador d'equips
+============================
+
+Comproven el validador amb dades en memòria (sense Elasticsearch): un
+equip fet des del frontend és legal, els equips il·legals es rebutgen amb
+el camp correcte i, sense dades a l'índex, no es rebutja res per
+"desconegut".
+
+Ús:
+    python3 -m pytest -q common/test_team_validator.py
+"""
+
+import sys
+import os
+
+# Afegir l'arrel del repositori al path (paquet common)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from common.team_validator import TeamValidator
+
+
+def build_validator():
+    """Validador amb dues espècies, com si es carregués d'Elasticsearch."""
+    return TeamValidator.from_sources(
+        [
+            {
+                "pokedex_id": 445, "name": "garchomp",
+                "abilities": [{"name": "sand-veil"}, {"name": "rough-skin"}],
+                "moves_pool": [{"name": "earthquake"}, {"name": "dragon-claw"},
+                               {"name": "swords-dance"}, {"name": "stone-edge"}]
+            },
+            {
+                "pokedex_id": 25, "name": "pikachu",
+                "abilities": [{"name": "static"}],
+                "moves_pool": [{"name": "thunderbolt"}, {"name": "quick-attack"}]
+            }
+        ],
+        items=[{"name": "choice-scarf"}, {"name": "light-ball"}],
+        natures=[{"name": "jolly"}, {"name": "timid"}]
+    )
+
+
+def ui_member():
+    """Membre tal com l'envia el frontend (app.js): EVs amb 'special_attack'/'special_defense'."""
+    return {
+        "base_pokemon": "garchomp",
+        "pokedex_id": 445,
+        "ability": "Rough Skin",
+        "item": "Choice Scarf",
+        "nature": "Jolly",
+        "moves": ["Earthquake", "Dragon Claw", "Swords Dance", "Stone Edge"],
+        "evs": {"hp": 4, "attack": 252, "defense": 0,
+                "special_attack": 0, "special_defense": 0, "speed": 252}
+    }
+
+
+def fields(errors):
+    return [error["field"] for error in errors]
+
+
+def test_ui_team_is_valid():
+    pikachu = {
+        "base_pokemon": "pikachu", "pokedex_id": 25, "ability": "static",
+        "item": "light-ball", "nature": "timid", "moves": ["thunderbolt"],
+        "evs": {"special_attack": 252, "special_defense": 4, "speed": 252}
+    }
+    assert build_validator().validate_team([ui_member(), pikachu]) == []
+
+
+def test_short_ev_keys_are_valid():
+    member = ui_member()
+    member["evs"] = {"sp_atk": 252, "sp_def": 4, "speed": 252}
+    assert build_validator().validate_member(member) == []
+
+
+def test_illegal_members_are_rejected():
+    validator = build_validator()
+
+    member = ui_member()
+    member["ability"] = "static"
+    assert fields(validator.validate_member(member)) == ["ability"]
+
+    member = ui_member()
+    member["moves"] = ["earthquake", "thunderbolt"]
+    assert fields(validator.validate_member(member)) == ["moves"]
+
+    member = ui_member()
+    member["moves"] = ["earthquake", "earthquake"]
+    assert fields(validator.validate_member(member)) == ["moves"]
+
+    member = ui_member()
+    member["item"] = "not-an-item"
+    member["nature"] = "grumpy"
+    assert fields(validator.validate_member(member)) == ["item", "nature"]
+
+    member = ui_member()
+    member["pokedex_id"] = 9999
+    assert fields(validator.validate_member(member)) == ["base_pokemon"]
+
+
+def test_ev_limits():
+    validator = build_validator()
+
+    member = ui_member()
+    member["evs"] = {"special_attack": 300}
+    assert fields(validator.validate_member(member)) == ["evs"]
+
+    member = ui_member()
+    member["evs"] = {"hp": 252, "attack": 252, "special_attack": 252}
+    assert fields(validator.validate_member(member)) == ["evs"]
+
+    member = ui_member()
+    member["evs"] = {"luck": 4}
+    assert validator.validate_member(member)[0]["reason"] == "Estadística desconeguda"
+
+
+def test_too_many_members():
+    errors = build_validator().validate_team([ui_member()] * 7)
+    assert errors == [{"member": None, "field": "team_members", "value": 7,
+                       "reason": "Un equip no pot tenir més de 6 membres"}]
+
+
+def test_empty_validator_skips_unknown_checks():
+    # Abans de la ingesta l'índex és buit: no es pot dir que res sigui desconegut
+    member = ui_member()
+    member["moves"] = ["earthquake", "earthquake"]
+    errors = TeamValidator().validate_member(member)
+    assert [error["reason"] for error in errors] == ["Moviment repetit"]
+
+    member["moves"] = ["earthquake"]
+    member["evs"] = {"speed": 300}
+    assert fields(TeamValidator().validate_member(member)) == ["evs"]
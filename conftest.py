@@ -0,0 +1,21 @@
+"""
+Configuració de pytest per als tests del repositori.
+
+Els mòduls d'ia/ s'importen entre ells pel nom (com quan s'executen des del
+seu directori). pytest importa el paquet ia (ia/__init__.py) abans que el
+mòdul de test, de manera que el directori ha de ser al path abans de
+recollir-los. Només afecta els tests: l'aplicació no passa per aquí.
+
+Ús:
+    python3 -m pytest -q
+"""
+import os
+import sys
+
+ARREL = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, ARREL)
+sys.path.insert(0, os.path.join(ARREL, "ia"))
+
+# Tests antics que necessiten Elasticsearch i no són tests de pytest
+collect_ignore = ["ia/test_recommendation.py", "backend/test_conn.py"]
@@ -989,10 +989,24 @@ loginBtn.addEventListener("click", () => {
     }
 });
 
+    // Demana una pàgina del llistat resumit d'equips (nom, format i IDs dels membres).
+    // L'equip complet només es descarrega quan l'usuari el carrega.
+    const fetchUserTeamsPage = async (username, cursor = null) => {
+        const token = localStorage.getItem("pokeToken");
+        const params = new URLSearchParams({ limit: 20 });
+        if (cursor) params.append("cursor", cursor);
+
+        const response = await fetch(`${API_BASE}/teams/user/${username}?${params.toString()}`, {
+            headers: { "Authorization": `Bearer ${token}` }
+        });
+
+        if (!response.ok) throw new Error("Error recuperant equips");
+        return await response.json();
+    };
+
 // Funció per obrir i renderitzar el perfil (AMB DADES REALS)
     const openProfileModal = async (username) => {
         profileUsername.textContent = username;
-        const token = localStorage.getItem("pokeToken");
 
         // Mostrem estat de càrrega
         userTeamsList.innerHTML = `
@@ -1008,14 +1022,8 @@ loginBtn.addEventListener("click", () => {
             // Al teu main.py l'endpoint és /teams/user/{user_id}
             // Però l'ID que guarda elasticsearch sol ser el username si així ho hem fet.
             // Provem amb el username directament:
-            const response = await fetch(`${API_BASE}/teams/user/${username}`, {
-                headers: { "Authorization": `Bearer ${token}` }
-            });
-
-            if (!response.ok) throw new Error("Error recuperant equips");
-
-            const teams = await response.json();
-            renderUserTeams(teams); // Passem els equips reals a la funció de pintar
+            const page = await fetchUserTeamsPage(username);
+            renderUserTeams(page.results, page.next_cursor); // Passem els equips reals a la funció de pintar
 
         } catch (error) {
             console.error(error);
@@ -1038,12 +1046,16 @@ loginBtn.addEventListener("click", () => {
             if (!member.base_pokemon) return;
 
             try {
-                // Busquem el Pokémon base (sprites, tipus, stats...)
-                const res = await fetch(`${API_BASE}/pokemon/search?q=${member.base_pokemon}&limit=1`);
-                const data = await res.json();
+                // El backend ja ens retorna el Pokémon base resolt (hydrate=true).
+                // Només si no hi és (equip antic o nom desconegut) el busquem a part.
+                let baseData = member.pokemon;
+                if (!baseData) {
+                    const res = await fetch(`${API_BASE}/pokemon/search?q=${member.base_pokemon}&limit=1`);
+                    const data = await res.json();
+                    baseData = data.results && data.results.length > 0 ? data.results[0] : null;
+                }
 
-                if (data.results && data.results.length > 0) {
-                    const baseData = data.results[0];
+                if (baseData) {
 
                     // --- FUSIÓ DE DADES (CRÍTIC) ---
                     // Agafem les dades base de l'API i hi posem a sobre les dades guardades (member)
@@ -1072,10 +1084,14 @@ loginBtn.addEventListener("click", () => {
         showNotification("Equip carregat correctament!", 'success');
     };
 // Funció per pintar la llista d'equips i permetre carregar-los
-    const renderUserTeams = (teams) => {
-        userTeamsList.innerHTML = "";
+    const renderUserTeams = (teams, nextCursor = null, append = false) => {
+        if (!append) userTeamsList.innerHTML = "";
 
-        if (teams.length === 0) {
+        // Si venim de "Carregar més", traiem el botó antic
+        const oldMoreBtn = document.getElementById("load-more-teams-btn");
+        if (oldMoreBtn) oldMoreBtn.remove();
+
+        if (!append && teams.length === 0) {
             // Estat Buit
             userTeamsList.innerHTML = `
             <div class="empty-state">
@@ -1114,7 +1130,7 @@ loginBtn.addEventListener("click", () => {
                 const rawDate = t.updated_at || t.created_at;
 
                 const dateStr = rawDate ? new Date(rawDate).toLocaleDateString() : "Data desconeguda";
-                const memberCount = t.team_members ? t.team_members.length : 0;
+                const memberCount = t.member_ids ? t.member_ids.length : 0;
 
                 // HTML amb DOS botons
                 div.innerHTML = `
@@ -1142,8 +1158,18 @@ loginBtn.addEventListener("click", () => {
                 loadBtn.addEventListener("click", async () => {
                     const isConfirmed = await showConfirm(`Vols carregar "${t.team_name}"? Es perdrà l'equip actual no guardat.`);
                     if (isConfirmed) {
-                        await loadTeamToEditor(t);
-                        profileModal.style.display = "none";
+                        try {
+                            // El llistat només porta el resum: ara demanem l'equip complet
+                            const res = await fetch(`${API_BASE}/teams/${t.id}?hydrate=true`);
+                            if (!res.ok) throw new Error("Error recuperant l'equip");
+                            const fullTeam = await res.json();
+
+                            await loadTeamToEditor(fullTeam);
+                            profileModal.style.display = "none";
+                        } catch (err) {
+                            showNotification("No s'ha pogut carregar l'equip", 'error');
+                            console.error(err);
+                        }
                     }
                 });
 
@@ -1179,6 +1205,29 @@ loginBtn.addEventListener("click", () => {
 
                 userTeamsList.appendChild(div);
             });
+
+            // Hi ha més equips: botó per demanar la pàgina següent
+            if (nextCursor) {
+                const moreBtn = document.createElement("button");
+                moreBtn.id = "load-more-teams-btn";
+                moreBtn.className = "ui-btn small";
+                moreBtn.style.cssText = "display:block; margin:8px auto 0;";
+                moreBtn.textContent = "Carregar més equips";
+
+                moreBtn.addEventListener("click", async () => {
+                    moreBtn.disabled = true;
+                    try {
+                        const page = await fetchUserTeamsPage(localStorage.getItem("pokeUser"), nextCursor);
+                        renderUserTeams(page.results, page.next_cursor, true);
+                    } catch (err) {
+                        moreBtn.disabled = false;
+                        showNotification("No s'han pogut carregar més equips", 'error');
+                        console.error(err);
+                    }
+                });
+
+                userTeamsList.appendChild(moreBtn);
+            }
         }
     };
 
@@ -1388,6 +1437,7 @@ checkLoginStatus();
             description: "Creat amb PokeBuilder Web",
             team_members: activePokemons.map(p => ({
                 base_pokemon: p.name,
+                pokedex_id: p.pokedex_id || null,
                 nickname: p.nickname || p.name,
 
                 // AQUI ESTÀ LA CLAU: Enviem el que hem editat a edit.js
@@ -6,6 +6,11 @@ Aquest paquet conté el sistema de recomanació intel·ligent per a PokeBuilder.
 
 Mòduls:
     - recommendation_engine: Motor principal de recomanació
+    - team_completion: Compleció d'equips de 6 (cerca en feix)
+    - damage_engine: Càlcul de dany en lot amb els sets dels equips
+    - matchup_matrix: Matriu d'enfrontaments precalculada del roster
+    - team_simulation: Simulació Monte Carlo d'enfrontaments entre equips
+    - format_rules: Llistes de prohibits per format compilades en memòria
     - ai_service: Servei que connecta amb Elasticsearch
 
 Ús:
@@ -23,9 +28,15 @@ from .recommendation_engine import (
     Pokemon,
     TypeEffectiveness,
     Recommendation,
+    TeamState,
+    TeamAnalysis,
     format_recommendation_text
 )
 
+from .roster import Roster
+from .damage_engine import DamageEngine, BattleSet, Move
+from .matchup_matrix import MatchupMatrix
+from .format_rules import FormatRegistry, FormatRules
 from .ai_service import AIService
 
 __all__ = [
@@ -33,6 +44,15 @@ __all__ = [
     'Pokemon',
     'TypeEffectiveness',
     'Recommendation',
+    'TeamState',
+    'TeamAnalysis',
     'format_recommendation_text',
+    'Roster',
+    'DamageEngine',
+    'BattleSet',
+    'Move',
+    'MatchupMatrix',
+    'FormatRegistry',
+    'FormatRules',
     'AIService'
 ]
@@ -9,15 +9,141 @@ Autor: PokeBuilder Team
 Data: Novembre 2024
 """
 
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 from elasticsearch import Elasticsearch
+
+# Mòduls compartits amb el backend i els scripts d'ingesta (common/ a l'arrel del repositori)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
 from recommendation_engine import (
+    STAT_NAMES,
     RecommendationEngine,
     Pokemon,
     TypeEffectiveness,
     Recommendation,
+    TeamAnalysis,
     format_recommendation_text
 )
+from team_completion import TeamCompleter
+from parallel_scoring import ParallelScorer, roster_fingerprint
+from roster import Roster
+from damage_engine import BattleSet, DamageEngine, Move, nature_modifiers, slug
+from matchup_matrix import DEFAULT_MATRIX_PATH, MatchupMatrix, data_fingerprint
+from team_simulation import ROLLOUT_CHUNK, build_matchup_table, simulate
+from format_rules import FormatRegistry, FormatRules
+
+# Per sota d'aquest nombre d'equips, l'anàlisi en lot es fa al mateix procés
+# (arrencar i alimentar el pool de processos costaria més que l'anàlisi)
+BATCH_PARALLEL_MIN_TEAMS = 64
+
+# Processos per puntuar el roster a les recomanacions. Per defecte 1: sense pool, tot al mateix procés
+SCORING_WORKERS = int(os.environ.get("POKEBUILDER_SCORING_WORKERS", "1"))
+
+# Segons que es reutilitza el roster carregat d'Elasticsearch
+ROSTER_CACHE_TTL = 300
+
+# Pokémon que entren a la matriu d'enfrontaments (tot el roster, prohibits inclosos)
+MATCHUP_ROSTER_LIMIT = 2000
+
+
+def _format_team_analysis(analysis: TeamAnalysis, team_size: int) -> Dict:
+    """
+    Converteix l'anàlisi intern del motor (màscares de tipus) al format que
+    retorna l'API.
+    """
+    analysis = analysis.to_dict()
+    return {
+        "team_size": team_size,
+        "weaknesses": analysis['weaknesses'],
+        "resistances": analysis['resistances'],
+        "immunities": analysis['immunities'],
+        "type_coverage": analysis['offensive_types'],
+        "avg_stats": analysis['avg_stats'],
+        "present_types": analysis['present_types']
+    }
+
+
+def _format_recommendation(rec: Recommendation) -> Dict:
+    """Converteix una recomanació al format que retorna l'API."""
+    return {
+        "pokedex_id": rec.pokemon.pokedex_id,
+        "name": rec.pokemon.name,
+        "types": rec.pokemon.types,
+        "sprite_url": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{rec.pokemon.pokedex_id}.png",
+        "stats": rec.pokemon.stats,
+        "score": round(rec.score, 2),
+        "scores": {
+            "defensive": round(rec.defensive_score, 2),
+            "offensive": round(rec.offensive_score, 2),
+            "diversity": round(rec.diversity_score, 2),
+            "stats": round(rec.stats_score, 2)
+        },
+        "reasoning": rec.reasoning,
+        "warnings": rec.warnings, # (NOVETAT) Afegit camp d'avisos
+        "explanation": format_recommendation_text(rec)
+    }
+
+
+def _empty_team_analysis() -> Dict:
+    return {
+        "team_size": 0,
+        "weaknesses": {},
+        "resistances": {},
+        "immunities": [],
+        "type_coverage": [],
+        "avg_stats": {}
+    }
+
+
+def _score_team(engine: RecommendationEngine, team: List[Pokemon]) -> Dict:
+    """Anàlisi i vulnerabilitat d'un equip ja resolt."""
+    if not team:
+        return {
+            "analysis": _empty_team_analysis(),
+            "vulnerability": engine.get_team_vulnerability([])
+        }
+    return {
+        "analysis": _format_team_analysis(engine._analyze_team(team), len(team)),
+        "vulnerability": engine.get_team_vulnerability(team)
+    }
+
+
+# --- Treballadors del pool de processos (anàlisi en lot) ---
+# Cada procés construeix el seu motor una sola vegada a partir de la taula de tipus.
+_worker_engine = None
+
+
+def _init_batch_worker(type_chart: Dict[str, TypeEffectiveness]):
+    global _worker_engine
+    _worker_engine = RecommendationEngine(type_chart)
+
+
+def _score_teams_chunk(teams: List[List[Pokemon]]) -> List[Dict]:
+    return [_score_team(_worker_engine, team) for team in teams]
+
+
+class _Lease:
+    """
+    Recurs compartit entre peticions (ParallelScorer, MatchupMatrix) amb
+    comptador d'ús. Quan es substitueix es retira, i només es tanca quan
+    l'ha deixat l'última petició que l'estava fent servir.
+    """
+
+    __slots__ = ('resource', 'fingerprint', 'source', 'users', 'retired')
+
+    def __init__(self, resource, fingerprint: str, source):
+        self.resource = resource
+        self.fingerprint = fingerprint  # Contingut de les dades amb què s'ha construït
+        self.source = source            # Últim roster (objecte) comprovat contra l'empremta
+        self.users = 0
+        self.retired = False
 
 
 class AIService:
@@ -25,12 +151,14 @@ class AIService:
     Servei que gestiona les recomanacions d'IA connectant-se a Elasticsearch.
     """
 
-    def __init__(self, es_host: str = "http://localhost:9200"):
+    def __init__(self, es_host: str = "http://localhost:9200", scoring_workers: Optional[int] = None):
         """
         Inicialitza el servei d'IA.
         
         Args:
             es_host: URL del servidor Elasticsearch
+            scoring_workers: Processos per puntuar candidats (per defecte,
+                POKEBUILDER_SCORING_WORKERS o 1 = sense paral·lelisme)
         """
         self.es = Elasticsearch(hosts=[es_host], verify_certs=False)
         self.type_chart = {}
@@ -42,6 +170,41 @@ class AIService:
         # Inicialitzar motor de recomanació
         self.engine = RecommendationEngine(self.type_chart)
 
+        # Pool de processos per a l'anàlisi en lot (es crea el primer cop que cal)
+        self._process_pool = None
+        self._process_workers = os.cpu_count() or 1
+
+        # Puntuació paral·lela del roster (memòria compartida), si està activada
+        self._scoring_workers = SCORING_WORKERS if scoring_workers is None else scoring_workers
+        self._scorer = None     # _Lease del ParallelScorer actual
+
+        # Protegeix la substitució del scorer i de la matriu mentre hi ha peticions en curs,
+        # i la creació del pool de processos
+        self._lease_lock = threading.Lock()
+
+        # Rosters en memòria: (limit, consulta o format) → (moment de càrrega, Roster, roster complet d'origen)
+        self._rosters = {}
+
+        # Llistes de prohibits per format (scripts_bd/ban_lists.json), compilades
+        try:
+            self.format_rules = FormatRegistry.load()
+            print(f"✓ Carregades les regles de {len(self.format_rules.formats)} formats")
+        except (OSError, ValueError) as e:
+            print(f"⚠ No s'han pogut carregar les llistes de prohibits: {e}")
+            self.format_rules = None
+
+        # Càlcul de dany (natures de l'índex 'natures'; moviments en memòria a mesura que es demanen)
+        self.damage_engine = DamageEngine(self.engine.type_profiles, self._load_natures())
+        self._moves = {}
+
+        # Matriu d'enfrontaments precalculada (build_matchup_matrix.py), es carrega el primer cop que cal
+        self._matchup_path = DEFAULT_MATRIX_PATH
+        self._matchups = None   # _Lease de la MatchupMatrix actual (None si no n'hi ha o és antiga)
+        self._matchups_source = None
+
+        # Pokémon prohibits per format: format → (moment de càrrega, IDs)
+        self._banned = {}
+
     def _load_type_chart(self):
         """
         Carrega la informació de tipus des d'Elasticsearch.
@@ -74,6 +237,189 @@ class AIService:
             print(f"✗ Error carregant tipus: {e}")
             raise
 
+    def _load_natures(self) -> Dict[str, tuple]:
+        """
+        Carrega les natures des d'Elasticsearch com a multiplicadors
+        d'estadística. Si no hi són, el càlcul de dany les tracta com a neutres.
+        """
+        natures = {}
+        try:
+            response = self.es.search(index="natures", body={"query": {"match_all": {}}, "size": 100})
+            for hit in response['hits']['hits']:
+                data = hit['_source']
+                natures[data['name']] = nature_modifiers(data.get('increased_stat'), data.get('decreased_stat'))
+            print(f"✓ Carregades {len(natures)} natures")
+        except Exception as e:
+            print(f"⚠ No s'han pogut carregar les natures: {e}")
+        return natures
+
+    def get_moves(self, names: List[str]) -> Dict[str, Optional[Move]]:
+        """
+        Moviments per nom (tal com estan als equips, p. ex. "Heat Wave").
+        Els que no s'han demanat mai es llegeixen amb una sola consulta i es
+        guarden en memòria.
+
+        Returns:
+            Diccionari {nom en format PokéAPI: Move}; None per als moviments
+            d'estat o desconeguts
+        """
+        keys = {slug(name) for name in names if name}
+        pending = [key for key in keys if key not in self._moves]
+
+        if pending:
+            try:
+                response = self.es.search(
+                    index="moves",
+                    body={"query": {"terms": {"name.keyword": pending}}, "size": len(pending)}
+                )
+                for hit in response['hits']['hits']:
+                    self._moves[hit['_source']['name']] = Move.from_source(hit['_source'])
+                for key in pending:
+                    self._moves.setdefault(key, None)
+            except Exception as e:
+                print(f"Error obtenint moviments {pending}: {e}")
+
+        return {key: self._moves.get(key) for key in keys}
+
+    def build_battle_sets(self, members: List[Dict]) -> List[BattleSet]:
+        """
+        Sets de combat dels membres d'un equip (documents de l'índex 'teams'
+        amb el 'pokedex_id' ja resolt). Els membres sense Pokémon conegut
+        s'ometen.
+        """
+        members = [member for member in members if member.get("pokedex_id") is not None]
+        pokemon = {p.pokedex_id: p for p in self.get_pokemon_by_ids([m["pokedex_id"] for m in members])}
+        moves = self.get_moves([name for member in members for name in member.get("moves") or []])
+
+        sets = []
+        for member in members:
+            base = pokemon.get(member["pokedex_id"])
+            if base is None:
+                continue
+            member_moves = [moves.get(slug(name)) for name in member.get("moves") or []]
+            sets.append(self.damage_engine.build_set(
+                base,
+                evs=member.get("evs"),
+                nature=member.get("nature"),
+                moves=[move for move in member_moves if move is not None],
+                item=member.get("item"),
+                ability=member.get("ability"),
+                tera_type=member.get("tera_type")
+            ))
+        return sets
+
+    def team_damage_report(self, members: List[Dict], top_n: int = 5, terastallized: bool = False) -> Dict:
+        """
+        Dany real de cada membre de l'equip (amb el seu set) contra tot el
+        roster (sets genèrics, vegeu DamageEngine.default_set).
+
+        Args:
+            members: Membres de l'equip amb 'pokedex_id'
+            top_n: Objectius a mostrar per membre
+            terastallized: Si és True, els membres ataquen terastal·litzats
+
+        Returns:
+            Diccionari amb, per a cada membre, els KOs d'un i de dos cops i
+            els objectius als quals fa més dany
+        """
+        attackers = self.build_battle_sets(members)
+        roster = self.get_all_pokemon(exclude_banned=True)
+        defenders = [self.damage_engine.default_set(pokemon) for pokemon in roster]
+        matrix = self.damage_engine.damage_matrix(attackers, defenders, terastallized)
+
+        report = []
+        for a, attacker in enumerate(attackers):
+            expected = matrix.best_against_all(a)
+            targets = sorted(range(len(defenders)), key=expected.__getitem__, reverse=True)[:top_n]
+            ohko, twohko = matrix.ko_counts(a)
+
+            best_targets = []
+            for d in targets:
+                move, low, high = matrix.best(a, d)
+                if move is None:
+                    continue
+                best_targets.append({
+                    "pokedex_id": roster[d].pokedex_id,
+                    "name": roster[d].name,
+                    "move": move.name,
+                    "min_percent": round(low * 100, 1),
+                    "max_percent": round(high * 100, 1)
+                })
+
+            report.append({
+                "pokedex_id": attacker.pokemon.pokedex_id,
+                "name": attacker.pokemon.name,
+                "stats": dict(zip(STAT_NAMES, attacker.stats)),
+                "moves": [move.name for move in attacker.moves],
+                "ohko_count": ohko,
+                "twohko_count": twohko,
+                "best_targets": best_targets
+            })
+
+        return {"members": report, "roster_size": len(defenders), "level": self.damage_engine.level}
+
+    def simulate_team_matchup(
+            self,
+            members: List[Dict],
+            opponent_members: List[Dict],
+            rollouts: int = 2000,
+            seed: Optional[int] = None,
+            terastallized: bool = False
+    ) -> Dict:
+        """
+        Probabilitat que un equip guanyi un altre, amb partides Monte Carlo
+        (team_simulation.py) repartides entre el pool de processos.
+
+        Args:
+            members: Membres de l'equip (documents de l'índex 'teams' amb 'pokedex_id')
+            opponent_members: Membres de l'equip rival
+            rollouts: Nombre de partides
+            seed: Llavor (None = a l'atzar; es retorna la utilitzada per poder repetir-la)
+            terastallized: Si és True, els membres amb tipus Tera lluiten terastal·litzats
+
+        Returns:
+            Diccionari amb la probabilitat de victòria, l'interval de
+            confiança, els resultats de les partides i les amenaces clau
+        """
+        team = self.build_battle_sets(members)
+        opponents = self.build_battle_sets(opponent_members)
+        if not team or not opponents:
+            raise ValueError("Els dos equips han de tenir almenys un Pokémon conegut")
+
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+
+        table = build_matchup_table(self.damage_engine, team, opponents, terastallized)
+        parallel = self._process_workers > 1 and rollouts > ROLLOUT_CHUNK
+        result = simulate(table, rollouts, seed, self._get_process_pool() if parallel else None)
+
+        kos, opponent_kos = result["kos"]
+        low, high = result["confidence_interval"]
+
+        def ko_summary(battle_sets, counts):
+            entries = [
+                {
+                    "pokedex_id": battle_set.pokemon.pokedex_id,
+                    "name": battle_set.pokemon.name,
+                    "kos_per_game": round(count / rollouts, 3)
+                }
+                for battle_set, count in zip(battle_sets, counts)
+            ]
+            return sorted(entries, key=lambda entry: entry["kos_per_game"], reverse=True)
+
+        return {
+            "win_probability": round(result["win_rate"], 4),
+            "confidence_interval": {"low": round(low, 4), "high": round(high, 4), "level": 0.95},
+            "wins": result["wins"],
+            "losses": result["losses"],
+            "draws": result["draws"],
+            "rollouts": rollouts,
+            "seed": seed,
+            # Membres rivals que fan més KOs a l'equip
+            "key_threats": ko_summary(opponents, opponent_kos),
+            "members": ko_summary(team, kos)
+        }
+
     def get_pokemon_by_ids(self, pokedex_ids: List[int]) -> List[Pokemon]:
         """
         Obté Pokémon per IDs des d'Elasticsearch.
@@ -104,13 +450,7 @@ class AIService:
 
             for hit in response['hits']['hits']:
                 data = hit['_source']
-                pokemon = Pokemon(
-                    pokedex_id=data['pokedex_id'],
-                    name=data['name'],
-                    types=data['types'],
-                    stats=data['stats']
-                )
-                pokemon_map[data['pokedex_id']] = pokemon
+                pokemon_map[data['pokedex_id']] = Pokemon.from_source(data)
 
             # Reconstruir la llista en l'ordre original sol·licitat
             for pid in pokedex_ids:
@@ -124,54 +464,100 @@ class AIService:
 
         return pokemon_list
 
-    def get_all_pokemon(self, limit: int = 1000, exclude_banned: bool = True) -> List[Pokemon]:
+    def get_format_rules(self, format_name: Optional[str] = None) -> Optional[FormatRules]:
+        """
+        Regles compilades d'un format (nom o àlies; None = format principal).
+        Retorna None si les llistes de prohibits no s'han pogut carregar.
+
+        Raises:
+            ValueError: Si el format és desconegut
+        """
+        if self.format_rules is None:
+            return None
+        rules = self.format_rules.resolve(format_name)
+        if rules is None:
+            raise ValueError(f"Format desconegut: {format_name}")
+        return rules
+
+    def get_all_pokemon(
+            self,
+            limit: int = 1000,
+            exclude_banned: bool = True,
+            format_name: Optional[str] = None
+    ) -> Roster:
         """
         Obté tots els Pokémon disponibles.
+
+        El roster es guarda en memòria durant ROSTER_CACHE_TTL segons, de
+        manera que les recomanacions seguides no el tornen a llegir ni a
+        construir. Els prohibits es descarten amb les regles compilades del
+        format (format_rules.py) sobre el roster complet, sense dependre del
+        camp 'is_banned' de l'índex.
         
         Args:
             limit: Nombre màxim de Pokémon a retornar
+            exclude_banned: Si és True, sense els prohibits del format
+            format_name: Format (nom o àlies); per defecte, el principal
             
         Returns:
-            Llista de tots els Pokémon
+            Roster amb tots els Pokémon (es comporta com una llista)
         """
-        try:
-            query = {"match_all": {}}
-
-            if exclude_banned:
-                query = {
-                    "term": {
-                        "is_banned": False
-                    }
-                }
+        rules = self.get_format_rules(format_name) if exclude_banned else None
+        if exclude_banned and rules is None:
+            # Sense llistes compilades: filtre de l'índex
+            return self._load_roster(limit, self._banned_query(format_name))
+
+        if rules is None:
+            return self._load_roster(limit, None)
+
+        key = (limit, rules.name)
+        full = self._load_roster(max(limit, MATCHUP_ROSTER_LIMIT), None)
+        cached = self._rosters.get(key)
+        if cached is not None and cached[2] is full:
+            return cached[1]
+
+        allowed = full.where(lambda pokedex_id: not rules.bans_species(pokedex_id))
+        if len(allowed) > limit:
+            kept = set(allowed.ids[:limit])
+            allowed = allowed.where(kept.__contains__)
+        self._rosters[key] = (time.monotonic(), allowed, full)
+        return allowed
+
+    def _load_roster(self, limit: int, query: Optional[Dict]) -> Roster:
+        key = (limit, repr(query))
+        cached = self._rosters.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ROSTER_CACHE_TTL:
+            return cached[1]
 
+        try:
             response = self.es.search(
                 index="pokemon",
                 body={
-                    "query": query,
+                    "query": query or {"match_all": {}},
                     "size": limit
                 }
             )
 
-            pokemon_list = []
-            for hit in response['hits']['hits']:
-                data = hit['_source']
-                pokemon_list.append(Pokemon(
-                    pokedex_id=data['pokedex_id'],
-                    name=data['name'],
-                    types=data['types'],
-                    stats=data['stats']
-                ))
-
-            return pokemon_list
+            roster = Roster.from_sources(hit['_source'] for hit in response['hits']['hits'])
+            self._rosters[key] = (time.monotonic(), roster, None)
+            return roster
 
         except Exception as e:
             print(f"Error obtenint tots els Pokémon: {e}")
-            return []
+            return Roster()
+
+    @staticmethod
+    def _banned_query(format_name: Optional[str]) -> Dict:
+        """Consulta dels Pokémon permesos segons els camps de l'índex (si no hi ha regles compilades)."""
+        if format_name:
+            return {"bool": {"must_not": {"terms": {"banned_formats": [format_name.lower()]}}}}
+        return {"term": {"is_banned": False}}
 
     def recommend_pokemon(
             self,
             team_ids: List[int],
-            top_n: int = 5
+            top_n: int = 5,
+            format_name: Optional[str] = None
     ) -> List[Dict]:
         """
         Genera recomanacions de Pokémon per a un equip.
@@ -179,6 +565,7 @@ class AIService:
         Args:
             team_ids: Llista d'IDs dels Pokémon actuals a l'equip
             top_n: Nombre de recomanacions a retornar
+            format_name: Format els prohibits del qual no es recomanen (per defecte, el principal)
             
         Returns:
             Llista de diccionaris amb recomanacions
@@ -190,33 +577,58 @@ class AIService:
             return []
 
         # Obtenir tots els Pokémon disponibles
-        all_pokemon = self.get_all_pokemon(exclude_banned=True)
+        all_pokemon = self.get_all_pokemon(exclude_banned=True, format_name=format_name)
 
-        # Generar recomanacions
-        recommendations = self.engine.recommend(current_team, all_pokemon, top_n)
+        # Generar recomanacions (en paral·lel si està configurat)
+        with self._scorer_for(all_pokemon) as scorer:
+            if scorer is not None:
+                recommendations = scorer.recommend(current_team, top_n)
+            else:
+                recommendations = self.engine.recommend(current_team, all_pokemon, top_n)
 
         # Convertir a format de diccionari per a l'API
-        result = []
-        for rec in recommendations:
-            result.append({
-                "pokedex_id": rec.pokemon.pokedex_id,
-                "name": rec.pokemon.name,
-                "types": rec.pokemon.types,
-                "sprite_url": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{rec.pokemon.pokedex_id}.png",
-                "stats": rec.pokemon.stats,
-                "score": round(rec.score, 2),
-                "scores": {
-                    "defensive": round(rec.defensive_score, 2),
-                    "offensive": round(rec.offensive_score, 2),
-                    "diversity": round(rec.diversity_score, 2),
-                    "stats": round(rec.stats_score, 2)
-                },
-                "reasoning": rec.reasoning,
-                "warnings": rec.warnings, # (NOVETAT) Afegit camp d'avisos
-                "explanation": format_recommendation_text(rec)
+        return [_format_recommendation(rec) for rec in recommendations]
+
+    def complete_team(
+            self,
+            team_ids: List[int],
+            top_k: int = 3,
+            time_budget: float = 1.0,
+            format_name: Optional[str] = None
+    ) -> Dict:
+        """
+        Busca els millors equips complets de 6 que contenen els membres donats.
+
+        Args:
+            team_ids: IDs dels membres fixos (0-5)
+            top_k: Nombre d'equips a retornar
+            time_budget: Segons màxims de cerca
+            format_name: Format els prohibits del qual no es proposen (per defecte, el principal)
+
+        Returns:
+            Diccionari amb els equips proposats i les estadístiques de la cerca
+        """
+        fixed = self.get_pokemon_by_ids(team_ids)
+        candidates = self.get_all_pokemon(exclude_banned=True, format_name=format_name)
+
+        completer = TeamCompleter(self.engine, candidates)
+        completions, stats = completer.search(
+            fixed,
+            top_k=top_k,
+            time_budget=time_budget
+        )
+
+        teams = []
+        for completion in completions:
+            teams.append({
+                "score": round(completion.score, 2),
+                "team_ids": [p.pokedex_id for p in completion.members],
+                "fixed": [{"pokedex_id": p.pokedex_id, "name": p.name, "types": p.types} for p in fixed],
+                # Explicació de cada membre afegit (en l'ordre en què s'ha triat)
+                "added": [_format_recommendation(rec) for rec in completion.added]
             })
 
-        return result
+        return {"teams": teams, "search": stats}
 
     def analyze_team(self, team_ids: List[int]) -> Dict:
         """
@@ -231,28 +643,294 @@ class AIService:
         current_team = self.get_pokemon_by_ids(team_ids)
 
         if not current_team:
-            return {
-                "team_size": 0,
-                "weaknesses": {},
-                "resistances": {},
-                "immunities": [],
-                "type_coverage": [],
-                "avg_stats": {}
-            }
+            return _empty_team_analysis()
 
         # Utilitzar el mètode d'anàlisi del motor
         analysis = self.engine._analyze_team(current_team)
 
+        return _format_team_analysis(analysis, len(current_team))
+
+    def analyze_teams_batch(self, teams: List[List[int]]) -> List[Dict]:
+        """
+        Analitza molts equips d'una sola vegada (anàlisi + vulnerabilitat).
+
+        Els Pokémon de tots els equips es dedupliquen i es llegeixen amb una
+        única consulta. Si hi ha prou equips, la puntuació es reparteix entre
+        un pool de processos.
+
+        Args:
+            teams: Llista d'equips, cadascun com a llista d'IDs de Pokédex
+
+        Returns:
+            Llista (en el mateix ordre) amb {"analysis", "vulnerability"} per equip
+        """
+        if not teams:
+            return []
+
+        # 1. Unió de tots els membres: cada Pokémon es llegeix una sola vegada
+        unique_ids = sorted({pid for team_ids in teams for pid in team_ids})
+        pokemon_map = {p.pokedex_id: p for p in self.get_pokemon_by_ids(unique_ids)}
+        resolved_teams = [
+            [pokemon_map[pid] for pid in team_ids if pid in pokemon_map]
+            for team_ids in teams
+        ]
+
+        # 2. Pocs equips: no val la pena sortir del procés
+        if len(resolved_teams) < BATCH_PARALLEL_MIN_TEAMS or self._process_workers < 2:
+            return [_score_team(self.engine, team) for team in resolved_teams]
+
+        # 3. Molts equips: trossos repartits entre els processos
+        pool = self._get_process_pool()
+        chunk_size = max(1, -(-len(resolved_teams) // (self._process_workers * 4)))
+        chunks = [resolved_teams[i:i + chunk_size] for i in range(0, len(resolved_teams), chunk_size)]
+
+        results = []
+        for chunk_result in pool.map(_score_teams_chunk, chunks):
+            results.extend(chunk_result)
+        return results
+
+    @contextmanager
+    def _scorer_for(self, roster: List[Pokemon]):
+        """
+        ParallelScorer del roster (None si la puntuació paral·lela està
+        desactivada), reservat mentre dura el bloc `with`.
+
+        Quan el roster es torna a carregar (cada ROSTER_CACHE_TTL) només es
+        refà el scorer si el contingut ha canviat. L'anterior es retira i es
+        tanca quan acaben les peticions que l'estaven fent servir, de manera
+        que cap petició no fa servir un pool aturat ni memòria alliberada.
+        """
+        if self._scoring_workers <= 1 or not roster:
+            yield None
+            return
+
+        retired = None
+        with self._lease_lock:
+            lease = self._scorer
+            if lease is None or lease.source is not roster:
+                fingerprint = roster_fingerprint(roster)
+                if lease is None or lease.fingerprint != fingerprint:
+                    retired = lease
+                    scorer = ParallelScorer(self.engine, roster, self._scoring_workers)
+                    lease = self._scorer = _Lease(scorer, scorer.fingerprint, roster)
+                lease.source = roster
+            lease.users += 1
+        self._retire(retired)
+
+        try:
+            yield lease.resource
+        finally:
+            self._release(lease)
+
+    @contextmanager
+    def _matchup_matrix(self):
+        """
+        Matriu d'enfrontaments guardada i el roster complet, reservats
+        mentre dura el bloc `with`: (matriu, roster), o (None, roster) si no
+        hi ha matriu o no correspon a les dades actuals (cal executar
+        build_matchup_matrix.py).
+
+        L'empremta es comprova contra el roster complet cada vegada que
+        aquest es torna a carregar. Si la matriu és antiga, es retira i es
+        tanca quan l'han deixat totes les peticions que la fan servir.
+        """
+        roster = self.get_all_pokemon(limit=MATCHUP_ROSTER_LIMIT, exclude_banned=False)
+        retired = None
+        with self._lease_lock:
+            if roster is not self._matchups_source:
+                self._matchups_source = roster
+                fingerprint = data_fingerprint(roster, self.type_chart, self.damage_engine)
+                if self._matchups is None:
+                    try:
+                        matrix = MatchupMatrix(self._matchup_path)
+                        print(f"✓ Carregada la matriu d'enfrontaments ({len(matrix)} Pokémon)")
+                        self._matchups = _Lease(matrix, matrix.fingerprint, roster)
+                    except (OSError, ValueError) as e:
+                        print(f"⚠ Matriu d'enfrontaments no disponible: {e}")
+                if self._matchups is not None and self._matchups.fingerprint != fingerprint:
+                    print("⚠ La matriu d'enfrontaments no correspon a les dades actuals (cal tornar-la a generar)")
+                    retired, self._matchups = self._matchups, None
+            lease = self._matchups
+            if lease is not None:
+                lease.users += 1
+        self._retire(retired)
+
+        if lease is None:
+            yield None, roster
+            return
+        try:
+            yield lease.resource, roster
+        finally:
+            self._release(lease)
+
+    def _retire(self, lease: Optional[_Lease]):
+        """Retira un recurs substituït; es tanca ara si ningú no el fa servir."""
+        if lease is None:
+            return
+        with self._lease_lock:
+            lease.retired = True
+            idle = lease.users == 0
+        if idle:
+            lease.resource.close()
+
+    def _release(self, lease: _Lease):
+        with self._lease_lock:
+            lease.users -= 1
+            idle = lease.retired and lease.users == 0
+        if idle:
+            lease.resource.close()
+
+    def matchup(self, attacker_id: int, defender_id: int) -> Optional[Dict]:
+        """
+        Enfrontament entre dos Pokémon, amb la matriu d'enfrontaments.
+
+        Returns:
+            Els dos Pokémon i la puntuació (de -1 a 1, positiva si guanya
+            l'atacant; None si algun no és a la matriu); None si no hi ha matriu
+        """
+        with self._matchup_matrix() as (matchups, roster):
+            if matchups is None:
+                return None
+            score = matchups.score(attacker_id, defender_id)
+            return {
+                "attacker": self._matchup_entry(roster, attacker_id),
+                "defender": self._matchup_entry(roster, defender_id),
+                "score": None if score is None else round(score, 3)
+            }
+
+    def get_banned_ids(self, format_name: Optional[str] = None) -> set:
+        """
+        IDs dels Pokémon prohibits en un format (None = format principal),
+        a partir de les regles compilades. Si no s'han pogut carregar, es
+        consulten els camps 'banned_formats'/'is_banned' de l'índex.
+        """
+        rules = self.get_format_rules(format_name)
+        if rules is not None:
+            return set(rules.species_ids)
+
+        key = format_name.lower() if format_name else None
+        cached = self._banned.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ROSTER_CACHE_TTL:
+            return cached[1]
+
+        query = {"terms": {"banned_formats": [key]}} if key else {"term": {"is_banned": True}}
+        try:
+            response = self.es.search(
+                index="pokemon",
+                body={"query": query, "_source": ["pokedex_id"], "size": MATCHUP_ROSTER_LIMIT}
+            )
+            banned = {hit['_source']['pokedex_id'] for hit in response['hits']['hits']}
+        except Exception as e:
+            print(f"Error obtenint els Pokémon prohibits ({key or 'format principal'}): {e}")
+            return set()
+
+        self._banned[key] = (time.monotonic(), banned)
+        return banned
+
+    def _matchup_entry(self, roster: Roster, pokedex_id: int) -> Dict:
+        pokemon = roster.get(pokedex_id)
         return {
-            "team_size": len(current_team),
-            "weaknesses": analysis['weaknesses'],
-            "resistances": analysis['resistances'],
-            "immunities": list(analysis['immunities']),
-            "type_coverage": list(analysis['offensive_types']),
-            "avg_stats": analysis['avg_stats'],
-            "present_types": list(analysis['present_types'])
+            "pokedex_id": pokedex_id,
+            "name": pokemon.name if pokemon else None,
+            "types": pokemon.types if pokemon else []
         }
 
+    def find_threats(
+            self,
+            team_ids: List[int],
+            format_name: Optional[str] = None,
+            exclude_ids: Optional[List[int]] = None,
+            top_k: int = 10
+    ) -> Optional[List[Dict]]:
+        """
+        Pokémon que més amenacen un equip, amb la matriu d'enfrontaments.
+
+        Args:
+            team_ids: IDs dels membres de l'equip
+            format_name: Format les prohibicions del qual s'apliquen
+                (None = format principal)
+            exclude_ids: Altres Pokémon a descartar (llista de prohibits pròpia)
+            top_k: Nombre d'amenaces a retornar
+
+        Returns:
+            Llista d'amenaces (puntuació mitjana contra l'equip, membres que
+            guanya i puntuació contra cada membre); None si no hi ha matriu
+        """
+        with self._matchup_matrix() as (matchups, roster):
+            if matchups is None:
+                return None
+
+            excluded = self.get_banned_ids(format_name) | set(exclude_ids or [])
+
+            threats = []
+            for pokedex_id, score, beats in matchups.threats(team_ids, excluded, top_k):
+                threats.append({
+                    **self._matchup_entry(roster, pokedex_id),
+                    "score": round(score, 3),
+                    "beats": beats,
+                    "matchups": {
+                        str(member): round(matchups.score(pokedex_id, member), 3)
+                        for member in team_ids if member in matchups
+                    }
+                })
+            return threats
+
+    def find_counters(
+            self,
+            pokedex_ids: List[int],
+            format_name: Optional[str] = None,
+            exclude_ids: Optional[List[int]] = None,
+            top_k: int = 10
+    ) -> Optional[List[Dict]]:
+        """
+        Millors counters de cada Pokémon, amb la matriu d'enfrontaments.
+
+        Returns:
+            Una entrada per Pokémon amb els seus counters; None si no hi ha matriu
+        """
+        with self._matchup_matrix() as (matchups, roster):
+            if matchups is None:
+                return None
+
+            excluded = self.get_banned_ids(format_name) | set(exclude_ids or [])
+
+            results = []
+            for pokedex_id in pokedex_ids:
+                results.append({
+                    "target": self._matchup_entry(roster, pokedex_id),
+                    "counters": [
+                        {**self._matchup_entry(roster, counter_id), "score": round(score, 3)}
+                        for counter_id, score in matchups.counters(pokedex_id, excluded, top_k)
+                    ]
+                })
+            return results
+
+    def close(self):
+        """
+        Atura els pools de processos i allibera la memòria compartida (el
+        scorer i la matriu es tanquen quan acaben les peticions en curs).
+        """
+        with self._lease_lock:
+            retired = [self._matchups, self._scorer]
+            self._matchups = self._matchups_source = self._scorer = None
+            pool, self._process_pool = self._process_pool, None
+        for lease in retired:
+            self._retire(lease)
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        # Els endpoints síncrons s'executen en fils: sense el lock, dues peticions
+        # simultànies podrien crear un pool cadascuna (i l'altre quedaria obert)
+        with self._lease_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self._process_workers,
+                    initializer=_init_batch_worker,
+                    initargs=(self.type_chart,)
+                )
+            return self._process_pool
+
     def get_team_vulnerability(self, team_ids: List[int]) -> Dict:
         """
         Analitza un equip i retorna la seva vulnerabilitat màxima de tipus.
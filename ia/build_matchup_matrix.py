@@ -0,0 +1,71 @@
+"""
+Job offline que genera la matriu d'enfrontaments del roster.
+
+Llegeix tots els Pokémon (també els prohibits) i la taula de tipus
+d'Elasticsearch, calcula la puntuació de totes les parelles
+(matchup_matrix.compute_matchup_scores) i la guarda a DEFAULT_MATRIX_PATH
+(o a POKEBUILDER_MATCHUP_MATRIX). Si la matriu guardada ja correspon a les
+dades actuals (mateixa empremta), no es torna a calcular.
+
+S'executa com a última etapa de scripts_bd/ingesta_completa.py, o a mà:
+
+Ús:
+    python build_matchup_matrix.py            # només si les dades han canviat
+    python build_matchup_matrix.py --force    # sempre
+"""
+import argparse
+import sys
+import time
+
+from ai_service import AIService, MATCHUP_ROSTER_LIMIT
+from matchup_matrix import (
+    DEFAULT_MATRIX_PATH, compute_matchup_scores, data_fingerprint,
+    stored_fingerprint, write_matchup_matrix
+)
+
+
+def build_matchup_matrix(es_host: str, path: str, force: bool = False) -> bool:
+    """
+    Genera la matriu si no existeix o si les dades han canviat.
+
+    Returns:
+        True si la matriu ha quedat al dia
+    """
+    service = AIService(es_host)
+    try:
+        roster = service.get_all_pokemon(limit=MATCHUP_ROSTER_LIMIT, exclude_banned=False)
+        if not roster:
+            print("✗ No hi ha Pokémon a la base de dades")
+            return False
+
+        fingerprint = data_fingerprint(roster, service.type_chart, service.damage_engine)
+        if not force and stored_fingerprint(path) == fingerprint:
+            print(f"✓ La matriu d'enfrontaments ja està al dia ({len(roster)} Pokémon)")
+            return True
+
+        print(f"Calculant {len(roster)} × {len(roster)} enfrontaments...")
+        start = time.perf_counter()
+        scores = compute_matchup_scores(service.damage_engine, roster)
+        write_matchup_matrix(path, roster.ids, scores, fingerprint)
+        print(f"✓ Matriu guardada a {path} ({len(scores) / 1024:.0f} KB) en {time.perf_counter() - start:.1f} s")
+        return True
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la matriu d'enfrontaments del roster")
+    parser.add_argument("--es-host", default="http://localhost:9200", help="URL d'Elasticsearch")
+    parser.add_argument("--output", default=DEFAULT_MATRIX_PATH, help="Fitxer de la matriu")
+    parser.add_argument("--force", action="store_true", help="Recalcula encara que les dades no hagin canviat")
+    args = parser.parse_args()
+
+    try:
+        return 0 if build_matchup_matrix(args.es_host, args.output, args.force) else 1
+    except Exception as e:
+        print(f"✗ Error generant la matriu d'enfrontaments: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Dades comunes dels tests del motor d'IA (sense Elasticsearch): una taula
+de tipus reduïda i un roster generat amb una llavor fixa.
+"""
+import random
+
+import pytest
+
+from recommendation_engine import Pokemon, RecommendationEngine, TypeEffectiveness
+
+# Multiplicadors d'atac de la taula reduïda (els que no hi són valen x1)
+ATTACKS = {
+    "fire": {"grass": 2, "ice": 2, "steel": 2, "fire": 0.5, "water": 0.5, "dragon": 0.5},
+    "water": {"fire": 2, "ground": 2, "water": 0.5, "grass": 0.5, "dragon": 0.5},
+    "grass": {"water": 2, "ground": 2, "fire": 0.5, "grass": 0.5, "flying": 0.5, "dragon": 0.5, "steel": 0.5},
+    "electric": {"water": 2, "flying": 2, "grass": 0.5, "electric": 0.5, "dragon": 0.5, "ground": 0},
+    "ground": {"fire": 2, "electric": 2, "steel": 2, "grass": 0.5, "flying": 0},
+    "flying": {"grass": 2, "electric": 0.5, "steel": 0.5},
+    "ice": {"grass": 2, "ground": 2, "flying": 2, "dragon": 2, "fire": 0.5, "water": 0.5, "ice": 0.5, "steel": 0.5},
+    "dragon": {"dragon": 2, "steel": 0.5},
+    "steel": {"ice": 2, "fire": 0.5, "water": 0.5, "electric": 0.5, "steel": 0.5}
+}
+STAT_KEYS = ["hp", "attack", "defense", "special_attack", "special_defense", "speed"]
+
+
+@pytest.fixture
+def type_chart():
+    """Taula de tipus en el format que llegeix AIService d'Elasticsearch."""
+    def attackers(defender, multiplier):
+        return [name for name, row in ATTACKS.items() if row.get(defender, 1) == multiplier]
+
+    def defenders(attacker, multiplier):
+        return [name for name, value in ATTACKS[attacker].items() if value == multiplier]
+
+    return {
+        name: TypeEffectiveness(
+            name,
+            attackers(name, 2), attackers(name, 0.5), attackers(name, 0),
+            defenders(name, 2), defenders(name, 0.5), defenders(name, 0)
+        )
+        for name in ATTACKS
+    }
+
+
+@pytest.fixture
+def engine(type_chart):
+    return RecommendationEngine(type_chart)
+
+
+@pytest.fixture
+def pokemon_list():
+    """60 Pokémon amb tipus i estadístiques a l'atzar (sempre els mateixos)."""
+    rng = random.Random(7)
+    types = list(ATTACKS)
+    return [
+        Pokemon.create(
+            pokedex_id,
+            f"pokemon-{pokedex_id}",
+            rng.sample(types, rng.choice([1, 2])),
+            {stat: rng.randint(40, 150) for stat in STAT_KEYS}
+        )
+        for pokedex_id in range(1, 61)
+    ]
@@ -0,0 +1,452 @@
+"""
+Càlcul de dany en lot
+=====================
+
+Els documents d'equip ja porten EVs, natura, objecte, habilitat, tipus
+Tera i moviments. Aquest mòdul els fa servir per calcular dany real en
+lloc de quedar-se amb heurístiques de tipus:
+
+- Estadístiques finals a partir de les estadístiques base, els EVs i la
+  natura (fórmula dels jocs, IVs 31 i nivell 50 per defecte, com a VGC).
+- Rangs de dany (tirada aleatòria de 0.85 a 1.00) de cada moviment contra
+  cada defensor, amb STAB, Tera, efectivitat de tipus (TypeProfileTable) i
+  els objectes i habilitats més habituals que multipliquen el dany.
+
+El càlcul es fa en lot sobre totes les combinacions atacant × moviment ×
+defensor: tot el que només depèn de l'atacant i del moviment (potència,
+estadística d'atac, modificadors) es calcula una vegada per fila, i el
+que depèn del defensor (PS, defensa, especial i multiplicadors de tipus)
+es guarda en columnes `array`. Cada fila és un sol recorregut per les
+columnes dels defensors.
+
+Ús:
+
+    damage = DamageEngine(engine.type_profiles, natures)
+    attackers = [damage.build_set(pokemon, evs=..., nature="Modest", moves=[...])]
+    defenders = [damage.default_set(pokemon) for pokemon in roster]
+    matrix = damage.damage_matrix(attackers, defenders)
+    move, min_pct, max_pct = matrix.best(0, 10)
+"""
+
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from recommendation_engine import (
+    STAT_NAMES, STAT_ATTACK, STAT_DEFENSE, STAT_SPECIAL_ATTACK, STAT_SPECIAL_DEFENSE,
+    Pokemon
+)
+from type_profiles import TYPE_NAMES, TypeProfileTable, type_id
+from common.stats import EV_KEYS, normalize_evs
+
+DEFAULT_LEVEL = 50
+DEFAULT_IV = 31
+
+# Potència dels moviments genèrics amb STAB dels sets per defecte
+DEFAULT_STAB_POWER = 80
+
+# Noms de PokéAPI de les estadístiques (índex 'natures'), en l'ordre de STAT_NAMES
+POKEAPI_STAT_NAMES = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+
+NEUTRAL_NATURE = (1.0,) * len(STAT_NAMES)
+
+STAT_SPEED = STAT_NAMES.index('speed')
+
+PHYSICAL, SPECIAL = 0, 1
+
+# Objectes que multipliquen una estadística: objecte → (estadística, multiplicador)
+ITEM_STAT_MODIFIERS = {
+    'choice-band': (STAT_ATTACK, 1.5),
+    'choice-specs': (STAT_SPECIAL_ATTACK, 1.5),
+    'choice-scarf': (STAT_SPEED, 1.5),
+    'assault-vest': (STAT_SPECIAL_DEFENSE, 1.5),
+    'eviolite': (STAT_DEFENSE, 1.5),   # També Def. Especial (vegeu _apply_item)
+}
+
+# Els modificadors de dany dels jocs són enters sobre 4096 (5324 = x1.3)
+MODIFIER_SCALE = 4096
+
+# Objectes que multipliquen el dany final de tots els moviments
+ITEM_DAMAGE_MODIFIERS = {
+    'life-orb': 5324,
+}
+
+# Modificador de la Cinta Experta (només als cops súper-efectius, x1.2)
+EXPERT_BELT_MODIFIER = 4915
+
+# Objectes que potencien la potència dels moviments d'un tipus (x1.2)
+TYPE_BOOST_MODIFIER = 4915
+TYPE_BOOST_ITEMS = {
+    'silk-scarf': 'normal', 'black-belt': 'fighting', 'sharp-beak': 'flying',
+    'poison-barb': 'poison', 'soft-sand': 'ground', 'hard-stone': 'rock',
+    'silver-powder': 'bug', 'spell-tag': 'ghost', 'metal-coat': 'steel',
+    'charcoal': 'fire', 'mystic-water': 'water', 'miracle-seed': 'grass',
+    'magnet': 'electric', 'twisted-spoon': 'psychic', 'never-melt-ice': 'ice',
+    'dragon-fang': 'dragon', 'black-glasses': 'dark', 'fairy-feather': 'fairy',
+}
+
+# Habilitats que dupliquen l'Atac
+ATTACK_DOUBLING_ABILITIES = {'huge-power', 'pure-power'}
+
+
+def apply_modifier(value: int, modifier: int) -> int:
+    """Aplica un modificador sobre MODIFIER_SCALE com els jocs (arrodonint, amb 0.5 cap avall)."""
+    return (value * modifier + MODIFIER_SCALE // 2 - 1) // MODIFIER_SCALE
+
+
+def slug(name: Optional[str]) -> str:
+    """Nom en el format de PokéAPI ("Heat Wave" → "heat-wave", "King's Shield" → "kings-shield")."""
+    if not name:
+        return ""
+    return "-".join(name.lower().replace("'", "").replace("’", "").replace(".", "").split())
+
+
+@dataclass(frozen=True)
+class Move:
+    """Moviment d'atac (els moviments d'estat no es fan servir per al càlcul)."""
+    __slots__ = ('name', 'type_id', 'category', 'power', 'accuracy')
+
+    name: str
+    type_id: int
+    category: int     # PHYSICAL o SPECIAL
+    power: int
+    accuracy: int     # 0-100 (100 per als que no fallen)
+
+    @classmethod
+    def from_source(cls, data: Dict) -> Optional["Move"]:
+        """Crea el moviment a partir d'un document de l'índex 'moves' (None si no fa dany)."""
+        category = data.get('category')
+        power = data.get('power') or 0
+        if category not in ('physical', 'special') or power <= 0:
+            return None
+        return cls(
+            data['name'],
+            type_id(data['type']),
+            PHYSICAL if category == 'physical' else SPECIAL,
+            int(power),
+            int(data.get('accuracy') or 100)
+        )
+
+    def __reduce__(self):
+        return (Move, (self.name, self.type_id, self.category, self.power, self.accuracy))
+
+
+@dataclass(frozen=True)
+class BattleSet:
+    """
+    Un Pokémon amb el seu set: estadístiques finals (tupla en l'ordre de
+    STAT_NAMES, ja amb EVs, natura i objecte), moviments d'atac, objecte,
+    habilitat i tipus Tera.
+    """
+    __slots__ = ('pokemon', 'stats', 'moves', 'item', 'ability', 'tera_type_id')
+
+    pokemon: Pokemon
+    stats: Tuple[int, ...]
+    moves: Tuple[Move, ...]
+    item: str
+    ability: str
+    tera_type_id: int     # -1 = sense Tera
+
+    def __reduce__(self):
+        return (BattleSet, (self.pokemon, self.stats, self.moves, self.item, self.ability, self.tera_type_id))
+
+    def defensive_type_ids(self, terastallized: bool = False) -> Tuple[int, ...]:
+        if terastallized and self.tera_type_id >= 0:
+            return (self.tera_type_id,)
+        return self.pokemon.type_ids
+
+
+class DamageMatrix:
+    """
+    Resultat de DamageEngine.damage_matrix(): una fila per (atacant,
+    moviment) i una columna per defensor. El dany mínim i màxim es guarda
+    com a fracció dels PS del defensor (1.0 = tots els PS), en dues
+    `array('f')` de files × defensors.
+    """
+
+    __slots__ = ('rows', 'defender_count', 'min_damage', 'max_damage', '_rows_by_attacker')
+
+    def __init__(self, rows: List[Tuple[int, Move]], defender_count: int):
+        self.rows = rows
+        self.defender_count = defender_count
+        self.min_damage = array('f')
+        self.max_damage = array('f')
+        self._rows_by_attacker = {}
+        for row, (attacker, _) in enumerate(rows):
+            self._rows_by_attacker.setdefault(attacker, []).append(row)
+
+    def damage(self, row: int, defender: int) -> Tuple[float, float]:
+        """(mínim, màxim) d'una fila contra un defensor."""
+        position = row * self.defender_count + defender
+        return self.min_damage[position], self.max_damage[position]
+
+    def best(self, attacker: int, defender: int) -> Tuple[Optional[Move], float, float]:
+        """
+        Millor moviment d'un atacant contra un defensor (pel dany mínim,
+        ponderat per la precisió).
+
+        Returns:
+            (moviment, mínim, màxim); (None, 0.0, 0.0) si no té moviments d'atac
+        """
+        best_move, best_min, best_max, best_key = None, 0.0, 0.0, -1.0
+        for row in self._rows_by_attacker.get(attacker, ()):
+            low, high = self.damage(row, defender)
+            move = self.rows[row][1]
+            key = low * move.accuracy
+            if key > best_key:
+                best_move, best_min, best_max, best_key = move, low, high, key
+        return best_move, best_min, best_max
+
+    def best_against_all(self, attacker: int) -> array:
+        """
+        Dany esperat (mitjana del rang × precisió) del millor moviment de
+        l'atacant contra cada defensor.
+        """
+        n = self.defender_count
+        best = [0.0] * n
+        for row in self._rows_by_attacker.get(attacker, ()):
+            accuracy = self.rows[row][1].accuracy / 200
+            start = row * n
+            best = [
+                max(current, (low + high) * accuracy)
+                for current, low, high in zip(
+                    best, self.min_damage[start:start + n], self.max_damage[start:start + n]
+                )
+            ]
+        return array('f', best)
+
+    def ko_counts(self, attacker: int) -> Tuple[int, int]:
+        """Defensors que l'atacant fa KO segur d'un cop i de dos cops (amb el millor moviment)."""
+        ohko = twohko = 0
+        for defender in range(self.defender_count):
+            low = self.best(attacker, defender)[1]
+            if low >= 1.0:
+                ohko += 1
+            elif low >= 0.5:
+                twohko += 1
+        return ohko, twohko
+
+
+class DamageEngine:
+    """
+    Calcula estadístiques finals i rangs de dany en lot.
+    """
+
+    def __init__(
+            self,
+            type_profiles: TypeProfileTable,
+            natures: Optional[Dict[str, Tuple[float, ...]]] = None,
+            level: int = DEFAULT_LEVEL
+    ):
+        """
+        Args:
+            type_profiles: Taula de perfils de tipus del motor de recomanació
+            natures: Diccionari {nom de la natura: 6 multiplicadors en l'ordre de STAT_NAMES}
+                (vegeu nature_modifiers); les natures desconegudes són neutres
+            level: Nivell dels combats (50 a VGC)
+        """
+        self.type_profiles = type_profiles
+        self.natures = natures or {}
+        self.level = level
+        # Part de la fórmula que només depèn del nivell
+        self._level_factor = 2 * level // 5 + 2
+
+    # ------------------------------------------------------------------
+    # Estadístiques i sets
+    # ------------------------------------------------------------------
+    def final_stats(
+            self,
+            base_stats: Sequence[int],
+            evs: Sequence[int] = (0,) * 6,
+            nature: Sequence[float] = NEUTRAL_NATURE,
+            ivs: int = DEFAULT_IV
+    ) -> Tuple[int, ...]:
+        """Estadístiques finals (ordre de STAT_NAMES) amb la fórmula dels jocs."""
+        level = self.level
+        stats = []
+        for i, (base, ev) in enumerate(zip(base_stats, evs)):
+            raw = (2 * base + ivs + ev // 4) * level // 100
+            if i == 0:
+                stats.append(raw + level + 10 if base > 1 else 1)   # Shedinja sempre té 1 PS
+            else:
+                stats.append(int((raw + 5) * nature[i]))
+        return tuple(stats)
+
+    def build_set(
+            self,
+            pokemon: Pokemon,
+            evs: Optional[Dict[str, int]] = None,
+            nature: Optional[str] = None,
+            moves: Iterable[Move] = (),
+            item: Optional[str] = None,
+            ability: Optional[str] = None,
+            tera_type: Optional[str] = None
+    ) -> BattleSet:
+        """
+        Set d'un membre d'equip.
+
+        Args:
+            pokemon: Pokémon base
+            evs: EVs amb les claus dels documents d'equip (EV_KEYS) o els seus àlies
+                ('special_attack', 'special_defense'...), com els envia el frontend
+            nature: Nom de la natura ("Modest" o "modest")
+            moves: Moviments ja resolts (els d'estat s'han de deixar fora)
+            item, ability, tera_type: Tal com estan als documents d'equip
+        """
+        evs = normalize_evs(evs)
+        ev_values = tuple(int(evs.get(key) or 0) for key in EV_KEYS)
+        nature_mods = self.natures.get(slug(nature), NEUTRAL_NATURE)
+        item = slug(item)
+        stats = self._apply_item(self.final_stats(pokemon.base_stats, ev_values, nature_mods), item)
+        return BattleSet(
+            pokemon,
+            stats,
+            tuple(moves),
+            item,
+            slug(ability),
+            type_id(slug(tera_type)) if tera_type else -1
+        )
+
+    def default_set(self, pokemon: Pokemon) -> BattleSet:
+        """
+        Set genèric per als Pokémon del roster, que no tenen set: sense EVs,
+        natura neutra i un moviment de potència DEFAULT_STAB_POWER de cada
+        tipus propi, de la categoria de la seva millor estadística d'atac.
+        """
+        stats = self.final_stats(pokemon.base_stats)
+        base = pokemon.base_stats
+        category = PHYSICAL if base[STAT_ATTACK] >= base[STAT_SPECIAL_ATTACK] else SPECIAL
+        moves = tuple(
+            Move(TYPE_NAMES[tid], tid, category, DEFAULT_STAB_POWER, 100)
+            for tid in pokemon.type_ids
+        )
+        return BattleSet(pokemon, stats, moves, "", "", -1)
+
+    @staticmethod
+    def _apply_item(stats: Tuple[int, ...], item: str) -> Tuple[int, ...]:
+        modifier = ITEM_STAT_MODIFIERS.get(item)
+        if modifier is None:
+            return stats
+        stats = list(stats)
+        stat, multiplier = modifier
+        stats[stat] = int(stats[stat] * multiplier)
+        if item == 'eviolite':
+            stats[STAT_SPECIAL_DEFENSE] = int(stats[STAT_SPECIAL_DEFENSE] * multiplier)
+        return tuple(stats)
+
+    # ------------------------------------------------------------------
+    # Dany
+    # ------------------------------------------------------------------
+    def damage_matrix(
+            self,
+            attackers: Sequence[BattleSet],
+            defenders: Sequence[BattleSet],
+            terastallized: bool = False
+    ) -> DamageMatrix:
+        """
+        Rangs de dany de tots els moviments de tots els atacants contra tots
+        els defensors.
+
+        Args:
+            attackers: Sets atacants
+            defenders: Sets defensors
+            terastallized: Si és True, els sets amb tipus Tera ataquen i
+                defensen terastal·litzats
+
+        Returns:
+            DamageMatrix (files = (índex d'atacant, moviment), columnes = defensors)
+        """
+        profiles = self.type_profiles
+        id_index = profiles.id_index
+
+        # --- Columnes dels defensors ---
+        hp = array('d', [defender.stats[0] for defender in defenders])
+        defense_columns = (
+            array('d', [defender.stats[STAT_DEFENSE] for defender in defenders]),
+            array('d', [defender.stats[STAT_SPECIAL_DEFENSE] for defender in defenders])
+        )
+        defender_profiles = [
+            profiles.profile([TYPE_NAMES[t] for t in defender.defensive_type_ids(True)])
+            if terastallized and defender.tera_type_id >= 0
+            else profiles.profile_of(defender.pokemon)
+            for defender in defenders
+        ]
+        # Multiplicador de tipus per tipus atacant (només els que apareixen)
+        effectiveness = {}
+
+        rows = [
+            (a, move)
+            for a, attacker in enumerate(attackers)
+            for move in attacker.moves
+            if move.type_id in id_index
+        ]
+        matrix = DamageMatrix(rows, len(defenders))
+        floor = math.floor
+        half = MODIFIER_SCALE // 2 - 1
+
+        for a, move in rows:
+            attacker = attackers[a]
+            column = effectiveness.get(move.type_id)
+            if column is None:
+                index = id_index[move.type_id]
+                column = effectiveness[move.type_id] = array(
+                    'd', [profile.multipliers[index] for profile in defender_profiles]
+                )
+
+            # --- Tot el que només depèn de l'atacant i del moviment ---
+            attack = attacker.stats[STAT_ATTACK if move.category == PHYSICAL else STAT_SPECIAL_ATTACK]
+            if move.category == PHYSICAL and attacker.ability in ATTACK_DOUBLING_ABILITIES:
+                attack *= 2
+            power = move.power
+            if TYPE_BOOST_ITEMS.get(attacker.item) == TYPE_NAMES[move.type_id]:
+                power = apply_modifier(power, TYPE_BOOST_MODIFIER)
+            base_power = self._level_factor * power * attack
+            stab = self._stab(attacker, move, terastallized)
+            final_modifier = ITEM_DAMAGE_MODIFIERS.get(attacker.item, MODIFIER_SCALE)
+            defense = defense_columns[move.category]
+
+            # --- Una passada per les columnes dels defensors ---
+            # Dany base (tirada màxima) i amb la tirada mínima (x0.85)
+            base_max = [base_power // d // 50 + 2 for d in defense]
+            base_min = [floor(base * 0.85) for base in base_max]
+            if attacker.item == 'expert-belt':
+                final_modifiers = [EXPERT_BELT_MODIFIER if e > 1 else MODIFIER_SCALE for e in column]
+            else:
+                final_modifiers = [final_modifier] * len(column)
+
+            # Mateix ordre i arrodoniments que els jocs: STAB, tipus i modificador
+            # final (apply_modifier, escrit en línia)
+            matrix.max_damage.extend([
+                (floor(floor(base * stab) * e) * m + half) // MODIFIER_SCALE / h
+                for base, e, m, h in zip(base_max, column, final_modifiers, hp)
+            ])
+            matrix.min_damage.extend([
+                (floor(floor(base * stab) * e) * m + half) // MODIFIER_SCALE / h
+                for base, e, m, h in zip(base_min, column, final_modifiers, hp)
+            ])
+
+        return matrix
+
+    @staticmethod
+    def _stab(attacker: BattleSet, move: Move, terastallized: bool) -> float:
+        own_type = move.type_id in attacker.pokemon.type_ids
+        stab = 2.0 if attacker.ability == 'adaptability' else 1.5
+        if terastallized and attacker.tera_type_id == move.type_id:
+            # Tera del mateix tipus que un dels originals: x2
+            return 2.0 if own_type else 1.5
+        return stab if own_type else 1.0
+
+
+def nature_modifiers(increased_stat: Optional[str], decreased_stat: Optional[str]) -> Tuple[float, ...]:
+    """
+    Multiplicadors d'una natura (ordre de STAT_NAMES) a partir dels noms de
+    PokéAPI de l'índex 'natures' ("special-attack"...). Les natures neutres
+    tenen la mateixa estadística a les dues bandes o cap.
+    """
+    modifiers = list(NEUTRAL_NATURE)
+    if increased_stat and decreased_stat and increased_stat != decreased_stat:
+        for stat, multiplier in ((increased_stat, 1.1), (decreased_stat, 0.9)):
+            if stat in POKEAPI_STAT_NAMES:
+                modifiers[POKEAPI_STAT_NAMES.index(stat)] = multiplier
+    return tuple(modifiers)
@@ -0,0 +1,164 @@
+"""
+Regles de format (llistes de prohibits) compilades en memòria
+============================================================
+
+Les llistes de `scripts_bd/ban_lists.json` defineixen, per a cada format
+(VGC, OU...), els Pokémon, objectes, habilitats i moviments prohibits i
+els noms amb què els equips i els usuaris es refereixen al format
+("VGC Reg G", "Smogon"...).
+
+En lloc de dependre del camp `is_banned` de l'índex (que només reflecteix
+el format principal i s'ha de tornar a marcar quan canvien les llistes),
+aquest mòdul les compila una vegada en:
+
+- Un mapa de bits per format sobre el pokedex_id (bytearray): saber si un
+  Pokémon està prohibit és llegir un bit.
+- Un registre de noms d'objectes, habilitats i moviments (nom → bit) i una
+  màscara per format i categoria: saber si un objecte està prohibit és una
+  consulta al diccionari i una AND.
+
+El fan servir la cerca de Pokémon (exclude_banned), el roster del servei
+d'IA i la validació d'equips.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+BAN_LISTS_PATH = os.environ.get(
+    "POKEBUILDER_BAN_LISTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts_bd", "ban_lists.json")
+)
+
+# Format que determina is_banned (el mateix que marcar_pokemon_prohibits.py)
+DEFAULT_FORMAT = "vgc"
+
+# Categories de noms prohibits a ban_lists.json, a part dels Pokémon
+RULE_CATEGORIES = ("items", "abilities", "moves")
+
+
+def name_key(name: Optional[str]) -> str:
+    """Clau d'un nom sense majúscules, espais, guions ni apòstrofs ("King's Rock" → "kingsrock")."""
+    return "".join(ch for ch in (name or "").lower() if ch.isalnum())
+
+
+class FormatRules:
+    """
+    Regles compilades d'un format.
+    """
+
+    __slots__ = ('name', 'version', 'description', 'species_bitmap', 'species_ids', 'masks', '_names')
+
+    def __init__(self, name: str, version: str, description: str, species_ids: Iterable[int],
+                 masks: Dict[str, int], names: Dict[str, Dict[str, int]]):
+        self.name = name
+        self.version = version
+        self.description = description
+        self.species_ids = tuple(sorted(set(species_ids)))
+        self.species_bitmap = bytearray((max(self.species_ids, default=0) >> 3) + 1)
+        for pokedex_id in self.species_ids:
+            self.species_bitmap[pokedex_id >> 3] |= 1 << (pokedex_id & 7)
+        self.masks = masks
+        self._names = names
+
+    def bans_species(self, pokedex_id: int) -> bool:
+        """True si el Pokémon està prohibit al format."""
+        byte = pokedex_id >> 3
+        return 0 <= byte < len(self.species_bitmap) and bool(self.species_bitmap[byte] >> (pokedex_id & 7) & 1)
+
+    def bans(self, category: str, name: Optional[str]) -> bool:
+        """True si l'objecte, habilitat o moviment ('items', 'abilities', 'moves') està prohibit."""
+        bit = self._names[category].get(name_key(name))
+        return bit is not None and bool(self.masks[category] >> bit & 1)
+
+    def check_member(self, member: Dict) -> List[Dict]:
+        """
+        Infraccions d'un membre d'equip (document de l'índex 'teams', amb
+        'pokedex_id' resolt).
+
+        Returns:
+            Llista de {"field", "value", "reason"} (buida si és legal)
+        """
+        errors = []
+        pokedex_id = member.get("pokedex_id")
+        if pokedex_id is not None and self.bans_species(pokedex_id):
+            errors.append(self._error("base_pokemon", member.get("base_pokemon") or pokedex_id))
+        if member.get("item") and self.bans("items", member["item"]):
+            errors.append(self._error("item", member["item"]))
+        if member.get("ability") and self.bans("abilities", member["ability"]):
+            errors.append(self._error("ability", member["ability"]))
+        for move in member.get("moves") or []:
+            if self.bans("moves", move):
+                errors.append(self._error("moves", move))
+        return errors
+
+    def _error(self, field: str, value) -> Dict:
+        return {"field": field, "value": value, "reason": f"Prohibit al format {self.name.upper()}"}
+
+    def info(self) -> Dict:
+        return {"format": self.name, "version": self.version, "description": self.description}
+
+
+class FormatRegistry:
+    """
+    Totes les regles de format, indexades pel nom del format i els seus àlies.
+    """
+
+    def __init__(self, ban_lists: Dict, default_format: str = DEFAULT_FORMAT):
+        """
+        Args:
+            ban_lists: Contingut de ban_lists.json
+            default_format: Format que s'aplica quan no se n'indica cap
+        """
+        if default_format not in ban_lists:
+            raise ValueError(f"El format principal '{default_format}' no és a les llistes de prohibits")
+        self.default_format = default_format
+
+        # Registre de noms per categoria: clau del nom → bit (compartit entre formats)
+        self._names = {category: {} for category in RULE_CATEGORIES}
+        for rules in ban_lists.values():
+            for category in RULE_CATEGORIES:
+                registry = self._names[category]
+                for name in rules.get(category) or {}:
+                    registry.setdefault(name_key(name), len(registry))
+
+        self.formats = {}
+        self._aliases = {}
+        for format_name, rules in ban_lists.items():
+            masks = {}
+            for category in RULE_CATEGORIES:
+                mask = 0
+                for name in rules.get(category) or {}:
+                    mask |= 1 << self._names[category][name_key(name)]
+                masks[category] = mask
+
+            self.formats[format_name] = FormatRules(
+                format_name,
+                rules.get("version", ""),
+                rules.get("descripcio", ""),
+                (int(pokedex_id) for pokedex_id in rules.get("pokemon") or {}),
+                masks,
+                self._names
+            )
+            for alias in [format_name] + list(rules.get("aliases") or []):
+                self._aliases[name_key(alias)] = format_name
+
+    @classmethod
+    def load(cls, path: str = BAN_LISTS_PATH, default_format: str = DEFAULT_FORMAT) -> "FormatRegistry":
+        """Llegeix i compila ban_lists.json."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), default_format)
+
+    def resolve(self, format_name: Optional[str] = None) -> Optional[FormatRules]:
+        """
+        Regles d'un format pel seu nom o àlies ("VGC Reg G", "smogon"...).
+        Sense nom, les del format principal; None si el format és desconegut.
+        """
+        if not format_name:
+            return self.formats[self.default_format]
+        name = self._aliases.get(name_key(format_name))
+        return self.formats.get(name) if name else None
+
+    def versions(self) -> Dict[str, str]:
+        """{format: versió}, com el manifest de marcar_pokemon_prohibits.py."""
+        return {name: rules.version for name, rules in self.formats.items()}
@@ -0,0 +1,277 @@
+"""
+Matriu d'enfrontaments del roster
+=================================
+
+Comptadors, llistes d'amenaces i enfrontaments entre equips es redueixen a
+la mateixa pregunta: com li va al Pokémon A contra el Pokémon B? Aquest
+mòdul la precalcula per a totes les parelles del roster i la guarda en un
+fitxer binari que es llegeix amb `mmap`.
+
+Puntuació de cada parella (de -1 a 1, positiva si A guanya):
+- Dany esperat del millor moviment de cadascun contra l'altre
+  (DamageEngine amb sets genèrics, que ja inclou l'efectivitat de tipus)
+- Torns que necessita cadascun per fer KO a l'altre (com a màxim MAX_TURNS)
+- Velocitat: el més ràpid guanya mig torn
+- Puntuació = (torns de B - torns de A) / (torns de A + torns de B)
+
+Format del fitxer (little-endian):
+- Capçalera (HEADER): "PKMX", versió del format, mida N, empremta de les
+  dades (sha256) i data de creació
+- N identificadors de Pokédex (int32), en l'ordre de les files
+- N × N puntuacions (int8, puntuació × 127), fila = atacant
+
+L'empremta es calcula a partir del roster, la taula de tipus i els
+paràmetres del càlcul: si les dades canvien, la matriu guardada deixa de
+ser vàlida i s'ha de tornar a generar (build_matchup_matrix.py).
+"""
+
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from damage_engine import DamageEngine
+from type_profiles import TYPE_NAMES
+
+MAGIC = b"PKMX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHI32sd")
+
+# Escala de les puntuacions guardades (int8)
+SCORE_SCALE = 127
+
+# Torns màxims per fer KO (per sota d'aquest dany, l'enfrontament es considera bloquejat)
+MAX_TURNS = 8
+
+DEFAULT_MATRIX_PATH = os.environ.get(
+    "POKEBUILDER_MATCHUP_MATRIX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "matchup_matrix.bin")
+)
+
+
+class MatchupMatrix:
+    """
+    Matriu d'enfrontaments carregada amb `mmap` (només lectura). Les
+    consultes per parella són O(1) i només es llegeixen del disc les
+    pàgines que es consulten.
+    """
+
+    def __init__(self, path: str = DEFAULT_MATRIX_PATH):
+        """
+        Args:
+            path: Fitxer generat per write_matchup_matrix()
+
+        Raises:
+            ValueError: Si el fitxer no té el format o la versió esperats
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = read_header(self._mmap[:HEADER.size], len(self._mmap))
+        if header is None:
+            self._mmap.close()
+            raise ValueError(f"{path} no és una matriu d'enfrontaments (versió {FORMAT_VERSION})")
+
+        self.size, self.fingerprint, self.created_at = header
+        ids_start = HEADER.size
+        scores_start = ids_start + 4 * self.size
+
+        self.ids = array('i')
+        self.ids.frombytes(self._mmap[ids_start:scores_start])
+        self._index = {pokedex_id: i for i, pokedex_id in enumerate(self.ids)}
+        self._scores = memoryview(self._mmap)[scores_start:scores_start + self.size * self.size].cast('b')
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, pokedex_id: int) -> bool:
+        return pokedex_id in self._index
+
+    def score(self, attacker_id: int, defender_id: int) -> Optional[float]:
+        """
+        Puntuació de l'enfrontament (de -1 a 1, positiva si guanya
+        l'atacant); None si algun dels dos no és a la matriu.
+        """
+        a = self._index.get(attacker_id)
+        b = self._index.get(defender_id)
+        if a is None or b is None:
+            return None
+        return self._scores[a * self.size + b] / SCORE_SCALE
+
+    def row(self, pokedex_id: int) -> Optional[memoryview]:
+        """
+        Puntuacions en brut (int8) del Pokémon contra tot el roster, en
+        l'ordre de `ids`; None si no és a la matriu.
+        """
+        a = self._index.get(pokedex_id)
+        if a is None:
+            return None
+        return self._scores[a * self.size:(a + 1) * self.size]
+
+    def threats(
+            self,
+            team_ids: Sequence[int],
+            excluded: Iterable[int] = (),
+            k: int = 10
+    ) -> List[Tuple[int, float, int]]:
+        """
+        Els k Pokémon del roster amb millor puntuació mitjana contra l'equip
+        (sense els membres de l'equip ni els de 'excluded').
+
+        Com que la puntuació és antisimètrica, score(rival, membre) =
+        -score(membre, rival): n'hi ha prou amb les files dels membres.
+
+        Returns:
+            Llista de (pokedex_id, puntuació mitjana de -1 a 1, membres que guanya),
+            de més a menys perillós
+        """
+        rows = [row for row in (self.row(pid) for pid in team_ids) if row is not None]
+        if not rows or k <= 0:
+            return []
+
+        skip = set(excluded)
+        skip.update(team_ids)
+        ids = self.ids
+
+        # (suma de puntuacions del rival, membres que guanya, -índex per desempatar)
+        scored = (
+            (-sum(column), sum(value < 0 for value in column), -index)
+            for index, column in enumerate(zip(*rows))
+            if ids[index] not in skip
+        )
+        scale = len(rows) * SCORE_SCALE
+        return [(ids[-neg_index], total / scale, beats) for total, beats, neg_index in heapq.nlargest(k, scored)]
+
+    def counters(self, pokedex_id: int, excluded: Iterable[int] = (), k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Els k Pokémon que millor guanyen a un Pokémon.
+
+        Returns:
+            Llista de (pokedex_id, puntuació de -1 a 1)
+        """
+        return [(pid, score) for pid, score, _ in self.threats([pokedex_id], excluded, k)]
+
+    def info(self) -> Dict:
+        return {
+            "size": self.size,
+            "format_version": FORMAT_VERSION,
+            "fingerprint": self.fingerprint,
+            "created_at": self.created_at
+        }
+
+    def close(self):
+        self._scores.release()
+        self._mmap.close()
+
+
+# --- Càlcul ---
+
+def compute_matchup_scores(damage_engine: DamageEngine, roster: Sequence) -> array:
+    """
+    Puntuacions de totes les parelles del roster (int8, fila = atacant).
+
+    Args:
+        damage_engine: Motor de dany (sets genèrics, vegeu DamageEngine.default_set)
+        roster: Pokémon del roster (llista o Roster)
+
+    Returns:
+        array('b') de N × N puntuacions escalades per SCORE_SCALE
+    """
+    sets = [damage_engine.default_set(pokemon) for pokemon in roster]
+    damage = damage_engine.damage_matrix(sets, sets)
+    speed = [battle_set.stats[-1] for battle_set in sets]
+
+    # Torns que necessita cada atacant (fila) per fer KO a cada defensor
+    ceil = math.ceil
+    turns = [
+        [min(MAX_TURNS, ceil(1 / expected)) if expected > 0 else MAX_TURNS
+         for expected in damage.best_against_all(a)]
+        for a in range(len(sets))
+    ]
+    # Columna a: torns que necessita cada Pokémon per fer KO a l'atacant a
+    received = list(zip(*turns))
+
+    scores = array('b')
+    for a, own_turns in enumerate(turns):
+        speed_a = speed[a]
+        row = []
+        for b, (ta, tb) in enumerate(zip(own_turns, received[a])):
+            if speed_a > speed[b]:
+                ta -= 0.5
+            elif speed_a < speed[b]:
+                tb -= 0.5
+            row.append(round(SCORE_SCALE * (tb - ta) / (ta + tb)))
+        scores.extend(row)
+    return scores
+
+
+def data_fingerprint(roster: Sequence, type_chart: Dict, damage_engine: DamageEngine) -> str:
+    """
+    Empremta (sha256) de les dades que determinen la matriu: roster (ID,
+    tipus i estadístiques), taula de tipus i paràmetres del càlcul.
+    """
+    digest = hashlib.sha256()
+    digest.update(struct.pack("<HHH", FORMAT_VERSION, MAX_TURNS, damage_engine.level))
+    for pokemon in roster:
+        digest.update(repr((
+            pokemon.pokedex_id,
+            [TYPE_NAMES[t] for t in pokemon.type_ids],
+            pokemon.base_stats
+        )).encode())
+    for name in sorted(type_chart):
+        type_data = type_chart[name]
+        digest.update(repr((
+            name,
+            sorted(type_data.double_damage_from),
+            sorted(type_data.half_damage_from),
+            sorted(type_data.no_damage_from)
+        )).encode())
+    return digest.hexdigest()
+
+
+# --- Fitxer ---
+
+def write_matchup_matrix(path: str, ids: Sequence[int], scores: array, fingerprint: str):
+    """Escriu la matriu de manera atòmica (fitxer temporal + os.replace)."""
+    size = len(ids)
+    if len(scores) != size * size:
+        raise ValueError(f"S'esperaven {size * size} puntuacions i n'hi ha {len(scores)}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, size, bytes.fromhex(fingerprint), time.time()))
+        f.write(array('i', ids).tobytes())
+        f.write(scores.tobytes())
+    os.replace(tmp, path)
+
+
+def read_header(data: bytes, file_size: int) -> Optional[tuple]:
+    """
+    (mida, empremta, data de creació) a partir dels primers bytes d'una
+    matriu; None si no té el format o la versió actual o està truncada.
+    """
+    if len(data) < HEADER.size:
+        return None
+    magic, version, size, fingerprint, created_at = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    if file_size < HEADER.size + 4 * size + size * size:
+        return None
+    return size, fingerprint.hex(), created_at
+
+
+def stored_fingerprint(path: str = DEFAULT_MATRIX_PATH) -> Optional[str]:
+    """Empremta de la matriu guardada (None si no n'hi ha o no és vàlida)."""
+    try:
+        with open(path, "rb") as f:
+            header = read_header(f.read(HEADER.size), os.fstat(f.fileno()).st_size)
+    except OSError:
+        return None
+    return header[1] if header else None
@@ -0,0 +1,225 @@
+"""
+Puntuació de candidats en paral·lel amb memòria compartida
+==========================================================
+
+Puntuar tot el roster és la part cara de les recomanacions, la compleció
+d'equips o l'anàlisi en lot, i és feina de CPU pura. `ParallelScorer`
+la reparteix entre un pool de processos:
+
+- El roster (ID, tipus i estadístiques de cada candidat) i les relacions
+  de la taula de tipus s'escriuen UNA vegada a `multiprocessing.shared_memory`
+  com a enters de 32 bits. La memòria compartida és el transport
+  d'arrencada, no un roster compartit: cada procés en fa una còpia privada
+  en arrencar (initializer) i en reconstrueix els `Pokemon` una sola vegada,
+  de manera que cap petició torna a enviar el roster serialitzat.
+- A cada petició només s'envia l'equip (com a molt 6 Pokémon) i una franja
+  d'índexs de candidats per procés.
+- Cada procés retorna el seu top-K (heap) i aquí es fusionen en el top-K
+  global, amb el mateix criteri de desempat que `RecommendationEngine.recommend`.
+
+Per defecte està desactivat: AIService només el fa servir si
+POKEBUILDER_SCORING_WORKERS (o el paràmetre `scoring_workers`) és més gran
+que 1; amb el valor per defecte, 1, tot es puntua al mateix procés. També
+es pot fer servir des de scripts:
+
+    with ParallelScorer(engine, roster, workers=4) as scorer:
+        recs = scorer.recommend(team, top_n=5)
+"""
+
+import hashlib
+import heapq
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+from recommendation_engine import (
+    STAT_NAMES, Pokemon, Recommendation, RecommendationEngine, TeamState, TypeEffectiveness
+)
+from type_profiles import TYPE_NAMES
+
+# Camps de cada candidat al bloc compartit (int32): ID, dos identificadors de tipus
+# (type_profiles.TYPE_NAMES, -1 = cap) i 6 estadístiques
+ROSTER_FIELDS = ['pokedex_id', 'type1', 'type2'] + STAT_NAMES
+RECORD_SIZE = len(ROSTER_FIELDS)
+
+# Relacions de cada tipus al bloc compartit (màscares sobre l'ordre canònic)
+RELATION_FIELDS = [
+    'double_damage_from', 'half_damage_from', 'no_damage_from',
+    'double_damage_to', 'half_damage_to', 'no_damage_to'
+]
+
+
+class ParallelScorer:
+    """
+    Puntua un roster fix de candidats en un pool de processos.
+    """
+
+    def __init__(self, engine: RecommendationEngine, roster: List[Pokemon], workers: Optional[int] = None):
+        """
+        Args:
+            engine: Motor de recomanació (taula de tipus i pesos)
+            roster: Candidats a puntuar (tots els Pokémon disponibles)
+            workers: Processos del pool (per defecte, un per nucli)
+        """
+        self.engine = engine
+        self.roster = roster
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+        type_names = engine.type_profiles.type_names
+        packed = _pack_roster(roster)
+        # Contingut del roster: un roster recarregat amb les mateixes dades pot fer servir el mateix pool
+        self.fingerprint = hashlib.sha256(packed.tobytes()).hexdigest()
+        self._roster_shm = _to_shared_memory(packed)
+        self._types_shm = _to_shared_memory(_pack_type_relations(engine))
+
+        # forkserver: el servei crea i tanca scorers des de fils de peticions, i un fork
+        # des d'un procés amb fils pot heretar un lock agafat i penjar-se
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+            initargs=(
+                self._roster_shm.name, len(roster),
+                self._types_shm.name, tuple(type_names)
+            )
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Atura el pool i allibera la memòria compartida."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for shm in (self._roster_shm, self._types_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._roster_shm = self._types_shm = None
+
+    # ------------------------------------------------------------------
+    # Puntuació
+    # ------------------------------------------------------------------
+    def top_k(self, team: List[Pokemon], k: int) -> List[Tuple[float, Pokemon]]:
+        """
+        Els k candidats amb més puntuació per a l'equip (sense els que ja
+        hi són), ordenats de més a menys.
+
+        Returns:
+            Llista de (puntuació, Pokémon)
+        """
+        if k <= 0 or not self.roster:
+            return []
+
+        step = -(-len(self.roster) // self.workers)   # arrodonit amunt
+        tasks = [
+            (list(team), start, min(start + step, len(self.roster)), k)
+            for start in range(0, len(self.roster), step)
+        ]
+
+        # (puntuació, -índex): a igual puntuació guanya el primer del roster
+        best = heapq.nlargest(k, chain.from_iterable(self._pool.map(_score_slice, tasks)))
+        return [(score, self.roster[-neg_index]) for score, neg_index in best]
+
+    def recommend(self, team: List[Pokemon], top_n: int = 5) -> List[Recommendation]:
+        """
+        Com RecommendationEngine.recommend(): puntua en paral·lel i construeix
+        el raonament complet només per als top N.
+        """
+        if len(team) >= 6:
+            return []
+        state = TeamState(self.engine, team)
+        return [state.evaluate(pokemon) for _, pokemon in self.top_k(team, top_n)]
+
+
+def roster_fingerprint(roster: List[Pokemon]) -> str:
+    """Empremta del contingut d'un roster (la mateixa que ParallelScorer.fingerprint)."""
+    return hashlib.sha256(_pack_roster(roster).tobytes()).hexdigest()
+
+
+# --- Empaquetat al bloc compartit ---
+
+def _pack_roster(roster: List[Pokemon]) -> array:
+    data = array('i')
+    for pokemon in roster:
+        type_ids = pokemon.type_ids[:2] + (-1, -1)
+        data.extend((pokemon.pokedex_id, type_ids[0], type_ids[1]))
+        data.extend(pokemon.base_stats)
+    return data
+
+
+def _pack_type_relations(engine: RecommendationEngine) -> array:
+    profiles = engine.type_profiles
+    data = array('i')
+    for name in profiles.type_names:
+        type_data = engine.type_chart[name]
+        data.extend(profiles.mask(getattr(type_data, field)) for field in RELATION_FIELDS)
+    return data
+
+
+def _to_shared_memory(data: array) -> shared_memory.SharedMemory:
+    raw = data.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(raw)))
+    shm.buf[:len(raw)] = raw
+    return shm
+
+
+def _read_ints(name: str, count: int) -> array:
+    """Còpia privada dels primers 'count' enters d'un bloc compartit."""
+    # Els fills comparteixen el resource_tracker del pare: el bloc és del pare
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = array('i')
+        data.frombytes(bytes(shm.buf[:count * data.itemsize]))
+        return data
+    finally:
+        shm.close()
+
+
+# --- Treballadors del pool de processos ---
+# Cada procés copia el roster i la taula de tipus una sola vegada (initializer).
+_worker_state = None
+
+
+def _init_worker(roster_name: str, roster_size: int, types_name: str,
+                 type_names: Tuple[str, ...]):
+    global _worker_state
+
+    relations = _read_ints(types_name, len(type_names) * len(RELATION_FIELDS))
+    def names(mask):
+        return [t for i, t in enumerate(type_names) if mask >> i & 1]
+
+    type_chart = {}
+    for i, name in enumerate(type_names):
+        row = relations[i * len(RELATION_FIELDS):(i + 1) * len(RELATION_FIELDS)]
+        type_chart[name] = TypeEffectiveness(name, *(names(mask) for mask in row))
+
+    records = _read_ints(roster_name, roster_size * RECORD_SIZE)
+    roster = []
+    for i in range(roster_size):
+        record = records[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]
+        types = [TYPE_NAMES[t] for t in record[1:3] if t >= 0]
+        roster.append(Pokemon.create(record[0], "", types, dict(zip(STAT_NAMES, record[3:]))))
+
+    _worker_state = (RecommendationEngine(type_chart), roster)
+
+
+def _score_slice(task):
+    team, start, stop, k = task
+    engine, roster = _worker_state
+    state = TeamState(engine, team)
+
+    scored = (
+        (state.delta_score(roster[index]), -index)
+        for index in range(start, stop)
+        if not state.contains(roster[index].pokedex_id)
+    )
+    return heapq.nlargest(k, scored)
@@ -17,16 +17,59 @@ Data: Novembre 2024
 
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
+import heapq
 import math
 
+from type_profiles import TYPE_NAMES, TypeProfile, TypeProfileTable, iter_bits, popcount, type_ids
 
-@dataclass
+# Ordre de les estadístiques a l'anàlisi d'equip (TeamAnalysis.avg_stats)
+STAT_NAMES = ['hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed']
+STAT_ATTACK, STAT_DEFENSE, STAT_SPECIAL_ATTACK, STAT_SPECIAL_DEFENSE = 1, 2, 3, 4
+
+
+@dataclass(frozen=True)
 class Pokemon:
-    """Representa un Pokémon amb les seves característiques."""
+    """
+    Representa un Pokémon amb les seves característiques.
+
+    Compacte i immutable: sense __dict__, els tipus com a tupla
+    d'identificadors (type_profiles.TYPE_NAMES) i les estadístiques com a
+    tupla de 6 valors en l'ordre de STAT_NAMES. Les propietats `types` i
+    `stats` donen el format amb noms (per a l'API i el raonament).
+    """
+    __slots__ = ('pokedex_id', 'name', 'type_ids', 'base_stats')
+
     pokedex_id: int
     name: str
-    types: List[str]
-    stats: Dict[str, int]
+    type_ids: Tuple[int, ...]
+    base_stats: Tuple[int, ...]
+
+    @classmethod
+    def create(cls, pokedex_id: int, name: str, types: List[str], stats: Dict[str, int]) -> "Pokemon":
+        """Crea un Pokémon a partir de noms de tipus i un diccionari d'estadístiques."""
+        return cls(
+            pokedex_id,
+            name,
+            type_ids(types),
+            tuple(int(stats.get(stat, 0)) for stat in STAT_NAMES)
+        )
+
+    @classmethod
+    def from_source(cls, data: Dict) -> "Pokemon":
+        """Crea un Pokémon a partir d'un document de l'índex 'pokemon'."""
+        return cls.create(data['pokedex_id'], data['name'], data['types'], data['stats'])
+
+    @property
+    def types(self) -> List[str]:
+        return [TYPE_NAMES[tid] for tid in self.type_ids]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(zip(STAT_NAMES, self.base_stats))
+
+    def __reduce__(self):
+        # Els processos del pool reben Pokémon serialitzats (frozen + slots)
+        return (Pokemon, (self.pokedex_id, self.name, self.type_ids, self.base_stats))
 
 
 @dataclass
@@ -41,9 +84,14 @@ class TypeEffectiveness:
     no_damage_to: List[str]        # No fa dany a
 
 
-@dataclass
+@dataclass(frozen=True)
 class Recommendation:
     """Representa una recomanació de Pokémon amb la seva puntuació i raonament."""
+    __slots__ = (
+        'pokemon', 'score', 'defensive_score', 'offensive_score',
+        'diversity_score', 'stats_score', 'reasoning', 'warnings'
+    )
+
     pokemon: Pokemon
     score: float
     defensive_score: float
@@ -53,6 +101,12 @@ class Recommendation:
     reasoning: List[str] # PROS
     warnings: List[str]  # CONTRES
 
+    def __reduce__(self):
+        return (Recommendation, (
+            self.pokemon, self.score, self.defensive_score, self.offensive_score,
+            self.diversity_score, self.stats_score, self.reasoning, self.warnings
+        ))
+
 
 class RecommendationEngine:
     """
@@ -77,6 +131,9 @@ class RecommendationEngine:
         self.type_chart = type_chart
         self.all_type_names = list(self.type_chart.keys())
 
+        # Perfil defensiu de totes les combinacions de tipus (màscares de bits)
+        self.type_profiles = TypeProfileTable(type_chart)
+
     def recommend(
             self,
             current_team: List[Pokemon],
@@ -97,140 +154,42 @@ class RecommendationEngine:
         if len(current_team) >= 6:
             return []
 
-        # Analitzar l'equip actual
-        team_analysis = self._analyze_team(current_team)
+        return self.recommend_from_state(TeamState(self, current_team), all_pokemon, top_n)
 
-        # Calcular puntuacions per a tots els candidats
-        recommendations = []
-        for pokemon in all_pokemon:
-            # Saltar Pokémon ja presents a l'equip
-            if any(p.pokedex_id == pokemon.pokedex_id for p in current_team):
-                continue
-
-            rec = self._evaluate_candidate(pokemon, current_team, team_analysis)
-            recommendations.append(rec)
-
-        # Ordenar per puntuació i retornar top N
-        recommendations.sort(key=lambda x: x.score, reverse=True)
-        return recommendations[:top_n]
-
-    def _analyze_team(self, team: List[Pokemon]) -> Dict:
-        """
-        Analitza l'equip actual per identificar fortaleses i debilitats.
-        
-        Returns:
-            Diccionari amb l'anàlisi de l'equip
+    def recommend_from_state(
+            self,
+            state: "TeamState",
+            all_pokemon: List[Pokemon],
+            top_n: int = 5
+    ) -> List[Recommendation]:
         """
-        analysis = {
-            'weaknesses': {},      # Tipus contra els quals l'equip és dèbil (net)
-            'resistances': {},     # Tipus als quals l'equip resisteix (total)
-            'immunities': set(),   # Tipus als quals l'equip és immune
-            'offensive_types': set(),  # Tipus que l'equip colpeja com a súper-efectiu
-            'present_types': set(),    # Tipus defensius presents a l'equip
-            'avg_stats': {},       # Estadístiques mitjanes
-            'total_members': len(team)
-        }
-
-        if not team:
-            return analysis
+        Com recommend(), però a partir d'un TeamState ja construït (per
+        tornar a recomanar a l'instant quan l'usuari afegeix o treu membres).
 
-        # Analitzar debilitats i resistències
-        all_weaknesses = {}
-        all_resistances = {}
-
-        for pokemon in team:
-            for poke_type in pokemon.types:
-                analysis['present_types'].add(poke_type)
-
-                if poke_type in self.type_chart:
-                    type_data = self.type_chart[poke_type]
-
-                    for weak_type in type_data.double_damage_from:
-                        all_weaknesses[weak_type] = all_weaknesses.get(weak_type, 0) + 1
-
-                    for resist_type in type_data.half_damage_from:
-                        all_resistances[resist_type] = all_resistances.get(resist_type, 0) + 1
-
-                    for immune_type in type_data.no_damage_from:
-                        analysis['immunities'].add(immune_type)
-
-                    for effective_type in type_data.double_damage_to:
-                        analysis['offensive_types'].add(effective_type)
-
-        # Determinar les debilitats netes de l'equip
-        team_weaknesses = {}
-
-        for type_name, weak_count in all_weaknesses.items():
-            resist_count = all_resistances.get(type_name, 0)
-
-            if type_name in analysis['immunities']:
-                continue
-
-            if weak_count > resist_count:
-                team_weaknesses[type_name] = weak_count - resist_count
+        Tots els candidats es puntuen amb la via numèrica ràpida del
+        TeamState; el raonament complet només es construeix per als top N.
+        """
+        if state.size >= 6:
+            return []
 
-        analysis['weaknesses'] = team_weaknesses
-        analysis['resistances'] = all_resistances
+        # Saltar Pokémon ja presents a l'equip
+        candidates = [p for p in all_pokemon if not state.contains(p.pokedex_id)]
 
-        # Calcular estadístiques mitjanes
-        stat_names = ['hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed']
-        for stat in stat_names:
-            total = sum(p.stats.get(stat, 0) for p in team)
-            analysis['avg_stats'][stat] = total / len(team) if team else 0
+        # Ordenar per puntuació i quedar-nos amb els top N
+        best = heapq.nlargest(top_n, candidates, key=state.delta_score)
 
-        return analysis
+        team_analysis = state.analysis()
+        return [self._evaluate_candidate(p, state.members, team_analysis) for p in best]
 
-    # ======================================================================
-    # ============= NOVA FUNCIÓ D'EFECTIVITAT NETA =========================
-    # ======================================================================
-    def _calculate_net_effectiveness(self, candidate_types: List[str]) -> Dict[str, set]:
+    def _analyze_team(self, team: List[Pokemon]) -> "TeamAnalysis":
         """
-        Calcula el perfil defensiu net (debilitats, resistències, immunitats)
-        d'un conjunt de tipus (un Pokémon).
+        Analitza l'equip actual per identificar fortaleses i debilitats.
         
-        Args:
-            candidate_types: Llista de tipus del Pokémon (ex: ['steel', 'rock'])
-            
         Returns:
-            Diccionari amb "weaknesses", "resistances", "immunities" netes.
+            TeamAnalysis (màscares de tipus i comptadors per índex de tipus).
+            Per obtenir el diccionari de l'API, TeamAnalysis.to_dict().
         """
-        net_defense = {
-            "weaknesses": set(),
-            "resistances": set(),
-            "immunities": set()
-        }
-
-        # Iterar per tots els 18 tipus com a "tipus atacant"
-        for attacking_type in self.all_type_names:
-            current_multiplier = 1.0
-
-            # Comprovar l'efecte de l'atacant contra cada tipus defensiu
-            for defense_type_name in candidate_types:
-                if defense_type_name not in self.type_chart:
-                    continue
-
-                # Obtenim el perfil del tipus defensiu
-                defense_type_data = self.type_chart[defense_type_name]
-
-                # Comprovem com li afecta el 'attacking_type'
-                if attacking_type in defense_type_data.double_damage_from:
-                    current_multiplier *= 2
-                elif attacking_type in defense_type_data.half_damage_from:
-                    current_multiplier *= 0.5
-                elif attacking_type in defense_type_data.no_damage_from:
-                    current_multiplier = 0
-                    break # És immune, el multiplicador final és 0
-
-            # Classificar el multiplicador final
-            if current_multiplier == 0:
-                net_defense["immunities"].add(attacking_type)
-            elif current_multiplier > 1: # Inclou x2 i x4
-                net_defense["weaknesses"].add(attacking_type)
-            elif current_multiplier < 1: # Inclou x0.5 i x0.25
-                net_defense["resistances"].add(attacking_type)
-            # Si current_multiplier == 1, és neutre i no s'afegeix enlloc
-
-        return net_defense
+        return TeamState(self, team).analysis()
 
     def _calculate_pokemon_vulnerability(self, pokemon: Pokemon) -> Dict[str, float]:
         """
@@ -242,31 +201,14 @@ class RecommendationEngine:
         Returns:
             Diccionari amb el tipus atacant com a clau i el multiplicador de dany com a valor.
         """
-        vulnerabilities = {}
-
-        # Iterar per tots els 18 tipus com a "tipus atacant"
-        for attacking_type in self.all_type_names:
-            current_multiplier = 1.0
-
-            # Comprovar l'efecte de l'atacant contra cada tipus defensiu del Pokémon
-            for defense_type_name in pokemon.types:
-                if defense_type_name not in self.type_chart:
-                    continue
+        # Multiplicadors precalculats per a la combinació de tipus
+        multipliers = self.type_profiles.profile_of(pokemon).multipliers
+        index = self.type_profiles.index
 
-                defense_type_data = self.type_chart[defense_type_name]
-
-                # Comprovem com li afecta el 'attacking_type'
-                if attacking_type in defense_type_data.double_damage_from:
-                    current_multiplier *= 2
-                elif attacking_type in defense_type_data.half_damage_from:
-                    current_multiplier *= 0.5
-                elif attacking_type in defense_type_data.no_damage_from:
-                    current_multiplier = 0
-                    break # És immune, el multiplicador final és 0
-
-            vulnerabilities[attacking_type] = current_multiplier
-
-        return vulnerabilities
+        return {
+            attacking_type: multipliers[index[attacking_type]]
+            for attacking_type in self.all_type_names
+        }
 
     def get_team_vulnerability(self, team: List[Pokemon]) -> Dict[str, any]:
         """
@@ -353,7 +295,7 @@ class RecommendationEngine:
             self,
             candidate: Pokemon,
             team: List[Pokemon],
-            team_analysis: Dict
+            team_analysis: "TeamAnalysis"
     ) -> Recommendation:
         """
         Avalua un candidat i calcula la seva puntuació.
@@ -417,7 +359,7 @@ class RecommendationEngine:
     def _calculate_defensive_score(
             self,
             candidate: Pokemon,
-            team_analysis: Dict
+            team_analysis: "TeamAnalysis"
     ) -> Tuple[float, List[str], List[str]]:
         """
         Calcula la puntuació defensiva basada en el perfil defensiu NET.
@@ -430,42 +372,40 @@ class RecommendationEngine:
         reasons = set()
         warnings = set()
 
-        team_weaknesses = team_analysis['weaknesses']
-        team_immunities = team_analysis['immunities']
+        profiles = self.type_profiles
+        weak_counts = team_analysis.weak_counts
+        team_weak_mask = team_analysis.weak_mask
 
-        # 1. Obtenir el perfil defensiu NET del candidat
-        candidate_net_defense = self._calculate_net_effectiveness(candidate.types)
+        # 1. Obtenir el perfil defensiu NET del candidat (màscares de bits)
+        profile = profiles.profile_of(candidate)
 
         # 2. PROS: Comprovar si les resistències/immunitats del candidat
         #    cobreixen les debilitats de l'equip.
-        for resist_type in candidate_net_defense["resistances"]:
-            if resist_type in team_weaknesses:
-                bonus = team_weaknesses[resist_type] * 10
-                score += bonus
-                reasons.add(f"Resisteix {resist_type.capitalize()}, una debilitat de l'equip")
+        for i in iter_bits(profile.resistances & team_weak_mask):
+            bonus = weak_counts[i] * 10
+            score += bonus
+            reasons.add(f"Resisteix {profiles.type_names[i].capitalize()}, una debilitat de l'equip")
 
-        for immune_type in candidate_net_defense["immunities"]:
-            if immune_type in team_weaknesses:
-                bonus = team_weaknesses[immune_type] * 15
-                score += bonus
-                reasons.add(f"És immune a {immune_type.capitalize()}, una debilitat crítica")
+        for i in iter_bits(profile.immunities & team_weak_mask):
+            bonus = weak_counts[i] * 15
+            score += bonus
+            reasons.add(f"És immune a {profiles.type_names[i].capitalize()}, una debilitat crítica")
 
         # 3. CONTRES: Comprovar si les debilitats NETES del candidat
         #    creen nous problemes o n'apilen d'existents.
-        for weak_type in candidate_net_defense["weaknesses"]:
-            if weak_type in team_immunities:
-                continue # Un altre membre de l'equip és immune, no penalitzar
-
-            if weak_type in team_weaknesses:
-                # Penalització per APILAR debilitats
-                penalty = team_weaknesses[weak_type] * 7
-                score -= penalty
-                warnings.add(f"Comparteix debilitat a {weak_type.capitalize()}")
-            else:
-                # Penalització per AFEGIR debilitat NOVA
-                penalty = 5
-                score -= penalty
-                warnings.add(f"Afegeix una nova debilitat a {weak_type.capitalize()}")
+        #    Si un altre membre de l'equip és immune, no es penalitza.
+        new_weaknesses = profile.weaknesses & ~team_analysis.immune_mask
+        for i in iter_bits(new_weaknesses & team_weak_mask):
+            # Penalització per APILAR debilitats
+            penalty = weak_counts[i] * 7
+            score -= penalty
+            warnings.add(f"Comparteix debilitat a {profiles.type_names[i].capitalize()}")
+
+        for i in iter_bits(new_weaknesses & ~team_weak_mask):
+            # Penalització per AFEGIR debilitat NOVA
+            penalty = 5
+            score -= penalty
+            warnings.add(f"Afegeix una nova debilitat a {profiles.type_names[i].capitalize()}")
 
         # Normalitzar a 0-100
         score = max(0, min(100, score))
@@ -478,7 +418,7 @@ class RecommendationEngine:
     def _calculate_offensive_score(
             self,
             candidate: Pokemon,
-            team_analysis: Dict
+            team_analysis: "TeamAnalysis"
     ) -> Tuple[float, List[str], List[str]]:
         """
         Calcula la puntuació ofensiva.
@@ -490,21 +430,9 @@ class RecommendationEngine:
         reasons = []
         warnings = []
 
-        # Tipus que l'equip JA colpeja com a súper-efectiu
-        team_offensive_coverage = team_analysis['offensive_types']
-
         # Tipus que el candidat pot colpejar que l'equip NO podia
-        candidate_new_coverage = set()
-
-        for poke_type in candidate.types:
-            if poke_type not in self.type_chart:
-                continue
-
-            type_data = self.type_chart[poke_type]
-
-            for effective_type in type_data.double_damage_to:
-                if effective_type not in team_offensive_coverage:
-                    candidate_new_coverage.add(effective_type)
+        profile = self.type_profiles.profile_of(candidate)
+        candidate_new_coverage = self.type_profiles.names(profile.offensive & ~team_analysis.offensive_mask)
 
         if candidate_new_coverage:
             # Bonificació per cada nou tipus que pot colpejar
@@ -525,7 +453,7 @@ class RecommendationEngine:
     def _calculate_diversity_score(
             self,
             candidate: Pokemon,
-            team_analysis: Dict
+            team_analysis: "TeamAnalysis"
     ) -> Tuple[float, List[str], List[str]]:
         """
         Calcula la puntuació de diversitat.
@@ -538,10 +466,11 @@ class RecommendationEngine:
         warnings = []
 
         # Tipus defensius ja presents a l'equip
-        present_types = team_analysis['present_types']
+        present_mask = team_analysis.present_mask
+        bits = self.type_profiles.bits
 
         # Bonificació per tipus nous
-        new_types = [t for t in candidate.types if t not in present_types]
+        new_types = [t for t in candidate.types if not bits.get(t, 0) & present_mask]
 
         if len(new_types) == 2:
             score += 30
@@ -556,7 +485,7 @@ class RecommendationEngine:
             warnings.append("Tipus defensius ja presents a l'equip")
 
         # Bonificació per doble tipus (més versatilitat defensiva)
-        if len(candidate.types) == 2:
+        if len(candidate.type_ids) == 2:
             score += 10
             reasons.append("Doble tipus proporciona versatilitat defensiva")
 
@@ -568,7 +497,7 @@ class RecommendationEngine:
     def _calculate_stats_score(
             self,
             candidate: Pokemon,
-            team_analysis: Dict
+            team_analysis: "TeamAnalysis"
     ) -> Tuple[float, List[str], List[str]]:
         """
         Calcula la puntuació d'estadístiques.
@@ -576,9 +505,9 @@ class RecommendationEngine:
         Returns:
             Tupla (puntuació, raons, avisos)
         """
-        avg_stats = team_analysis['avg_stats']
+        avg_stats = team_analysis.avg_stats
 
-        if not avg_stats or not any(avg_stats.values()):
+        if not avg_stats or not any(avg_stats):
             return 50.0, [], [] # Equip buit, puntuació neutral
 
         score = 50.0
@@ -594,14 +523,12 @@ class RecommendationEngine:
         }
 
         # 1. Compensar estadístiques baixes (comparant amb la mitjana)
-        low_stats = []
-        for stat, avg in avg_stats.items():
-            if avg < 80: # Llindar genèric per "baix"
-                low_stats.append(stat)
+        candidate_stats = candidate.base_stats
+        for k, (stat, team_avg) in enumerate(zip(STAT_NAMES, avg_stats)):
+            if team_avg >= 80: # Llindar genèric per "baix"
+                continue
 
-        for stat in low_stats:
-            candidate_stat = candidate.stats.get(stat, 0)
-            team_avg = avg_stats.get(stat, 0)
+            candidate_stat = candidate_stats[k]
 
             # Bonificació si el candidat és significativament millor que la mitjana
             if candidate_stat > team_avg + 15:
@@ -610,10 +537,10 @@ class RecommendationEngine:
                 reasons.append(f"Millora {stat_names_cat[stat]} ({candidate_stat}) respecte la mitjana ({team_avg:.0f})")
 
         # 2. Balanç Ofensiu (Físic/Especial)
-        avg_atk = avg_stats.get('attack', 0)
-        avg_sp_atk = avg_stats.get('special_attack', 0)
-        cand_atk = candidate.stats.get('attack', 0)
-        cand_sp_atk = candidate.stats.get('special_attack', 0)
+        avg_atk = avg_stats[STAT_ATTACK]
+        avg_sp_atk = avg_stats[STAT_SPECIAL_ATTACK]
+        cand_atk = candidate_stats[STAT_ATTACK]
+        cand_sp_atk = candidate_stats[STAT_SPECIAL_ATTACK]
 
         # Si l'equip és molt físic, bonificar atacants especials
         if avg_atk > avg_sp_atk + 15 and cand_sp_atk > cand_atk + 15:
@@ -625,10 +552,10 @@ class RecommendationEngine:
             reasons.append("Equilibra l'equip afegint un atacant físic")
 
         # 3. Balanç Defensiu (Físic/Especial)
-        avg_def = avg_stats.get('defense', 0)
-        avg_sp_def = avg_stats.get('special_defense', 0)
-        cand_def = candidate.stats.get('defense', 0)
-        cand_sp_def = candidate.stats.get('special_defense', 0)
+        avg_def = avg_stats[STAT_DEFENSE]
+        avg_sp_def = avg_stats[STAT_SPECIAL_DEFENSE]
+        cand_def = candidate_stats[STAT_DEFENSE]
+        cand_sp_def = candidate_stats[STAT_SPECIAL_DEFENSE]
 
         if avg_def > avg_sp_def + 15 and cand_sp_def > cand_def + 10:
             score += 7
@@ -638,7 +565,7 @@ class RecommendationEngine:
             reasons.append("Equilibra les defenses amb més defensa física")
 
         # 4. Bonificació general per stats altes
-        total_stats = sum(candidate.stats.values())
+        total_stats = sum(candidate_stats)
         if total_stats > 520:
             score += 5
             reasons.append(f"Estadístiques base totals altes ({total_stats})")
@@ -649,6 +576,299 @@ class RecommendationEngine:
         return score, reasons, [] # No hi ha avisos per estadístiques
 
 
+class TeamAnalysis:
+    """
+    Anàlisi compacta d'un equip.
+
+    Els conjunts de tipus són enters de 18 bits i els comptadors són llistes
+    de mida fixa, tots indexats per l'ordre canònic de tipus de
+    TypeProfileTable. El diccionari amb noms de tipus només es construeix a
+    la frontera de l'API (to_dict).
+    """
+
+    __slots__ = (
+        'profiles', 'weak_counts', 'resist_counts', 'weak_mask', 'immune_mask',
+        'offensive_mask', 'present_mask', 'avg_stats', 'total_members'
+    )
+
+    def __init__(self, profiles: TypeProfileTable, weak_counts: List[int], resist_counts: List[int],
+                 immune_mask: int, offensive_mask: int, present_mask: int,
+                 avg_stats: Tuple[float, ...], total_members: int):
+        self.profiles = profiles
+        self.weak_counts = weak_counts          # Debilitats netes per tipus atacant (0 = cap)
+        self.resist_counts = resist_counts      # Membres que resisteixen cada tipus atacant
+        self.weak_mask = sum(1 << i for i, count in enumerate(weak_counts) if count)
+        self.immune_mask = immune_mask          # Tipus als quals algun membre és immune
+        self.offensive_mask = offensive_mask    # Tipus que l'equip colpeja com a súper-efectiu
+        self.present_mask = present_mask        # Tipus defensius presents a l'equip
+        self.avg_stats = avg_stats              # Mitjanes en l'ordre de STAT_NAMES (buit si no hi ha equip)
+        self.total_members = total_members
+
+    def to_dict(self) -> Dict:
+        """Format amb noms de tipus (el que es retorna a l'API)."""
+        names = self.profiles.type_names
+        return {
+            'weaknesses': {names[i]: count for i, count in enumerate(self.weak_counts) if count},
+            'resistances': {names[i]: count for i, count in enumerate(self.resist_counts) if count > 0},
+            'immunities': list(self.profiles.names(self.immune_mask)),
+            'offensive_types': list(self.profiles.names(self.offensive_mask)),
+            'present_types': list(self.profiles.names(self.present_mask)),
+            'avg_stats': dict(zip(STAT_NAMES, self.avg_stats)),
+            'total_members': self.total_members
+        }
+
+
+class TeamState:
+    """
+    Estat incremental de l'anàlisi d'un equip.
+
+    Manté els comptadors que fa servir el motor (debilitats, resistències,
+    immunitats, cobertura ofensiva, tipus presents i sumes d'estadístiques)
+    en llistes indexades per tipus, i els actualitza en afegir o treure un
+    membre en lloc de tornar a analitzar tot l'equip. Això permet:
+
+    - add(pokemon) / remove(pokemon) en temps constant.
+    - delta_score(candidat): la puntuació que tindria el candidat si s'afegís
+      ara a l'equip, sense construir el raonament (temps constant).
+    - evaluate(candidat): la Recommendation completa, igual que el motor.
+    """
+
+    STAT_NAMES = STAT_NAMES
+
+    def __init__(self, engine: RecommendationEngine, members: Optional[List[Pokemon]] = None):
+        """
+        Args:
+            engine: Motor de recomanació (taula de tipus i pesos)
+            members: Membres inicials de l'equip
+        """
+        self.engine = engine
+        self.members = []
+        self._ids = {}
+
+        size = len(engine.type_profiles.type_names)
+        self._weak_counts = [0] * size
+        self._resist_counts = [0] * size
+        self._immune_counts = [0] * size
+        self._offensive_counts = [0] * size
+        self._present_counts = [0] * size
+        self._stat_sums = [0] * len(STAT_NAMES)
+        self._analysis = None
+
+        for pokemon in members or []:
+            self.add(pokemon)
+
+    # ------------------------------------------------------------------
+    # Modificació de l'equip
+    # ------------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+    def contains(self, pokedex_id: int) -> bool:
+        return pokedex_id in self._ids
+
+    def add(self, pokemon: Pokemon) -> "TeamState":
+        """Afegeix un membre a l'equip."""
+        self._apply(pokemon, 1)
+        self.members.append(pokemon)
+        self._ids[pokemon.pokedex_id] = self._ids.get(pokemon.pokedex_id, 0) + 1
+        return self
+
+    def remove(self, pokemon: Pokemon) -> "TeamState":
+        """Treu un membre de l'equip (error si no hi és)."""
+        for index, member in enumerate(self.members):
+            if member.pokedex_id == pokemon.pokedex_id:
+                break
+        else:
+            raise ValueError(f"El Pokémon #{pokemon.pokedex_id} no és a l'equip")
+
+        member = self.members.pop(index)
+        self._apply(member, -1)
+        self._ids[member.pokedex_id] -= 1
+        if not self._ids[member.pokedex_id]:
+            del self._ids[member.pokedex_id]
+        return self
+
+    def copy(self) -> "TeamState":
+        """Còpia independent (per provar 'i si...' sense tocar l'original)."""
+        clone = TeamState.__new__(TeamState)
+        clone.engine = self.engine
+        clone.members = list(self.members)
+        clone._ids = dict(self._ids)
+        clone._weak_counts = list(self._weak_counts)
+        clone._resist_counts = list(self._resist_counts)
+        clone._immune_counts = list(self._immune_counts)
+        clone._offensive_counts = list(self._offensive_counts)
+        clone._present_counts = list(self._present_counts)
+        clone._stat_sums = list(self._stat_sums)
+        clone._analysis = self._analysis
+        return clone
+
+    def _apply(self, pokemon: Pokemon, sign: int):
+        profiles = self.engine.type_profiles
+        for tid in pokemon.type_ids:
+            index = profiles.id_index.get(tid)
+            if index is None:
+                continue
+            self._present_counts[index] += sign
+
+            weak_from, resist_from, immune_from, effective_to = profiles.relations[index]
+            for i in weak_from:
+                self._weak_counts[i] += sign
+            for i in resist_from:
+                self._resist_counts[i] += sign
+            for i in immune_from:
+                self._immune_counts[i] += sign
+            for i in effective_to:
+                self._offensive_counts[i] += sign
+
+        for k, value in enumerate(pokemon.base_stats):
+            self._stat_sums[k] += sign * value
+
+        self._analysis = None
+
+    # ------------------------------------------------------------------
+    # Anàlisi i puntuació
+    # ------------------------------------------------------------------
+    def analysis(self) -> TeamAnalysis:
+        """
+        Anàlisi de l'equip (es recalcula només si l'equip ha canviat).
+        """
+        if self._analysis is not None:
+            return self._analysis
+
+        immune_mask = offensive_mask = present_mask = 0
+        weak_counts = []
+        for i, (weak, resist, immune, offensive, present) in enumerate(zip(
+                self._weak_counts, self._resist_counts, self._immune_counts,
+                self._offensive_counts, self._present_counts)):
+            bit = 1 << i
+            if immune > 0:
+                immune_mask |= bit
+            if offensive > 0:
+                offensive_mask |= bit
+            if present > 0:
+                present_mask |= bit
+            # Debilitat neta: més membres febles que resistents i cap immune
+            weak_counts.append(weak - resist if weak > resist and not immune > 0 else 0)
+
+        size = len(self.members)
+        self._analysis = TeamAnalysis(
+            self.engine.type_profiles,
+            weak_counts,
+            list(self._resist_counts),
+            immune_mask,
+            offensive_mask,
+            present_mask,
+            tuple(total / size for total in self._stat_sums) if size else (),
+            size
+        )
+        return self._analysis
+
+    def evaluate(self, candidate: Pokemon) -> Recommendation:
+        """Recommendation completa del candidat (amb raonament)."""
+        return self.engine._evaluate_candidate(candidate, self.members, self.analysis())
+
+    def delta_score(self, candidate: Pokemon) -> float:
+        """
+        Puntuació final que tindria el candidat si s'afegís ara a l'equip.
+        Segueix exactament les regles de _evaluate_candidate, però sense
+        construir les llistes de raons i avisos.
+        """
+        analysis = self.analysis()
+        profile = self.engine.type_profiles.profile_of(candidate)
+        weights = self.engine.WEIGHTS
+
+        return (
+                self._defensive(profile, analysis) * weights['defensive'] +
+                self._offensive(profile, analysis) * weights['offensive'] +
+                self._diversity(candidate, profile, analysis) * weights['diversity'] +
+                self._stats(candidate, analysis) * weights['stats']
+        )
+
+    @staticmethod
+    def _defensive(profile: TypeProfile, analysis: TeamAnalysis) -> float:
+        weak_mask = analysis.weak_mask
+        weak_counts = analysis.weak_counts
+        new_weaknesses = profile.weaknesses & ~analysis.immune_mask
+
+        score = 50.0
+        # Normalment no hi ha cap coincidència: només es recorren els bits actius
+        covered = profile.resistances & weak_mask
+        if covered:
+            for i in iter_bits(covered):
+                score += weak_counts[i] * 10
+        covered = profile.immunities & weak_mask
+        if covered:
+            for i in iter_bits(covered):
+                score += weak_counts[i] * 15
+        stacked = new_weaknesses & weak_mask
+        if stacked:
+            for i in iter_bits(stacked):
+                score -= weak_counts[i] * 7
+        score -= 5 * popcount(new_weaknesses & ~weak_mask)
+
+        return max(0, min(100, score))
+
+    @staticmethod
+    def _offensive(profile: TypeProfile, analysis: TeamAnalysis) -> float:
+        new_coverage = popcount(profile.offensive & ~analysis.offensive_mask)
+        score = 50.0 + new_coverage * 5 if new_coverage else 40.0
+        return max(0, min(100, score))
+
+    @staticmethod
+    def _diversity(candidate: Pokemon, profile: TypeProfile, analysis: TeamAnalysis) -> float:
+        # Tipus fora de la taula (no n'hi ha als jocs) compten com a nous
+        unknown = len(candidate.type_ids) - len(profile.types)
+        new_types = popcount(profile.mask & ~analysis.present_mask) + unknown
+
+        score = 50.0
+        if new_types == 2:
+            score += 30
+        elif new_types == 1:
+            score += 20
+        else:
+            score -= 10
+        if len(candidate.type_ids) == 2:
+            score += 10
+        return max(0, min(100, score))
+
+    @staticmethod
+    def _stats(candidate: Pokemon, analysis: TeamAnalysis) -> float:
+        avg_stats = analysis.avg_stats
+        if not avg_stats or not any(avg_stats):
+            return 50.0
+
+        score = 50.0
+        stats = candidate.base_stats
+        for candidate_stat, avg in zip(stats, avg_stats):
+            if avg < 80 and candidate_stat > avg + 15:
+                score += (candidate_stat - avg) / 10
+
+        avg_atk = avg_stats[STAT_ATTACK]
+        avg_sp_atk = avg_stats[STAT_SPECIAL_ATTACK]
+        cand_atk = stats[STAT_ATTACK]
+        cand_sp_atk = stats[STAT_SPECIAL_ATTACK]
+        if avg_atk > avg_sp_atk + 15 and cand_sp_atk > cand_atk + 15:
+            score += 10
+        elif avg_sp_atk > avg_atk + 15 and cand_atk > cand_sp_atk + 15:
+            score += 10
+
+        avg_def = avg_stats[STAT_DEFENSE]
+        avg_sp_def = avg_stats[STAT_SPECIAL_DEFENSE]
+        cand_def = stats[STAT_DEFENSE]
+        cand_sp_def = stats[STAT_SPECIAL_DEFENSE]
+        if avg_def > avg_sp_def + 15 and cand_sp_def > cand_def + 10:
+            score += 7
+        elif avg_sp_def > avg_def + 15 and cand_def > cand_sp_def + 10:
+            score += 7
+
+        if sum(stats) > 520:
+            score += 5
+
+        return max(0, min(100, score))
+
+
 def format_recommendation_text(rec: Recommendation) -> str:
     """
     Formata una recomanació en text llegible.
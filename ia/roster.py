@@ -0,0 +1,136 @@
+"""
+Roster de Pokémon en format compacte (structure of arrays)
+=========================================================
+
+El servei d'IA carrega ~1000 Pokémon a cada recomanació. En lloc d'una
+llista d'objectes amb un diccionari d'estadístiques i una llista de tipus
+cadascun, `Roster` guarda cada camp en una columna:
+
+- `ids`: array('i') amb el pokedex_id
+- `type1`, `type2`: array('b') amb l'identificador del tipus (-1 = cap)
+- `stats`: una array('H') per estadística, en l'ordre de STAT_NAMES
+- `names`: llista de noms
+
+Els `Pokemon` (immutables, amb __slots__) es creen a partir de les columnes
+només quan es consulten i es reutilitzen.
+"""
+
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from recommendation_engine import STAT_NAMES, Pokemon
+from type_profiles import type_ids
+
+
+class Roster:
+    """
+    Col·lecció de Pokémon en columnes. Es comporta com una llista de
+    Pokemon (len, índex, iteració), que és el que esperen el motor i la
+    compleció d'equips.
+    """
+
+    __slots__ = ('ids', 'names', 'type1', 'type2', 'stats', '_pokemon', '_positions')
+
+    def __init__(self):
+        self.ids = array('i')
+        self.names = []
+        self.type1 = array('b')
+        self.type2 = array('b')
+        self.stats = [array('H') for _ in STAT_NAMES]
+        self._pokemon = []       # Pokemon ja creats (None fins que es consulten)
+        self._positions = {}     # pokedex_id → posició
+
+    def append(self, pokedex_id: int, name: str, types: List[str], stats: Dict[str, int]):
+        """Afegeix un Pokémon a partir de noms de tipus i un diccionari d'estadístiques."""
+        ids = type_ids(types)[:2] + (-1, -1)
+        self._positions[pokedex_id] = len(self.ids)
+        self.ids.append(pokedex_id)
+        self.names.append(name)
+        self.type1.append(ids[0])
+        self.type2.append(ids[1])
+        for column, stat in zip(self.stats, STAT_NAMES):
+            column.append(int(stats.get(stat, 0)))
+        self._pokemon.append(None)
+
+    @classmethod
+    def from_sources(cls, sources: Iterable[Dict]) -> "Roster":
+        """Construeix el roster a partir de documents de l'índex 'pokemon'."""
+        sources = list(sources)
+        ids = [type_ids(data['types'])[:2] + (-1, -1) for data in sources]
+        stats = [data['stats'] for data in sources]
+
+        # Columna a columna: molt més ràpid que afegir camp a camp
+        return _restore_roster(
+            array('i', [data['pokedex_id'] for data in sources]),
+            [data['name'] for data in sources],
+            array('b', [row[0] for row in ids]),
+            array('b', [row[1] for row in ids]),
+            [array('H', [int(row.get(stat, 0)) for row in stats]) for stat in STAT_NAMES]
+        )
+
+    @classmethod
+    def from_pokemon(cls, pokemon_list: Iterable[Pokemon]) -> "Roster":
+        roster = cls()
+        for pokemon in pokemon_list:
+            roster.append(pokemon.pokedex_id, pokemon.name, pokemon.types, pokemon.stats)
+        return roster
+
+    # ------------------------------------------------------------------
+    # Accés com a llista
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        pokemon = self._pokemon[index]
+        if pokemon is None:
+            if index < 0:
+                index += len(self)
+            type1, type2 = self.type1[index], self.type2[index]
+            hp, attack, defense, special_attack, special_defense, speed = self.stats
+            pokemon = Pokemon(
+                self.ids[index],
+                self.names[index],
+                (type1, type2) if type2 >= 0 else (type1,) if type1 >= 0 else (),
+                (hp[index], attack[index], defense[index],
+                 special_attack[index], special_defense[index], speed[index])
+            )
+            self._pokemon[index] = pokemon
+        return pokemon
+
+    def __iter__(self) -> Iterator[Pokemon]:
+        if None in self._pokemon:
+            for index in range(len(self)):
+                self[index]
+        return iter(self._pokemon)
+
+    def get(self, pokedex_id: int) -> Optional[Pokemon]:
+        """Pokémon per pokedex_id (None si no hi és)."""
+        position = self._positions.get(pokedex_id)
+        return None if position is None else self[position]
+
+    def where(self, keep: Callable[[int], bool]) -> "Roster":
+        """Nou roster amb els Pokémon el pokedex_id dels quals compleix 'keep' (mateix ordre)."""
+        positions = [i for i, pokedex_id in enumerate(self.ids) if keep(pokedex_id)]
+        return _restore_roster(
+            array('i', [self.ids[i] for i in positions]),
+            [self.names[i] for i in positions],
+            array('b', [self.type1[i] for i in positions]),
+            array('b', [self.type2[i] for i in positions]),
+            [array('H', [column[i] for i in positions]) for column in self.stats]
+        )
+
+    def __reduce__(self):
+        # Als processos del pool només s'hi envien les columnes
+        return (_restore_roster, (self.ids, self.names, self.type1, self.type2, self.stats))
+
+
+def _restore_roster(ids, names, type1, type2, stats) -> Roster:
+    roster = Roster()
+    roster.ids, roster.names, roster.type1, roster.type2, roster.stats = ids, names, type1, type2, stats
+    roster._pokemon = [None] * len(ids)
+    roster._positions = {pokedex_id: i for i, pokedex_id in enumerate(ids)}
+    return roster
@@ -0,0 +1,258 @@
+"""
+Compleció d'equips per a PokeBuilder
+====================================
+
+`RecommendationEngine.recommend()` només suggereix el següent membre.
+Aquest mòdul busca equips complets de 6 a partir de 0-5 membres fixos:
+
+- Cerca en feix (beam search): a cada nivell s'afegeix un membre a cada
+  equip parcial i només es conserven els `beam_width` millors.
+- La puntuació d'un equip és la suma de les puntuacions del motor per a
+  cada membre afegit (cada un avaluat contra l'equip que tenia al davant).
+- Poda per cota superior: abans d'avaluar un candidat es calcula una cota
+  barata de la seva puntuació. Els candidats s'avaluen de millor a pitjor
+  cota i, quan la cota ja no pot superar el pitjor equip del feix, la resta
+  es descarta sense avaluar-los.
+- Pressupost de temps: si s'esgota, els equips parcials es completen de
+  manera voraç (el millor candidat a cada pas).
+
+La cerca es fa al mateix procés: amb la poda, expandir un nivell costa
+menys que crear un pool i enviar-li tots els candidats a cada petició.
+
+Autor: PokeBuilder Team
+"""
+
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from recommendation_engine import (
+    STAT_ATTACK, STAT_DEFENSE, STAT_SPECIAL_ATTACK, STAT_SPECIAL_DEFENSE,
+    Pokemon, Recommendation, RecommendationEngine, TeamAnalysis, TeamState
+)
+from type_profiles import popcount
+
+TEAM_SIZE = 6
+
+
+@dataclass
+class TeamCompletion:
+    """Un equip complet proposat, amb l'explicació de cada membre afegit."""
+    members: List[Pokemon]            # Els 6 membres (fixos + afegits)
+    added: List[Recommendation]       # Un per cada membre afegit, en ordre
+    score: float                      # Puntuació mitjana dels membres afegits (0-100)
+
+
+@dataclass
+class _Node:
+    """Equip parcial dins la cerca."""
+    members: List[Pokemon]
+    added: List[Recommendation]
+    total: float
+    ids: frozenset
+
+
+class TeamCompleter:
+    """
+    Cerca en feix d'equips complets sobre la funció de puntuació del motor.
+    """
+
+    def __init__(self, engine: RecommendationEngine, candidates: List[Pokemon]):
+        """
+        Args:
+            engine: Motor de recomanació (defineix la puntuació)
+            candidates: Pokémon que es poden afegir a l'equip
+        """
+        self.engine = engine
+        self.candidates = candidates
+
+        # Part de la cota superior que només depèn del candidat (es calcula un cop)
+        self._offensive_ub = []
+        self._diversity_ub = []
+        self._stats = []
+        self._bst_bonus = []
+        for pokemon in candidates:
+            coverage = popcount(engine.type_profiles.profile_of(pokemon).offensive)
+            self._offensive_ub.append(min(100.0, 50.0 + 5 * coverage))
+            self._diversity_ub.append(90.0 if len(pokemon.type_ids) == 2 else 70.0)
+            self._stats.append(pokemon.base_stats)
+            self._bst_bonus.append(5.0 if sum(pokemon.base_stats) > 520 else 0.0)
+
+        # Estadístiques de la cerca (per diagnosticar)
+        self.evaluated = 0
+        self.pruned = 0
+
+    # ------------------------------------------------------------------
+    # Cerca
+    # ------------------------------------------------------------------
+    def search(
+            self,
+            fixed: List[Pokemon],
+            top_k: int = 3,
+            beam_width: int = 8,
+            time_budget: float = 1.0
+    ) -> Tuple[List[TeamCompletion], Dict]:
+        """
+        Busca els millors equips complets que contenen els membres fixos.
+
+        Args:
+            fixed: Membres que l'equip ha de tenir (0-5)
+            top_k: Nombre d'equips a retornar
+            beam_width: Equips parcials que es conserven a cada nivell
+            time_budget: Segons màxims de cerca en feix
+
+        Returns:
+            Tupla (equips ordenats per puntuació, estadístiques de la cerca)
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget
+        slots = TEAM_SIZE - len(fixed)
+        width = max(beam_width, top_k)
+
+        beam = [_Node(list(fixed), [], 0.0, frozenset(p.pokedex_id for p in fixed))]
+        depth = 0
+        timed_out = False
+
+        while depth < slots and beam:
+            if time.perf_counter() >= deadline:
+                timed_out = True
+                break
+            beam = self._expand_level(beam, width, deadline)
+            depth += 1
+
+        # Sense temps: completem cada equip parcial de manera voraç
+        if depth < slots:
+            beam.sort(key=lambda node: node.total, reverse=True)
+            beam = [self._complete_greedy(node) for node in beam[:top_k]]
+            beam = [node for node in beam if node is not None]
+
+        beam.sort(key=lambda node: node.total, reverse=True)
+        results = []
+        for node in beam[:top_k]:
+            score = node.total / len(node.added) if node.added else 0.0
+            results.append(TeamCompletion(node.members, node.added, score))
+
+        stats = {
+            "evaluated": self.evaluated,
+            "pruned": self.pruned,
+            "beam_depth": depth,
+            "timed_out": timed_out,
+            "elapsed": round(time.perf_counter() - start, 3)
+        }
+        return results, stats
+
+    def _expand_level(self, beam: List[_Node], width: int, deadline: float) -> List[_Node]:
+        """Expandeix tots els equips parcials d'un nivell al mateix procés."""
+        best = {}       # conjunt d'IDs → millor node fill
+        heap = []       # puntuacions dels 'width' millors fills (mínim a dalt)
+
+        for node in beam:
+            # Sense temps: ens quedem amb els fills trobats fins ara
+            if best and time.perf_counter() >= deadline:
+                break
+            threshold = heap[0] if len(heap) >= width else float("-inf")
+            for total, index, rec in self.expand_node(node, width, threshold):
+                self._merge_child(best, heap, width, node, total, self.candidates[index], rec)
+
+        return sorted(best.values(), key=lambda n: n.total, reverse=True)[:width]
+
+    @staticmethod
+    def _merge_child(best, heap, width, node, total, pokemon, rec):
+        ids = node.ids | {pokemon.pokedex_id}
+        # El mateix equip pot sortir per ordres diferents: ens quedem el millor
+        if ids in best:
+            if best[ids].total < total:
+                best[ids] = _Node(node.members + [pokemon], node.added + [rec], total, ids)
+            return
+        best[ids] = _Node(node.members + [pokemon], node.added + [rec], total, ids)
+        if len(heap) < width:
+            heapq.heappush(heap, total)
+        elif total > heap[0]:
+            heapq.heapreplace(heap, total)
+
+    def _complete_greedy(self, node: _Node) -> Optional[_Node]:
+        """Omple un equip parcial afegint sempre el millor candidat."""
+        while len(node.members) < TEAM_SIZE:
+            children = self.expand_node(node, 1, float("-inf"))
+            if not children:
+                return None
+            total, index, rec = children[0]
+            pokemon = self.candidates[index]
+            node = _Node(node.members + [pokemon], node.added + [rec], total, node.ids | {pokemon.pokedex_id})
+        return node
+
+    def expand_node(self, node: _Node, width: int, threshold: float) -> List[Tuple[float, int, Recommendation]]:
+        """
+        Retorna els 'width' millors fills d'un equip parcial.
+
+        Els candidats s'avaluen per ordre de cota superior i la iteració
+        s'atura quan la cota ja no pot superar 'threshold' ni el pitjor fill
+        trobat fins ara.
+
+        Returns:
+            Llista de (puntuació total, índex del candidat, recomanació)
+        """
+        state = TeamState(self.engine, node.members)
+        bounds = self._upper_bounds(state.analysis(), state.size)
+
+        order = sorted(range(len(self.candidates)), key=bounds.__getitem__, reverse=True)
+        heap = []   # (total, índex), mínim a dalt
+        for position, index in enumerate(order):
+            floor = heap[0][0] if len(heap) >= width else threshold
+            if node.total + bounds[index] <= floor:
+                # Ordenats per cota: cap dels que queden pot entrar
+                self.pruned += len(order) - position
+                break
+
+            candidate = self.candidates[index]
+            if state.contains(candidate.pokedex_id):
+                continue
+
+            # Només la puntuació; el raonament es construeix per als que queden
+            self.evaluated += 1
+            entry = (node.total + state.delta_score(candidate), index)
+            if len(heap) < width:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+        heap.sort(key=lambda entry: entry[0], reverse=True)
+        return [(total, index, state.evaluate(self.candidates[index])) for total, index in heap]
+
+    def _upper_bounds(self, analysis: TeamAnalysis, team_size: int) -> List[float]:
+        """
+        Cota superior de la puntuació de cada candidat per a un equip.
+        Segueix les mateixes regles que les puntuacions del motor, però
+        suposant el millor cas a cada criteri.
+        """
+        weights = self.engine.WEIGHTS
+
+        # Defensiva: com a molt +15 per cada debilitat de l'equip coberta
+        defensive_ub = min(100.0, 50.0 + 15 * sum(analysis.weak_counts))
+
+        avg = analysis.avg_stats
+        # Equip buit: la puntuació d'estadístiques és sempre 50
+        empty = team_size == 0 or not any(avg)
+        if not empty:
+            low = [(i, mean) for i, mean in enumerate(avg) if mean < 80]
+            offensive_skew = abs(avg[STAT_ATTACK] - avg[STAT_SPECIAL_ATTACK]) > 15
+            defensive_skew = abs(avg[STAT_DEFENSE] - avg[STAT_SPECIAL_DEFENSE]) > 15
+            balance_bonus = (10.0 if offensive_skew else 0.0) + (7.0 if defensive_skew else 0.0)
+
+        bounds = []
+        for index in range(len(self.candidates)):
+            if empty:
+                stats_bound = 50.0
+            else:
+                stats = self._stats[index]
+                bonus = sum((stats[i] - mean) / 10 for i, mean in low if stats[i] > mean + 15)
+                stats_bound = min(100.0, 50.0 + bonus + balance_bonus + self._bst_bonus[index])
+
+            bounds.append(
+                defensive_ub * weights['defensive'] +
+                self._offensive_ub[index] * weights['offensive'] +
+                self._diversity_ub[index] * weights['diversity'] +
+                stats_bound * weights['stats']
+            )
+        return bounds
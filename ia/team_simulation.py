@@ -0,0 +1,206 @@
+"""
+Simulació d'enfrontaments entre equips (Monte Carlo)
+====================================================
+
+Estima la probabilitat que un equip guanyi un altre amb partides
+simplificades 1 contra 1, fetes amb els sets reals dels dos equips:
+
+- Cada membre fa sempre el seu millor moviment contra el rival actiu
+  (DamageEngine), amb la precisió i la tirada de dany a l'atzar.
+- Ataca primer el més ràpid (empats a cara o creu).
+- Quan un Pokémon cau, entra el membre viu amb millor enfrontament contra
+  el rival actiu. Els líders de cada partida es trien a l'atzar.
+- Una partida que arriba a MAX_TURNS sense guanyador compta com a empat.
+
+Les partides es fan en trossos de ROLLOUT_CHUNK, cadascun amb la seva
+llavor derivada de la llavor de la simulació: amb la mateixa llavor i el
+mateix nombre de partides el resultat és idèntic, tant si els trossos es
+reparteixen entre un pool de processos com si es fan al mateix procés.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from damage_engine import STAT_SPEED, BattleSet, DamageEngine
+
+# Partides per tros (unitat de feina del pool i de les llavors)
+ROLLOUT_CHUNK = 250
+
+# Torns màxims d'una partida (després, empat)
+MAX_TURNS = 100
+
+# Quantil de la normal per a l'interval de confiança del 95%
+Z_95 = 1.96
+
+
+@dataclass(frozen=True)
+class MatchupTable:
+    """
+    Tot el que necessiten les partides, precalculat i serialitzable (és el
+    que s'envia als processos del pool). Índex 0 = equip A, 1 = equip B.
+    """
+    speed: Tuple[Tuple[int, ...], Tuple[int, ...]]
+    # hits[costat][atacant][defensor] = (precisió 0-1, dany mínim, dany màxim) en fracció de PS
+    hits: Tuple[Tuple[Tuple[Tuple[float, float, float], ...], ...], ...]
+    # switch_order[costat][rival actiu] = membres del costat, del millor al pitjor contra aquest rival
+    switch_order: Tuple[Tuple[Tuple[int, ...], ...], ...]
+
+
+def build_matchup_table(
+        damage_engine: DamageEngine,
+        team_a: Sequence[BattleSet],
+        team_b: Sequence[BattleSet],
+        terastallized: bool = False
+) -> MatchupTable:
+    """Calcula el millor moviment de cada membre contra cada rival i l'ordre de relleus."""
+    sides = (team_a, team_b)
+    hits = []
+    expected = []
+    for attackers, defenders in ((team_a, team_b), (team_b, team_a)):
+        matrix = damage_engine.damage_matrix(attackers, defenders, terastallized)
+        side_hits = []
+        side_expected = []
+        for a in range(len(attackers)):
+            row_hits = []
+            row_expected = []
+            for d in range(len(defenders)):
+                move, low, high = matrix.best(a, d)
+                accuracy = move.accuracy / 100 if move else 0.0
+                row_hits.append((accuracy, low, high))
+                row_expected.append((low + high) / 2 * accuracy)
+            side_hits.append(tuple(row_hits))
+            side_expected.append(row_expected)
+        hits.append(tuple(side_hits))
+        expected.append(side_expected)
+
+    # Relleus: primer el membre que fa més dany al rival i en rep menys
+    switch_order = []
+    for side in (0, 1):
+        own, rival = expected[side], expected[1 - side]
+        switch_order.append(tuple(
+            tuple(sorted(
+                range(len(sides[side])),
+                key=lambda member: rival[opponent][member] - own[member][opponent]
+            ))
+            for opponent in range(len(sides[1 - side]))
+        ))
+
+    return MatchupTable(
+        speed=tuple(tuple(member.stats[STAT_SPEED] for member in team) for team in sides),
+        hits=tuple(hits),
+        switch_order=tuple(switch_order)
+    )
+
+
+def run_rollouts(task) -> Tuple[int, int, int, List[int], List[int]]:
+    """
+    Fa un tros de partides (és la funció que executen els processos del pool).
+
+    Args:
+        task: (MatchupTable, nombre de partides, llavor)
+
+    Returns:
+        (victòries A, victòries B, empats, KOs de cada membre d'A, KOs de cada membre de B)
+    """
+    table, count, seed = task
+    rng = random.Random(seed)
+    kos = ([0] * len(table.speed[0]), [0] * len(table.speed[1]))
+    results = [0, 0, 0]
+    for _ in range(count):
+        results[_rollout(table, rng, kos)] += 1
+    return results[0], results[1], results[2], kos[0], kos[1]
+
+
+def _rollout(table: MatchupTable, rng: random.Random, kos: Tuple[List[int], List[int]]) -> int:
+    """Una partida. Retorna 0 si guanya A, 1 si guanya B i 2 si és empat."""
+    speed, hits, switch_order = table.speed, table.hits, table.switch_order
+    hp = ([1.0] * len(speed[0]), [1.0] * len(speed[1]))
+    alive = [len(speed[0]), len(speed[1])]
+    active = [rng.randrange(alive[0]), rng.randrange(alive[1])]
+    random_value, uniform = rng.random, rng.uniform
+
+    for _ in range(MAX_TURNS):
+        speed_a, speed_b = speed[0][active[0]], speed[1][active[1]]
+        first = 0 if speed_a > speed_b or (speed_a == speed_b and random_value() < 0.5) else 1
+
+        for side in (first, 1 - first):
+            attacker, defender = active[side], active[1 - side]
+            accuracy, low, high = hits[side][attacker][defender]
+            if high <= 0 or random_value() >= accuracy:
+                continue
+
+            rival_hp = hp[1 - side]
+            rival_hp[defender] -= uniform(low, high)
+            if rival_hp[defender] > 0:
+                continue
+
+            # KO: el rival treu el següent membre viu (i el que ha caigut ja no ataca)
+            kos[side][attacker] += 1
+            alive[1 - side] -= 1
+            if not alive[1 - side]:
+                return side
+            for member in switch_order[1 - side][attacker]:
+                if rival_hp[member] > 0:
+                    active[1 - side] = member
+                    break
+            break
+
+    return 2
+
+
+def simulate(table: MatchupTable, rollouts: int, seed: int, pool=None) -> Dict:
+    """
+    Fa 'rollouts' partides en trossos de ROLLOUT_CHUNK.
+
+    Args:
+        table: Taula de l'enfrontament (build_matchup_table)
+        rollouts: Nombre total de partides
+        seed: Llavor de la simulació
+        pool: Executor per repartir els trossos (None = al mateix procés)
+
+    Returns:
+        Diccionari amb les victòries, els empats, la taxa de victòria d'A
+        (els empats compten mig), el seu interval de confiança del 95% i
+        els KOs de cada membre dels dos equips
+    """
+    seeds = random.Random(seed)
+    tasks = []
+    for start in range(0, rollouts, ROLLOUT_CHUNK):
+        tasks.append((table, min(ROLLOUT_CHUNK, rollouts - start), seeds.getrandbits(64)))
+
+    chunks = pool.map(run_rollouts, tasks) if pool is not None else map(run_rollouts, tasks)
+
+    wins_a = wins_b = draws = 0
+    kos_a = [0] * len(table.speed[0])
+    kos_b = [0] * len(table.speed[1])
+    for chunk_a, chunk_b, chunk_draws, chunk_kos_a, chunk_kos_b in chunks:
+        wins_a += chunk_a
+        wins_b += chunk_b
+        draws += chunk_draws
+        kos_a = [total + ko for total, ko in zip(kos_a, chunk_kos_a)]
+        kos_b = [total + ko for total, ko in zip(kos_b, chunk_kos_b)]
+
+    score = wins_a + draws / 2
+    low, high = wilson_interval(score, rollouts)
+    return {
+        "rollouts": rollouts,
+        "wins": wins_a,
+        "losses": wins_b,
+        "draws": draws,
+        "win_rate": score / rollouts if rollouts else 0.0,
+        "confidence_interval": (low, high),
+        "kos": (kos_a, kos_b)
+    }
+
+
+def wilson_interval(successes: float, n: int, z: float = Z_95) -> Tuple[float, float]:
+    """Interval de confiança de Wilson d'una proporció (successes de n)."""
+    if n <= 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
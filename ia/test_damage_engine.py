@@ -0,0 +1,133 @@
+"""
+Tests del càlcul de dany
+========================
+
+Estadístiques finals i rangs de dany comparats amb valors calculats a mà
+amb la fórmula dels jocs (nivell 50, IVs 31): STAB, STAB amb Tera, objectes
+Choice, Mineral Evolutiu (Eviolite) i Cinta Experta (Expert Belt).
+
+Ús:
+    python3 -m pytest -q ia/test_damage_engine.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from damage_engine import PHYSICAL, DamageEngine, Move, apply_modifier, nature_modifiers
+from recommendation_engine import Pokemon
+from type_profiles import type_id
+
+STATS = ["hp", "attack", "defense", "special_attack", "special_defense", "speed"]
+
+GARCHOMP = Pokemon.create(445, "garchomp", ["dragon", "ground"], dict(zip(STATS, (108, 130, 95, 80, 85, 102))))
+PIKACHU = Pokemon.create(25, "pikachu", ["electric"], dict(zip(STATS, (35, 55, 40, 50, 50, 90))))
+FERROTHORN = Pokemon.create(598, "ferrothorn", ["grass", "steel"], dict(zip(STATS, (74, 94, 131, 54, 116, 20))))
+
+EARTHQUAKE = Move("earthquake", type_id("ground"), PHYSICAL, 100, 100)
+DRAGON_CLAW = Move("dragon-claw", type_id("dragon"), PHYSICAL, 80, 100)
+IRON_HEAD = Move("iron-head", type_id("steel"), PHYSICAL, 80, 100)
+
+NATURES = {
+    "jolly": nature_modifiers("speed", "special-attack"),
+    "impish": nature_modifiers("defense", "special-attack"),
+    "modest": nature_modifiers("special-attack", "attack")
+}
+
+
+@pytest.fixture
+def damage(engine):
+    return DamageEngine(engine.type_profiles, NATURES)
+
+
+def garchomp(damage, moves=(EARTHQUAKE,), **kwargs):
+    """Garchomp Jolly amb 252 d'Atac i de Velocitat (4 de PS)."""
+    return damage.build_set(
+        GARCHOMP, evs={"hp": 4, "attack": 252, "speed": 252}, nature="Jolly", moves=moves, **kwargs
+    )
+
+
+def ferrothorn(damage):
+    """Ferrothorn Impish amb 252 de PS i de Defensa."""
+    return damage.build_set(FERROTHORN, evs={"hp": 252, "defense": 252}, nature="Impish")
+
+
+def hp_range(damage, attacker, defender, terastallized=False):
+    """(mínim, màxim) en PS del millor moviment de l'atacant."""
+    matrix = damage.damage_matrix([attacker], [defender], terastallized)
+    _, low, high = matrix.best(0, 0)
+    hp = defender.stats[0]
+    return round(low * hp), round(high * hp)
+
+
+def test_final_stats(damage):
+    assert garchomp(damage).stats == (184, 182, 115, 90, 105, 169)
+    assert ferrothorn(damage).stats == (181, 114, 201, 66, 136, 40)
+    assert damage.build_set(PIKACHU).stats == (110, 75, 60, 70, 70, 110)
+    # Àlies de les claus d'EVs (com les envia el frontend) i natura desconeguda = neutra
+    assert damage.build_set(GARCHOMP, evs={"special_attack": 252}, nature="Inventada").stats[3] == 132
+    # Shedinja sempre té 1 PS
+    assert damage.final_stats((1, 90, 45, 30, 30, 40))[0] == 1
+
+
+def test_stab(damage):
+    # 252 Atk Garchomp Earthquake vs. 252 HP / 252+ Def Ferrothorn: 51-61
+    assert hp_range(damage, garchomp(damage), ferrothorn(damage)) == (51, 61)
+    # Sense STAB: Iron Head (resistit per Pikachu a la taula de prova): 45-54
+    assert hp_range(damage, garchomp(damage, (IRON_HEAD,)), damage.build_set(PIKACHU)) == (45, 54)
+
+
+def test_tera_stab(damage):
+    pikachu = damage.build_set(PIKACHU)
+
+    # Tera del mateix tipus que un dels originals: x2
+    tera_dragon = garchomp(damage, (DRAGON_CLAW,), tera_type="Dragon")
+    assert hp_range(damage, tera_dragon, pikachu) == (136, 162)
+    assert hp_range(damage, tera_dragon, pikachu, terastallized=True) == (182, 216)
+
+    # Tera d'un tipus nou: x1.5 per als moviments d'aquest tipus
+    tera_steel = garchomp(damage, (IRON_HEAD,), tera_type="Steel")
+    assert hp_range(damage, tera_steel, pikachu) == (45, 54)
+    assert hp_range(damage, tera_steel, pikachu, terastallized=True) == (68, 81)
+
+
+def test_choice_items(damage):
+    band = garchomp(damage, item="Choice Band")
+    assert band.stats[1] == 273
+    # 252 Atk Choice Band Garchomp Earthquake vs. 252 HP / 252+ Def Ferrothorn: 76-91
+    assert hp_range(damage, band, ferrothorn(damage)) == (76, 91)
+
+    specs = damage.build_set(GARCHOMP, evs={"sp_atk": 252}, nature="Modest", item="Choice Specs")
+    # 252+ SpA: 145, x1.5 = 217.5 (arrodonit cap avall)
+    assert specs.stats[3] == 217
+    scarf = garchomp(damage, item="Choice Scarf")
+    assert scarf.stats[5] == 253
+
+
+def test_eviolite(damage):
+    pikachu = damage.build_set(PIKACHU, item="Eviolite")
+    assert pikachu.stats[2] == 90 and pikachu.stats[4] == 105
+    # 252 Atk Garchomp Earthquake vs. 0 HP / 0 Def Eviolite Pikachu: 228-270
+    assert hp_range(damage, garchomp(damage), pikachu) == (228, 270)
+
+
+def test_expert_belt(damage):
+    belt = garchomp(damage, item="Expert Belt")
+    # Súper-efectiu: 342-404 sense objecte, 410-485 amb la Cinta Experta (x4915/4096)
+    assert hp_range(damage, garchomp(damage), damage.build_set(PIKACHU)) == (342, 404)
+    assert hp_range(damage, belt, damage.build_set(PIKACHU)) == (410, 485)
+    # Neutre: no canvia res
+    assert hp_range(damage, belt, ferrothorn(damage)) == (51, 61)
+    # La Vida Esfera (x5324/4096) s'aplica a tots els cops: 66-79
+    assert hp_range(damage, garchomp(damage, item="Life Orb"), ferrothorn(damage)) == (66, 79)
+
+
+def test_apply_modifier_rounds_half_down():
+    assert apply_modifier(404, 4915) == 485       # 484.79
+    assert apply_modifier(2, 6144) == 3           # 3.0
+    assert apply_modifier(3, 6144) == 4           # 4.5 → 4
+    assert apply_modifier(100, 4096) == 100
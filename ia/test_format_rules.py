@@ -0,0 +1,122 @@
+"""
+Tests de les regles de format compilades
+========================================
+
+Els formats es troben pel nom o per qualsevol àlies, el mapa de bits dels
+Pokémon respon bé als límits i els noms d'objectes, habilitats i moviments
+comparteixen bit entre formats.
+
+Ús:
+    python3 -m pytest -q ia/test_format_rules.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from format_rules import FormatRegistry, name_key
+
+BAN_LISTS = {
+    "vgc": {
+        "version": "2024-01",
+        "descripcio": "VGC Regulation G",
+        "aliases": ["VGC Reg G", "vgc-2024"],
+        "pokemon": {"150": "Mewtwo", "8": "Wartortle", "1025": "Pecharunt"},
+        "items": {"King's Rock": ""},
+        "moves": {"Double Team": ""}
+    },
+    "ou": {
+        "version": "2024-02",
+        "aliases": ["Smogon", "OverUsed"],
+        "pokemon": {"150": "Mewtwo"},
+        "items": {"Kings Rock": "", "Quick Claw": ""},
+        "abilities": {"Moody": ""},
+        "moves": {"double-team": "", "Baton Pass": ""}
+    }
+}
+
+
+def registry():
+    return FormatRegistry(BAN_LISTS)
+
+
+def test_resolve_by_name_and_alias():
+    formats = registry()
+    assert formats.resolve("vgc").name == "vgc"
+    assert formats.resolve("VGC Reg G").name == "vgc"
+    assert formats.resolve("vgc_2024").name == "vgc"
+    assert formats.resolve("smogon").name == "ou"
+    assert formats.resolve("Over Used").name == "ou"
+    assert formats.resolve(None).name == "vgc" and formats.resolve("").name == "vgc"
+    assert formats.resolve("ubers") is None
+    assert formats.versions() == {"vgc": "2024-01", "ou": "2024-02"}
+
+
+def test_default_format_must_exist():
+    try:
+        FormatRegistry(BAN_LISTS, default_format="ubers")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("S'ha acceptat un format principal desconegut")
+
+
+def test_species_bitmap_bounds():
+    vgc = registry().resolve("vgc")
+    assert vgc.species_ids == (8, 150, 1025)
+    assert len(vgc.species_bitmap) == 1025 // 8 + 1
+
+    # Els bits de l'inici i del final del mapa
+    assert vgc.bans_species(8) and not vgc.bans_species(7) and not vgc.bans_species(9)
+    assert vgc.bans_species(1025) and not vgc.bans_species(1024)
+    # Fora del mapa: ni el 0, ni els negatius, ni els IDs més grans que el màxim
+    assert not vgc.bans_species(0) and not vgc.bans_species(-1)
+    assert not vgc.bans_species(1026) and not vgc.bans_species(1032) and not vgc.bans_species(100000)
+
+    empty = FormatRegistry({"vgc": {}}).resolve("vgc")
+    assert empty.species_ids == () and not empty.bans_species(0) and not empty.bans_species(1)
+
+
+def test_name_masks_are_shared_across_formats():
+    formats = registry()
+    vgc, ou = formats.resolve("vgc"), formats.resolve("ou")
+
+    # "King's Rock" i "Kings Rock" són el mateix nom: un sol bit
+    assert name_key("King's Rock") == name_key("Kings Rock") == "kingsrock"
+    assert len(formats._names["items"]) == 2 and len(formats._names["moves"]) == 2
+    bit = formats._names["items"]["kingsrock"]
+    assert vgc.masks["items"] >> bit & 1 and ou.masks["items"] >> bit & 1
+
+    assert vgc.bans("items", "kings-rock") and ou.bans("items", "King's Rock")
+    assert ou.bans("items", "Quick Claw") and not vgc.bans("items", "Quick Claw")
+    assert vgc.bans("moves", "Double Team") and ou.bans("moves", "doubleteam")
+    assert ou.bans("abilities", "moody") and not vgc.bans("abilities", "Moody")
+    assert not vgc.bans("items", "Leftovers") and not vgc.bans("moves", None)
+
+
+def test_check_member():
+    ou = registry().resolve("ou")
+    member = {
+        "base_pokemon": "Mewtwo", "pokedex_id": 150, "item": "Quick Claw",
+        "ability": "Moody", "moves": ["Psystrike", "Baton Pass", "Double Team"]
+    }
+    errors = ou.check_member(member)
+    assert [(error["field"], error["value"]) for error in errors] == [
+        ("base_pokemon", "Mewtwo"), ("item", "Quick Claw"), ("ability", "Moody"),
+        ("moves", "Baton Pass"), ("moves", "Double Team")
+    ]
+    assert all(error["reason"] == "Prohibit al format OU" for error in errors)
+
+    legal = {"base_pokemon": "Pikachu", "pokedex_id": 25, "item": "Light Ball", "moves": ["Thunderbolt"]}
+    assert ou.check_member(legal) == []
+    # Sense pokedex_id resolt no es pot comprovar l'espècie
+    assert ou.check_member({"base_pokemon": "Mewtwo", "pokedex_id": None}) == []
+
+
+def test_load_ban_lists_file():
+    formats = FormatRegistry.load()
+    assert formats.resolve(None).name == formats.default_format
+    for name, rules in formats.formats.items():
+        assert formats.resolve(name) is rules
@@ -0,0 +1,77 @@
+"""
+Tests de la matriu d'enfrontaments
+==================================
+
+La matriu es llegeix tal com s'ha escrit, és antisimètrica i un fitxer
+d'un altre format es rebutja.
+
+Ús:
+    python3 -m pytest -q ia/test_matchup_matrix.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from damage_engine import DamageEngine
+from matchup_matrix import (
+    SCORE_SCALE, MatchupMatrix, compute_matchup_scores, data_fingerprint,
+    stored_fingerprint, write_matchup_matrix
+)
+from roster import Roster
+
+
+def test_matchup_matrix_round_trip(tmp_path, type_chart, engine, pokemon_list):
+    damage_engine = DamageEngine(engine.type_profiles)
+    roster = Roster.from_pokemon(pokemon_list)
+    scores = compute_matchup_scores(damage_engine, roster)
+    fingerprint = data_fingerprint(roster, type_chart, damage_engine)
+
+    path = str(tmp_path / "matchups.bin")
+    write_matchup_matrix(path, roster.ids, scores, fingerprint)
+    assert stored_fingerprint(path) == fingerprint
+
+    matrix = MatchupMatrix(path)
+    try:
+        size = len(roster)
+        assert len(matrix) == size and matrix.fingerprint == fingerprint
+        for a, attacker_id in enumerate(roster.ids):
+            assert list(matrix.row(attacker_id)) == list(scores[a * size:(a + 1) * size])
+            for b, defender_id in enumerate(roster.ids):
+                assert matrix.score(attacker_id, defender_id) == scores[a * size + b] / SCORE_SCALE
+        assert matrix.score(roster.ids[0], 99999) is None
+        assert matrix.row(99999) is None
+    finally:
+        matrix.close()
+
+
+def test_matchup_matrix_is_antisymmetric(engine, pokemon_list):
+    roster = Roster.from_pokemon(pokemon_list)
+    scores = compute_matchup_scores(DamageEngine(engine.type_profiles), roster)
+
+    size = len(roster)
+    for a in range(size):
+        assert scores[a * size + a] == 0
+        for b in range(size):
+            assert scores[a * size + b] == -scores[b * size + a], (a, b)
+
+
+def test_fingerprint_follows_the_data(type_chart, engine, pokemon_list):
+    damage_engine = DamageEngine(engine.type_profiles)
+    fingerprint = data_fingerprint(pokemon_list, type_chart, damage_engine)
+    assert data_fingerprint(list(pokemon_list), type_chart, damage_engine) == fingerprint
+    assert data_fingerprint(pokemon_list[1:], type_chart, damage_engine) != fingerprint
+
+
+def test_invalid_file_is_rejected(tmp_path):
+    path = tmp_path / "matchups.bin"
+    path.write_bytes(b"XXXX" + bytes(100))
+    assert stored_fingerprint(str(path)) is None
+    try:
+        MatchupMatrix(str(path))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("S'ha carregat un fitxer que no és una matriu")
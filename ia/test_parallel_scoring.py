@@ -0,0 +1,34 @@
+"""
+Tests de la puntuació en paral·lel (ParallelScorer)
+===================================================
+
+El pool de processos ha de donar les mateixes recomanacions que el motor
+al mateix procés, i alliberar la memòria compartida en tancar-se.
+
+Ús:
+    python3 -m pytest -q ia/test_parallel_scoring.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from parallel_scoring import ParallelScorer, roster_fingerprint
+
+
+def test_parallel_matches_engine(engine, pokemon_list):
+    with ParallelScorer(engine, pokemon_list, workers=2) as scorer:
+        assert scorer.fingerprint == roster_fingerprint(pokemon_list)
+        for team in ([], pokemon_list[:1], pokemon_list[10:15]):
+            assert scorer.recommend(team, top_n=5) == engine.recommend(team, pokemon_list, top_n=5)
+        assert scorer.top_k(pokemon_list[:2], 0) == []
+
+
+def test_close_releases_shared_memory(engine, pokemon_list):
+    scorer = ParallelScorer(engine, pokemon_list, workers=1)
+    names = [scorer._roster_shm.name, scorer._types_shm.name]
+    scorer.close()
+    scorer.close()
+    assert not any(os.path.exists(f"/dev/shm/{name}") for name in names)
@@ -0,0 +1,93 @@
+"""
+Tests dels models compactes (Pokemon, Recommendation i Roster)
+==============================================================
+
+Els Pokemon i les Recommendation són immutables i sense __dict__, i es
+poden enviar als processos del pool; el Roster guarda els Pokémon en
+columnes i es comporta com una llista de Pokemon.
+
+Ús:
+    python3 -m pytest -q ia/test_roster.py
+"""
+
+import sys
+import os
+import pickle
+from dataclasses import FrozenInstanceError
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recommendation_engine import Pokemon, Recommendation
+from roster import Roster
+from type_profiles import TYPE_NAMES, TYPE_ORDER, type_id
+
+SOURCES = [
+    {"pokedex_id": 6, "name": "charizard", "types": ["fire", "flying"],
+     "stats": {"hp": 78, "attack": 84, "defense": 78, "special_attack": 109, "special_defense": 85, "speed": 100}},
+    {"pokedex_id": 25, "name": "pikachu", "types": ["electric"],
+     "stats": {"hp": 35, "attack": 55, "defense": 40, "special_attack": 50, "special_defense": 50, "speed": 90}},
+    {"pokedex_id": 445, "name": "garchomp", "types": ["dragon", "ground"],
+     "stats": {"hp": 108, "attack": 130, "defense": 95, "special_attack": 80, "special_defense": 85, "speed": 102}}
+]
+
+
+def test_pokemon_is_compact_and_immutable():
+    pokemon = Pokemon.from_source(SOURCES[0])
+    assert not hasattr(pokemon, "__dict__")
+    assert pokemon.types == ["fire", "flying"]
+    assert pokemon.stats == SOURCES[0]["stats"]
+    try:
+        pokemon.name = "altre"
+    except FrozenInstanceError:
+        pass
+    else:
+        raise AssertionError("S'ha pogut modificar un Pokemon")
+
+
+def test_models_pickle():
+    pokemon = Pokemon.from_source(SOURCES[1])
+    recommendation = Recommendation(pokemon, 71.5, 60.0, 55.0, 80.0, 90.0, ["raó"], ["avís"])
+    assert pickle.loads(pickle.dumps(pokemon)) == pokemon
+    assert pickle.loads(pickle.dumps(recommendation)) == recommendation
+
+
+def test_roster_behaves_like_a_list():
+    roster = Roster.from_sources(SOURCES)
+    expected = [Pokemon.from_source(data) for data in SOURCES]
+
+    assert len(roster) == 3
+    assert list(roster) == expected
+    assert roster[-1] == expected[-1] and roster[0:2] == expected[:2]
+    # Els Pokemon es creen un cop i es reutilitzen
+    assert roster[1] is roster[1]
+    assert roster.get(445) == expected[2] and roster.get(1) is None
+
+
+def test_roster_from_pokemon_and_where():
+    roster = Roster.from_pokemon(Pokemon.from_source(data) for data in SOURCES)
+    assert list(roster) == list(Roster.from_sources(SOURCES))
+
+    filtered = roster.where(lambda pokedex_id: pokedex_id != 25)
+    assert [pokemon.pokedex_id for pokemon in filtered] == [6, 445]
+    assert filtered.get(445) == roster.get(445) and filtered.get(25) is None
+
+
+def test_roster_pickles_columns():
+    roster = Roster.from_sources(SOURCES)
+    roster[0]
+    restored = pickle.loads(pickle.dumps(roster))
+    assert list(restored) == list(roster)
+    assert restored.get(6) == roster.get(6)
+
+
+def test_unknown_types_do_not_grow_the_registry():
+    assert type_id("fire") == TYPE_ORDER.index("fire")
+    assert type_id("stellar") == -1 and type_id("stellar") == -1
+    assert list(TYPE_NAMES) == TYPE_ORDER
+
+    pokemon = Pokemon.create(1, "prova", ["stellar", "water"], {})
+    assert pokemon.types == ["water"]
+    roster = Roster.from_sources([dict(SOURCES[1], types=["unknown", "electric"])])
+    assert roster.type1[0] == type_id("electric") and roster.type2[0] == -1
+    assert list(TYPE_NAMES) == TYPE_ORDER
@@ -0,0 +1,97 @@
+"""
+Tests de la compleció d'equips
+==============================
+
+La cerca en feix retorna equips de 6 Pokémon diferents que contenen els
+membres fixos i cap dels exclosos, la poda per cota no canvia els millors
+fills i, sense temps, els equips es completen de manera voraç.
+
+Ús:
+    python3 -m pytest -q ia/test_team_completion.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recommendation_engine import TeamState
+from team_completion import TEAM_SIZE, TeamCompleter, _Node
+
+
+def assert_valid_team(completion, fixed, candidates):
+    ids = [p.pokedex_id for p in completion.members]
+    assert len(ids) == TEAM_SIZE and len(set(ids)) == TEAM_SIZE
+    assert ids[:len(fixed)] == [p.pokedex_id for p in fixed]
+    candidate_ids = {p.pokedex_id for p in candidates}
+    assert all(p.pokedex_id in candidate_ids for p in completion.members[len(fixed):])
+    assert [rec.pokemon for rec in completion.added] == completion.members[len(fixed):]
+
+
+def test_search_respects_fixed_and_excluded(engine, pokemon_list):
+    fixed = pokemon_list[:2]
+    excluded = {p.pokedex_id for p in pokemon_list[2:12]}
+    candidates = [p for p in pokemon_list if p.pokedex_id not in excluded]
+
+    completions, stats = TeamCompleter(engine, candidates).search(fixed, top_k=3, beam_width=6, time_budget=30)
+    assert len(completions) == 3 and not stats["timed_out"] and stats["beam_depth"] == TEAM_SIZE - 2
+    scores = [completion.score for completion in completions]
+    assert scores == sorted(scores, reverse=True)
+    assert len({frozenset(p.pokedex_id for p in c.members) for c in completions}) == 3
+    for completion in completions:
+        assert_valid_team(completion, fixed, candidates)
+        assert not excluded & {p.pokedex_id for p in completion.members}
+
+
+def test_search_score_matches_engine(engine, pokemon_list):
+    fixed = pokemon_list[:3]
+    completion = TeamCompleter(engine, pokemon_list).search(fixed, top_k=1, time_budget=30)[0][0]
+
+    # Cada membre afegit es puntua contra l'equip que tenia al davant
+    expected = [
+        TeamState(engine, completion.members[:i]).delta_score(completion.members[i])
+        for i in range(len(fixed), TEAM_SIZE)
+    ]
+    assert [rec.score for rec in completion.added] == expected
+    assert abs(completion.score - sum(expected) / len(expected)) < 1e-9
+
+
+def test_pruning_keeps_the_best_children(engine, pokemon_list):
+    completer = TeamCompleter(engine, pokemon_list)
+    team = pokemon_list[:2]
+    node = _Node(list(team), [], 0.0, frozenset(p.pokedex_id for p in team))
+
+    children = completer.expand_node(node, 5, float("-inf"))
+    state = TeamState(engine, team)
+    exhaustive = sorted(
+        (state.delta_score(p) for p in pokemon_list if not state.contains(p.pokedex_id)),
+        reverse=True
+    )[:5]
+    assert [total for total, _, _ in children] == exhaustive
+
+
+def test_upper_bounds_are_bounds(engine, pokemon_list):
+    completer = TeamCompleter(engine, pokemon_list)
+    for size in range(0, 6):
+        state = TeamState(engine, pokemon_list[10:10 + size])
+        bounds = completer._upper_bounds(state.analysis(), state.size)
+        for bound, candidate in zip(bounds, pokemon_list):
+            assert bound >= state.delta_score(candidate) - 1e-9, (size, candidate.pokedex_id)
+
+
+def test_time_budget_completes_greedily(engine, pokemon_list):
+    fixed = pokemon_list[:1]
+    completions, stats = TeamCompleter(engine, pokemon_list).search(fixed, top_k=2, time_budget=0)
+    assert stats["timed_out"] and stats["beam_depth"] == 0
+    assert len(completions) == 1
+    assert_valid_team(completions[0], fixed, pokemon_list)
+
+
+def test_full_team_and_no_candidates(engine, pokemon_list):
+    full = pokemon_list[:TEAM_SIZE]
+    completions, _ = TeamCompleter(engine, pokemon_list).search(full)
+    assert [c.members for c in completions] == [full] and completions[0].added == []
+
+    # Sense prou candidats no es pot completar cap equip
+    assert TeamCompleter(engine, pokemon_list[:3]).search([], time_budget=30)[0] == []
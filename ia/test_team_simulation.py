@@ -0,0 +1,60 @@
+"""
+Tests de la simulació d'enfrontaments entre equips
+==================================================
+
+Amb la mateixa llavor i el mateix nombre de partides el resultat és
+idèntic, tant amb un pool de processos com sense.
+
+Ús:
+    python3 -m pytest -q ia/test_team_simulation.py
+"""
+
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from damage_engine import DamageEngine
+from team_simulation import build_matchup_table, simulate, wilson_interval
+
+
+def build_table(engine, team_a, team_b):
+    damage_engine = DamageEngine(engine.type_profiles)
+    return build_matchup_table(
+        damage_engine,
+        [damage_engine.default_set(pokemon) for pokemon in team_a],
+        [damage_engine.default_set(pokemon) for pokemon in team_b]
+    )
+
+
+def test_simulate_is_deterministic(engine, pokemon_list):
+    table = build_table(engine, pokemon_list[:6], pokemon_list[6:12])
+    result = simulate(table, 1000, seed=42)
+    assert simulate(table, 1000, seed=42) == result
+    assert result["wins"] + result["losses"] + result["draws"] == 1000
+    assert sum(result["kos"][0]) >= result["wins"] * 6
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        assert simulate(table, 1000, seed=42, pool=pool) == result
+
+
+def test_simulate_depends_on_seed(engine, pokemon_list):
+    table = build_table(engine, pokemon_list[:6], pokemon_list[6:12])
+    results = {tuple(simulate(table, 500, seed=seed)["kos"][0]) for seed in range(5)}
+    assert len(results) > 1
+
+
+def test_win_rate_is_symmetric(engine, pokemon_list):
+    table = build_table(engine, pokemon_list[:6], pokemon_list[6:12])
+    swapped = build_table(engine, pokemon_list[6:12], pokemon_list[:6])
+    rate = simulate(table, 2000, seed=1)["win_rate"]
+    assert abs(rate + simulate(swapped, 2000, seed=2)["win_rate"] - 1) < 0.1
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high and abs((0.5 - low) - (high - 0.5)) < 1e-9
+    assert wilson_interval(0, 10)[0] == 0.0 and wilson_interval(10, 10)[1] == 1.0
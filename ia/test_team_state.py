@@ -0,0 +1,69 @@
+"""
+Tests de l'estat incremental d'un equip (TeamState)
+===================================================
+
+delta_score ha de donar la mateixa puntuació que _evaluate_candidate, i
+afegir o treure membres ha de deixar l'estat igual que construir-lo de nou.
+
+Ús:
+    python3 -m pytest -q ia/test_team_state.py
+"""
+
+import sys
+import os
+import random
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from recommendation_engine import TeamState
+
+
+def test_delta_score_matches_evaluate_candidate(engine, pokemon_list):
+    rng = random.Random(1)
+    for team_size in range(0, 6):
+        team = rng.sample(pokemon_list, team_size)
+        state = TeamState(engine, team)
+        analysis = engine._analyze_team(team)
+        for candidate in pokemon_list:
+            expected = engine._evaluate_candidate(candidate, team, analysis).score
+            assert abs(state.delta_score(candidate) - expected) < 1e-9, (team_size, candidate.pokedex_id)
+
+
+def test_evaluate_matches_engine(engine, pokemon_list):
+    team = pokemon_list[:3]
+    state = TeamState(engine, team)
+    analysis = engine._analyze_team(team)
+    for candidate in pokemon_list[3:10]:
+        assert state.evaluate(candidate) == engine._evaluate_candidate(candidate, team, analysis)
+
+
+def test_delta_score_after_remove(engine, pokemon_list):
+    team = pokemon_list[:5]
+    state = TeamState(engine, team).add(pokemon_list[10]).remove(pokemon_list[10]).remove(team[2])
+    fresh = TeamState(engine, team[:2] + team[3:])
+    assert state.size == 4 and not state.contains(team[2].pokedex_id)
+    for candidate in pokemon_list:
+        assert abs(state.delta_score(candidate) - fresh.delta_score(candidate)) < 1e-9
+
+
+def test_remove_missing_member(engine, pokemon_list):
+    state = TeamState(engine, pokemon_list[:2])
+    try:
+        state.remove(pokemon_list[5])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("S'ha tret un Pokémon que no era a l'equip")
+
+
+def test_recommend_uses_state_scores(engine, pokemon_list):
+    team = pokemon_list[:2]
+    recommendations = engine.recommend(team, pokemon_list, top_n=5)
+    state = TeamState(engine, team)
+    expected = sorted(
+        (p for p in pokemon_list if not state.contains(p.pokedex_id)),
+        key=state.delta_score, reverse=True
+    )[:5]
+    assert [r.pokemon for r in recommendations] == expected
+    assert engine.recommend(pokemon_list[:6], pokemon_list) == []
@@ -0,0 +1,221 @@
+"""
+Perfils defensius precalculats per combinació de tipus
+=====================================================
+
+Entre els ~1025 Pokémon només hi ha unes 170 combinacions de tipus
+diferents, i el perfil defensiu (debilitats, resistències i immunitats)
+només depèn de la combinació. Aquest mòdul construeix una sola vegada,
+quan es carrega la taula de tipus, el perfil de totes les combinacions
+possibles (18 simples + 153 dobles).
+
+Cada perfil es guarda com a màscares de bits sobre l'ordre canònic dels
+tipus (l'ordre d'ID de PokéAPI): el bit i correspon a TYPE_ORDER[i]. Així,
+preguntes com "quines debilitats de l'equip cobreix aquest candidat" són
+una AND entre dos enters en lloc de construir i intersecar conjunts.
+
+Ho fan servir la puntuació defensiva del motor, l'anàlisi de
+vulnerabilitat i els filtres de cerca per debilitat/resistència/immunitat.
+"""
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, Iterable, List, Tuple
+
+# Ordre canònic dels tipus (ID de PokéAPI)
+TYPE_ORDER = [
+    'normal', 'fighting', 'flying', 'poison', 'ground', 'rock',
+    'bug', 'ghost', 'steel', 'fire', 'water', 'grass',
+    'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy'
+]
+
+# Identificador numèric de cada tipus (posició a TYPE_ORDER). Els Pokémon
+# guarden els tipus com a tupla d'identificadors. El registre és fix: és el
+# mateix a tots els processos i no depèn de l'ordre de les consultes.
+TYPE_NAMES = tuple(TYPE_ORDER)
+TYPE_IDS = {name: i for i, name in enumerate(TYPE_NAMES)}
+
+
+def type_id(name: str) -> int:
+    """Identificador numèric d'un tipus (-1 si no és a TYPE_ORDER)."""
+    return TYPE_IDS.get(name, -1)
+
+
+def type_ids(names: Iterable[str]) -> Tuple[int, ...]:
+    """Identificadors dels tipus coneguts d'una llista de noms (els altres s'ignoren)."""
+    return tuple(tid for tid in map(type_id, names) if tid >= 0)
+
+
+@dataclass(frozen=True)
+class TypeProfile:
+    """Perfil defensiu d'una combinació de tipus (màscares de bits)."""
+    types: Tuple[str, ...]          # Tipus de la combinació, en ordre canònic
+    mask: int                       # Els mateixos tipus com a màscara
+    weaknesses: int                 # Atacants amb multiplicador > 1 (x2 i x4)
+    resistances: int                # Atacants amb multiplicador entre 0 i 1 (x0.5 i x0.25)
+    immunities: int                 # Atacants amb multiplicador 0
+    double_weaknesses: int          # Atacants amb multiplicador x4
+    multipliers: Tuple[float, ...]  # Multiplicador de cada atacant, en ordre canònic
+    offensive: int                  # Tipus que la combinació colpeja com a súper-efectiu
+
+
+class TypeProfileTable:
+    """
+    Taula de perfils defensius de totes les combinacions de tipus.
+    """
+
+    def __init__(self, type_chart: Dict):
+        """
+        Args:
+            type_chart: Diccionari {nom del tipus: TypeEffectiveness}
+        """
+        self.type_chart = type_chart
+
+        # Ordre canònic; tipus desconeguts (si n'hi ha) al final
+        self.type_names = [t for t in TYPE_ORDER if t in type_chart]
+        self.type_names += sorted(t for t in type_chart if t not in TYPE_ORDER)
+        self.index = {name: i for i, name in enumerate(self.type_names)}
+        # Els tipus de la taula que no són a TYPE_ORDER no tenen identificador
+        self.id_index = {TYPE_IDS[name]: i for i, name in enumerate(self.type_names) if name in TYPE_IDS}
+        self.bits = {name: 1 << i for i, name in enumerate(self.type_names)}
+        self.all_mask = (1 << len(self.type_names)) - 1
+        self._names_cache = {}
+        self._by_types = {}
+        self._by_type_ids = {}
+
+        # Relacions de cada tipus per índex: (rep x2 de, rep x0.5 de, rep x0 de, fa x2 a)
+        self.relations = []
+        for name in self.type_names:
+            type_data = type_chart[name]
+            self.relations.append(tuple(
+                tuple(self.index[t] for t in related if t in self.index)
+                for related in (
+                    type_data.double_damage_from,
+                    type_data.half_damage_from,
+                    type_data.no_damage_from,
+                    type_data.double_damage_to
+                )
+            ))
+
+        # Màscara de la combinació → perfil
+        self._profiles = {0: self._build_profile(0)}
+        for name in self.type_names:
+            self._profiles[self.bits[name]] = self._build_profile(self.bits[name])
+        for first, second in combinations(self.type_names, 2):
+            mask = self.bits[first] | self.bits[second]
+            self._profiles[mask] = self._build_profile(mask)
+
+    def __len__(self):
+        return len(self._profiles)
+
+    # ------------------------------------------------------------------
+    # Conversió entre noms i màscares
+    # ------------------------------------------------------------------
+    def mask(self, types: Iterable[str]) -> int:
+        """Màscara d'una llista de tipus (els tipus desconeguts s'ignoren)."""
+        bits = self.bits
+        mask = 0
+        for type_name in types:
+            mask |= bits.get(type_name, 0)
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        """Noms dels tipus d'una màscara, en ordre canònic."""
+        names = self._names_cache.get(mask)
+        if names is None:
+            names = [name for i, name in enumerate(self.type_names) if mask >> i & 1]
+            self._names_cache[mask] = names
+        return names
+
+    # ------------------------------------------------------------------
+    # Consultes
+    # ------------------------------------------------------------------
+    def profile(self, types: Iterable[str]) -> TypeProfile:
+        """Perfil defensiu d'un Pokémon a partir dels seus tipus."""
+        key = tuple(types)
+        profile = self._by_types.get(key)
+        if profile is None:
+            mask = self.mask(key)
+            profile = self._profiles.get(mask)
+            if profile is None:
+                # Més de dos tipus (no passa als jocs): es calcula i es guarda
+                profile = self._profiles[mask] = self._build_profile(mask)
+            self._by_types[key] = profile
+        return profile
+
+    def profile_of(self, pokemon) -> TypeProfile:
+        """Perfil defensiu d'un Pokémon (per identificadors de tipus, sense noms)."""
+        profile = self._by_type_ids.get(pokemon.type_ids)
+        if profile is None:
+            profile = self._by_type_ids[pokemon.type_ids] = self.profile(pokemon.types)
+        return profile
+
+    def combinations_matching(
+            self,
+            weak_to: int = 0,
+            resists: int = 0,
+            immune_to: int = 0
+    ) -> List[Tuple[str, ...]]:
+        """
+        Combinacions de tipus que són febles a tots els tipus de 'weak_to',
+        resisteixen tots els de 'resists' i són immunes a tots els de
+        'immune_to' (cada argument és una màscara).
+        """
+        return [
+            profile.types
+            for mask, profile in self._profiles.items()
+            if mask
+            and profile.weaknesses & weak_to == weak_to
+            and profile.resistances & resists == resists
+            and profile.immunities & immune_to == immune_to
+        ]
+
+    def _build_profile(self, mask: int) -> TypeProfile:
+        types = tuple(self.names(mask))
+
+        weaknesses = resistances = immunities = double_weaknesses = 0
+        multipliers = []
+        offensive = 0
+        for type_name in types:
+            offensive |= self.mask(self.type_chart[type_name].double_damage_to)
+
+        # Iterar per tots els tipus com a "tipus atacant"
+        for attacking_type in self.type_names:
+            current_multiplier = 1.0
+            for defense_type_name in types:
+                defense_type_data = self.type_chart[defense_type_name]
+                if attacking_type in defense_type_data.double_damage_from:
+                    current_multiplier *= 2
+                elif attacking_type in defense_type_data.half_damage_from:
+                    current_multiplier *= 0.5
+                elif attacking_type in defense_type_data.no_damage_from:
+                    current_multiplier = 0
+                    break  # És immune, el multiplicador final és 0
+
+            bit = self.bits[attacking_type]
+            if current_multiplier == 0:
+                immunities |= bit
+            elif current_multiplier > 1:
+                weaknesses |= bit
+                if current_multiplier >= 4:
+                    double_weaknesses |= bit
+            elif current_multiplier < 1:
+                resistances |= bit
+            multipliers.append(current_multiplier)
+
+        return TypeProfile(
+            types, mask, weaknesses, resistances, immunities,
+            double_weaknesses, tuple(multipliers), offensive
+        )
+
+
+def iter_bits(mask: int):
+    """Índexs dels bits actius d'una màscara (de menor a major)."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def popcount(mask: int) -> int:
+    """Nombre de bits actius d'una màscara."""
+    return bin(mask).count("1")
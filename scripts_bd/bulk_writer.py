@@ -0,0 +1,332 @@
+"""
+Escriptor Bulk per als scripts d'ingesta
+========================================
+
+En lloc de fer un `PUT` per document, els scripts d'ingesta encuen els
+documents en aquest escriptor, que els agrupa en lots i els envia a l'API
+`_bulk` d'Elasticsearch.
+
+- Els lots es tanquen per nombre de documents (`max_docs`) o per mida en
+  bytes (`max_bytes`), el que arribi primer.
+- Es poden tenir diverses peticions bulk en vol alhora (`max_in_flight`).
+- Els errors es recullen per document (no fan fallar tot el lot).
+- Els documents rebutjats per Elasticsearch (status 429, cua plena) es
+  reintenten automàticament amb espera exponencial.
+- En tancar, es mostra un resum amb el throughput d'indexació.
+- Cada document es guarda amb un `content_hash` del seu contingut. Amb
+  `skip_unchanged=True`, els documents que ja existeixen amb el mateix hash
+  no es tornen a escriure (ingesta incremental).
+- `index()` substitueix el document sencer; `update()` només escriu els
+  camps donats i conserva la resta (per exemple els que afegeix un altre
+  script, com is_banned / banned_formats de marcar_pokemon_prohibits.py).
+
+Ús:
+    with BulkWriter(ELASTIC_URL, INDEX_NAME) as writer:
+        writer.index(doc_id, document)
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Status que indiquen que cal tornar-ho a provar més tard
+STATUS_REINTENTABLES = {429, 502, 503, 504}
+
+
+def content_hash(document: dict) -> str:
+    """
+    Hash estable del contingut d'un document (independent de l'ordre de les
+    claus i sense el propi camp `content_hash`).
+    """
+    contingut = {k: v for k, v in document.items() if k != "content_hash"}
+    canonic = json.dumps(contingut, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonic.encode("utf-8")).hexdigest()
+
+
+class BulkWriter:
+    """
+    Acumula documents i els indexa a Elasticsearch en lots via `_bulk`.
+    """
+
+    def __init__(
+            self,
+            elastic_url: str,
+            index_name: str,
+            max_docs: int = 500,
+            max_bytes: int = 5 * 1024 * 1024,
+            max_in_flight: int = 4,
+            max_retries: int = 3,
+            retry_backoff: float = 0.5,
+            skip_unchanged: bool = False
+    ):
+        """
+        Args:
+            elastic_url: URL base d'Elasticsearch
+            index_name: Índex on s'escriuen els documents
+            max_docs: Nombre màxim de documents per lot
+            max_bytes: Mida màxima (en bytes) del cos de cada lot
+            max_in_flight: Peticions bulk simultànies com a màxim
+            max_retries: Reintents per als documents rebutjats
+            retry_backoff: Espera inicial (segons) entre reintents
+            skip_unchanged: Si és True, no reescriu els documents amb el mateix content_hash
+        """
+        self.elastic_url = elastic_url.rstrip("/")
+        self.index_name = index_name
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.skip_unchanged = skip_unchanged
+        self._hashes_existents = None
+
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._pendents = []
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._en_vol = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inici = None
+        self._tancat = False
+
+        # Estadístiques del run
+        self.indexats = 0
+        self.bytes_enviats = 0
+        self.lots_enviats = 0
+        self.reintents = 0
+        self.sense_canvis = 0
+        self.errors = []
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def index(self, doc_id, document: dict):
+        """
+        Encua un document per ser indexat (sobreescriu si ja existeix).
+        """
+        document = self._preparar(doc_id, document)
+        if document is not None:
+            self._encuar(doc_id, {"index": {"_index": self.index_name, "_id": str(doc_id)}}, document)
+
+    def update(self, doc_id, document: dict, upsert: dict = None):
+        """
+        Encua una actualització parcial: els camps de `document` se
+        sobreescriuen i la resta de camps del document existent es conserven.
+        Si el document no existeix, es crea amb `document` més els camps
+        d'`upsert` (valors per defecte només per als documents nous).
+        """
+        document = self._preparar(doc_id, document)
+        if document is None:
+            return
+        cos = {"doc": document}
+        if upsert:
+            cos["upsert"] = {**upsert, **document}
+        else:
+            cos["doc_as_upsert"] = True
+        self._encuar(doc_id, {"update": {"_index": self.index_name, "_id": str(doc_id)}}, cos)
+
+    def flush(self):
+        """
+        Envia el lot pendent i espera que acabin totes les peticions en vol.
+        """
+        if self._buffer:
+            self._enviar_lot()
+
+        pendents, self._pendents = self._pendents, []
+        for future in pendents:
+            future.result()
+
+    def close(self):
+        """
+        Buida els lots pendents, allibera els fils i mostra el resum.
+        """
+        if self._tancat:
+            return
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self._tancat = True
+        self.resum()
+
+    def resum(self):
+        """
+        Mostra el resum del run: documents, errors i throughput.
+        """
+        durada = time.perf_counter() - self._inici if self._inici else 0.0
+        docs_s = self.indexats / durada if durada > 0 else 0.0
+        mb_s = self.bytes_enviats / (1024 * 1024) / durada if durada > 0 else 0.0
+
+        print(f"\n--- RESUM BULK ({self.index_name}) ---")
+        print(f"✓ Documents indexats: {self.indexats}")
+        if self.skip_unchanged:
+            print(f"  Documents sense canvis (no reescrits): {self.sense_canvis}")
+        print(f"  Lots enviats: {self.lots_enviats} | Reintents: {self.reintents}")
+        print(f"  Durada: {durada:.2f} s | Throughput: {docs_s:.1f} docs/s ({mb_s:.2f} MB/s)")
+        if self.errors:
+            print(f"✗ Documents amb error: {len(self.errors)}")
+            for error in self.errors[:10]:
+                print(f"  - ID {error['_id']} (status {error['status']}): {error['error']}")
+            if len(self.errors) > 10:
+                print(f"  ... i {len(self.errors) - 10} errors més")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # ------------------------------------------------------------------
+    # Funcions internes
+    # ------------------------------------------------------------------
+    def _preparar(self, doc_id, document: dict):
+        """
+        Afegeix el content_hash al document, o retorna None si no ha canviat
+        (amb skip_unchanged).
+        """
+        if self._inici is None:
+            self._inici = time.perf_counter()
+
+        hash_contingut = content_hash(document)
+        if self.skip_unchanged:
+            if self._hashes_existents is None:
+                self._hashes_existents = self._carregar_hashes()
+            if self._hashes_existents.get(str(doc_id)) == hash_contingut:
+                self.sense_canvis += 1
+                return None
+        return {**document, "content_hash": hash_contingut}
+
+    def _encuar(self, doc_id, accio: dict, cos: dict):
+        linies = (json.dumps(accio) + "\n" + json.dumps(cos) + "\n").encode("utf-8")
+
+        # Si el document no hi cap, tanquem el lot actual abans d'afegir-lo
+        if self._buffer and self._buffer_bytes + len(linies) > self.max_bytes:
+            self._enviar_lot()
+
+        self._buffer.append((str(doc_id), linies))
+        self._buffer_bytes += len(linies)
+
+        if len(self._buffer) >= self.max_docs:
+            self._enviar_lot()
+
+    def _session(self) -> requests.Session:
+        """Una sessió HTTP per fil (requests.Session no és thread-safe)."""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _carregar_hashes(self) -> dict:
+        """
+        Llegeix el content_hash de tots els documents existents de l'índex
+        (amb scroll, només el camp del hash).
+        """
+        hashes = {}
+        session = self._session()
+
+        resposta = session.post(
+            f"{self.elastic_url}/{self.index_name}/_search?scroll=1m",
+            json={"size": 5000, "_source": ["content_hash"], "sort": ["_doc"]}
+        )
+        if resposta.status_code != 200:
+            # Índex inexistent o buit: s'escriurà tot
+            return hashes
+
+        dades = resposta.json()
+        while dades["hits"]["hits"]:
+            for hit in dades["hits"]["hits"]:
+                valor = hit.get("_source", {}).get("content_hash")
+                if valor:
+                    hashes[hit["_id"]] = valor
+            dades = session.post(
+                f"{self.elastic_url}/_search/scroll",
+                json={"scroll": "1m", "scroll_id": dades["_scroll_id"]}
+            ).json()
+
+        session.delete(f"{self.elastic_url}/_search/scroll", json={"scroll_id": dades["_scroll_id"]})
+        print(f"✓ Carregats {len(hashes)} hashes existents de l'índex '{self.index_name}'")
+        return hashes
+
+    def _enviar_lot(self):
+        lot, self._buffer, self._buffer_bytes = self._buffer, [], 0
+
+        # Limitem les peticions en vol: si n'hi ha massa, esperem aquí
+        self._en_vol.acquire()
+        future = self._executor.submit(self._processar_lot, lot)
+        future.add_done_callback(lambda _: self._en_vol.release())
+        self._pendents.append(future)
+
+    def _registrar_errors(self, lot, status, error):
+        with self._lock:
+            for doc_id, _ in lot:
+                self.errors.append({"_id": doc_id, "status": status, "error": error})
+
+    def _esperar_reintent(self, intent: int):
+        with self._lock:
+            self.reintents += 1
+        time.sleep(self.retry_backoff * (2 ** (intent - 1)))
+
+    def _processar_lot(self, lot):
+        """
+        Envia un lot i reintenta només els documents rebutjats.
+        """
+        intent = 0
+
+        while lot:
+            cos = b"".join(linies for _, linies in lot)
+
+            try:
+                resposta = self._session().post(
+                    f"{self.elastic_url}/_bulk",
+                    data=cos,
+                    headers={"Content-Type": "application/x-ndjson"}
+                )
+            except requests.exceptions.RequestException as e:
+                if intent < self.max_retries:
+                    intent += 1
+                    self._esperar_reintent(intent)
+                    continue
+                self._registrar_errors(lot, 0, f"Error de xarxa: {e}")
+                return
+
+            with self._lock:
+                self.lots_enviats += 1
+                self.bytes_enviats += len(cos)
+
+            # Error a nivell de petició (tot el lot)
+            if resposta.status_code != 200:
+                if resposta.status_code in STATUS_REINTENTABLES and intent < self.max_retries:
+                    intent += 1
+                    self._esperar_reintent(intent)
+                    continue
+                self._registrar_errors(lot, resposta.status_code, resposta.text[:200])
+                return
+
+            # Resultat per document (en el mateix ordre que s'han enviat)
+            rebutjats = []
+            correctes = 0
+            for (doc_id, linies), item in zip(lot, resposta.json().get("items", [])):
+                info = next(iter(item.values()))
+                status = info.get("status", 500)
+
+                if status < 300:
+                    correctes += 1
+                elif status in STATUS_REINTENTABLES:
+                    rebutjats.append((doc_id, linies))
+                else:
+                    with self._lock:
+                        self.errors.append({"_id": doc_id, "status": status, "error": info.get("error")})
+
+            with self._lock:
+                self.indexats += correctes
+
+            if rebutjats and intent < self.max_retries:
+                intent += 1
+                self._esperar_reintent(intent)
+                lot = rebutjats
+                continue
+
+            if rebutjats:
+                self._registrar_errors(rebutjats, 429, "Rebutjat per Elasticsearch després dels reintents")
+            return
@@ -1,13 +1,29 @@
 """
 Script intel·ligent que executa només els scripts d'ingesta necessaris.
 Verifica quins índexs tenen dades i només executa els scripts per a índexs buits o que necessitin actualització.
+També torna a executar els scripts que tenen un run interromput (manifest en curs), que es reprenen des
+de l'últim checkpoint. Amb --refresh es tornen a executar tots: només s'escriuen els documents que han canviat.
+
+Les etapes formen un graf de dependències (ETAPES): les independents (types, moves, items, abilities,
+natures...) s'executen en paral·lel, i cada etapa només comença quan les seves dependències han acabat
+bé (per exemple pokemon → marcar_prohibits, i pokemon i users → teams). Un script que acaba amb
+documents fallits surt amb codi no nul i les etapes que en depenen no s'executen. L'etapa matchups
+regenera la matriu d'enfrontaments del servei d'IA (ia/build_matchup_matrix.py) si les dades han canviat.
 
 Executa automàticament sense demanar confirmació.
 """
+import argparse
+import json
 import requests
 import subprocess
 import sys
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from marcar_pokemon_prohibits import carregar_ban_lists, versions_ban_lists
+from run_manifest import RunManifest
 
 ELASTIC_URL = "http://localhost:9200"
 
@@ -31,6 +47,36 @@ LIMITS_MINIMS = {
     "natures": 20        # Esperem almenys 20 naturalezas
 }
 
+# Graf d'etapes de la ingesta: script a executar i etapes de les quals depèn
+ETAPES = {
+    "types": {"script": "ingesta_tipus.py", "depen_de": []},
+    "pokemon": {"script": "ingesta_pokemon.py", "depen_de": []},
+    "moves": {"script": "ingesta_moves.py", "depen_de": []},
+    "items": {"script": "ingesta_items.py", "depen_de": []},
+    "abilities": {"script": "ingesta_abilities.py", "depen_de": []},
+    "natures": {"script": "ingesta_natures.py", "depen_de": []},
+    "users": {"script": "ingesta_usuarios.py", "depen_de": []},
+    "teams": {"script": "ingesta_teams.py", "depen_de": ["users", "pokemon"]},
+    # Mapping i team_id dels equips antics, necessaris per a la paginació per cursor
+    "migrar_teams": {"script": "migrar_teams.py", "depen_de": ["teams"]},
+    "marcar_prohibits": {"script": "marcar_pokemon_prohibits.py", "depen_de": ["pokemon"]},
+    # La matriu d'enfrontaments del servei d'IA depèn del roster i de la taula de tipus
+    "matchups": {"script": os.path.join("..", "ia", "build_matchup_matrix.py"), "depen_de": ["pokemon", "types"]},
+}
+
+# Estats possibles d'una etapa
+PENDENT = "pendent"
+EN_MARXA = "en_marxa"
+OK = "ok"
+OMESA = "omesa"          # No calia executar-la (dades ja presents)
+ERROR = "error"
+SALTADA = "saltada"      # Una dependència ha fallat
+CANCEL_LADA = "cancel·lada"  # Aturada per --fail-fast
+
+INFORME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ingesta_informe.json")
+
+_print_lock = threading.Lock()
+
 def verificar_connexio():
     """Verifica que Elasticsearch està funcionant."""
     try:
@@ -62,203 +108,287 @@ def comptar_documents(index_name):
     except:
         return 0
 
-def executar_script(script_name):
-    """Executa un script d'ingesta."""
-    print(f"\n{'='*60}")
-    print(f"EXECUTANT: {script_name}")
-    print(f"{'='*60}\n")
-    
+def log(missatge):
+    """Escriu una línia de progrés (segura entre fils)."""
+    with _print_lock:
+        print(missatge, flush=True)
+
+def executar_script(nom_etapa, script_name):
+    """
+    Executa un script d'ingesta i reenvia la seva sortida amb el prefix de l'etapa.
+
+    Returns:
+        Codi de sortida del script (0 = èxit)
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
     try:
-        # Executem el script amb Python
-        result = subprocess.run(
+        proces = subprocess.Popen(
             [sys.executable, script_name],
             cwd=os.path.dirname(os.path.abspath(__file__)),
-            capture_output=False,
-            text=True
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=env
         )
-        
-        if result.returncode == 0:
-            print(f"\n✓ Script {script_name} executat amb èxit")
-            return True
-        else:
-            print(f"\n✗ Error executant {script_name} (codi: {result.returncode})")
-            return False
+        for linia in proces.stdout:
+            linia = linia.rstrip()
+            if linia:
+                log(f"  [{nom_etapa}] {linia}")
+        return proces.wait()
     except Exception as e:
-        print(f"\n✗ Error executant {script_name}: {e}")
-        return False
+        log(f"  [{nom_etapa}] ✗ Error executant {script_name}: {e}")
+        return -1
+
+def cal_importar_index(index_name, refresh):
+    """Decideix si cal executar la ingesta d'un índex de dades de PokéAPI."""
+    count = comptar_documents(index_name)
+    limit_minim = LIMITS_MINIMS.get(index_name, 0)
+
+    if RunManifest(index_name).en_curs:
+        return True, f"{count} documents → RUN INTERROMPUT (es reprendrà)"
+    if count == 0:
+        return True, f"{count} documents → CAL IMPORTAR"
+    if count < limit_minim:
+        return True, f"{count} documents → CAL ACTUALITZAR (mínim esperat: {limit_minim})"
+    if refresh:
+        return True, f"{count} documents → REFRESC INCREMENTAL"
+    return False, f"{count} documents → OK"
+
+def cal_crear_si_buit(index_name):
+    """Per a usuaris i equips: només es creen els predefinits si l'índex és buit."""
+    count = comptar_documents(index_name)
+    if count == 0:
+        return True, f"{count} documents → CAL CREAR ELS PREDEFINITS"
+    return False, f"{count} documents → ja existeixen"
+
+def cal_marcar_prohibits():
+    """Verifica si cal marcar els Pokémon prohibits."""
+    pokemon_count = comptar_documents("pokemon")
+    if pokemon_count == 0:
+        return False, "no hi ha Pokémon a la base de dades"
+
+    # Verificar si hi ha Pokémon sense el camp is_banned
+    response = requests.get(f"{ELASTIC_URL}/pokemon/_search", json={
+        "query": {
+            "bool": {
+                "must_not": {
+                    "exists": {"field": "is_banned"}
+                }
+            }
+        },
+        "size": 1
+    })
+
+    # També verificar si hi ha Pokémon prohibits marcats
+    response_prohibits = requests.get(f"{ELASTIC_URL}/pokemon/_search", json={
+        "query": {
+            "term": {"is_banned": True}
+        },
+        "size": 1
+    })
+
+    pokemon_sense_marcar = response.json()['hits']['total']['value']
+    pokemon_prohibits = response_prohibits.json()['hits']['total']['value']
+
+    # Si no hi ha cap Pokémon prohibit marcat i hi ha molts Pokémon, cal executar el script
+    if pokemon_prohibits == 0 and pokemon_count >= 100:
+        return True, f"{pokemon_count} Pokémon però cap prohibit marcat"
+    if pokemon_sense_marcar > 0:
+        return True, f"{pokemon_sense_marcar} Pokémon sense camp is_banned"
+
+    # Si la ingesta de Pokémon ha escrit documents després de l'últim marcatge, cal tornar-lo a fer
+    # (un Pokémon nou es crea amb is_banned = false encara que sigui a les llistes)
+    marcatge = RunManifest("ban_lists").dades
+    ingesta = RunManifest("pokemon").dades
+    if ingesta.get("indexats") and ingesta.get("finished_at", "") > marcatge.get("finished_at", ""):
+        return True, f"{ingesta['indexats']} Pokémon actualitzats després de l'últim marcatge"
+
+    # Un marcatge amb errors no actualitza les versions ni la data: es torna a fer
+    if marcatge.get("failed_at", "") > marcatge.get("finished_at", ""):
+        return True, f"l'últim marcatge va acabar amb {marcatge.get('errors', 0)} errors"
+
+    # Si les llistes de ban_lists.json han canviat de versió, cal tornar-les a aplicar
+    aplicades = marcatge.get("versions")
+    actuals = versions_ban_lists(carregar_ban_lists())
+    if aplicades != actuals:
+        return True, f"llistes de prohibits noves o actualitzades ({', '.join(f'{k} v{v}' for k, v in actuals.items())})"
+    return False, f"prohibits ja marcats correctament ({pokemon_prohibits} trobats)"
+
+def decidir_etapa(nom, args):
+    """
+    Decideix si una etapa s'ha d'executar. Es crida just quan l'etapa està
+    preparada, de manera que veu les dades que han deixat les seves dependències.
+    """
+    if nom in SCRIPTS_INGESTA:
+        return cal_importar_index(nom, args.refresh)
+    if nom in ("users", "teams"):
+        return cal_crear_si_buit(nom)
+    if nom == "marcar_prohibits":
+        return cal_marcar_prohibits()
+    if nom == "migrar_teams":
+        # El script és idempotent: només canvia el mapping o els equips si cal
+        return True, "es comprova el mapping de 'teams' i el team_id dels equips"
+    if nom == "matchups":
+        # El script compara l'empremta de les dades amb la de la matriu guardada
+        return True, "es recalcula la matriu d'enfrontaments si les dades han canviat"
+    return True, "sense regla de decisió"
+
+def executar_dag(args):
+    """
+    Executa les etapes d'ETAPES respectant les dependències i en paral·lel
+    quan són independents.
+
+    Returns:
+        Diccionari nom_etapa -> {"estat", "motiu", "durada"}
+    """
+    resultats = {nom: {"estat": PENDENT, "motiu": "", "durada": 0.0} for nom in ETAPES}
+    en_marxa = {}
+    aturar = False
+    inici_global = time.perf_counter()
+
+    def iniciar(nom):
+        log(f"▶ [{nom}] INICI ({ETAPES[nom]['script']}) — t+{time.perf_counter() - inici_global:.1f}s")
+        inici = time.perf_counter()
+        codi = executar_script(nom, ETAPES[nom]["script"])
+        return codi, time.perf_counter() - inici
+
+    with ThreadPoolExecutor(max_workers=args.max_paralel) as pool:
+        while True:
+            # Llancem totes les etapes que ja tenen les dependències satisfetes
+            canvis = True
+            while canvis:
+                canvis = False
+                for nom, etapa in ETAPES.items():
+                    if resultats[nom]["estat"] != PENDENT:
+                        continue
+
+                    estats_deps = [resultats[d]["estat"] for d in etapa["depen_de"]]
+                    if any(e in (ERROR, SALTADA, CANCEL_LADA) for e in estats_deps):
+                        fallides = [d for d in etapa["depen_de"] if resultats[d]["estat"] in (ERROR, SALTADA, CANCEL_LADA)]
+                        resultats[nom].update(estat=SALTADA, motiu=f"depèn de {', '.join(fallides)}, que no ha acabat bé")
+                        log(f"⏭ [{nom}] SALTADA: {resultats[nom]['motiu']}")
+                        canvis = True
+                        continue
+                    if not all(e in (OK, OMESA) for e in estats_deps):
+                        continue
+
+                    if aturar:
+                        resultats[nom].update(estat=CANCEL_LADA, motiu="aturada per --fail-fast")
+                        log(f"⏹ [{nom}] CANCEL·LADA (--fail-fast)")
+                        canvis = True
+                        continue
+
+                    try:
+                        cal, motiu = decidir_etapa(nom, args)
+                    except Exception as e:
+                        cal, motiu = True, f"no s'ha pogut verificar l'estat ({e})"
+                    resultats[nom]["motiu"] = motiu
+                    if cal:
+                        log(f"⚠ [{nom}] {motiu}")
+                        resultats[nom]["estat"] = EN_MARXA
+                        en_marxa[pool.submit(iniciar, nom)] = nom
+                    else:
+                        resultats[nom]["estat"] = OMESA
+                        log(f"✓ [{nom}] {motiu}")
+                    canvis = True
+
+            if not en_marxa:
+                break
+
+            acabades, _ = wait(en_marxa, return_when=FIRST_COMPLETED)
+            for future in acabades:
+                nom = en_marxa.pop(future)
+                codi, durada = future.result()
+                resultats[nom]["durada"] = durada
+                if codi == 0:
+                    resultats[nom]["estat"] = OK
+                    log(f"✓ [{nom}] OK en {durada:.1f} s")
+                else:
+                    resultats[nom]["estat"] = ERROR
+                    log(f"✗ [{nom}] ERROR (codi: {codi}) en {durada:.1f} s")
+                    if args.fail_fast:
+                        aturar = True
+                    else:
+                        log("⚠ Error detectat, però continuant amb les etapes que no en depenen...")
+
+    return resultats
+
+def guardar_informe(resultats, durada_total):
+    """Guarda l'informe estructurat del run (estat i durada de cada etapa)."""
+    try:
+        os.makedirs(os.path.dirname(INFORME_PATH), exist_ok=True)
+        with open(INFORME_PATH, "w", encoding="utf-8") as f:
+            json.dump({"durada_total": round(durada_total, 2), "etapes": resultats}, f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠ No s'ha pogut guardar l'informe: {e}")
 
 def main():
     """Funció principal que decideix quins scripts executar."""
+    parser = argparse.ArgumentParser(description="Ingesta intel·ligent de PokeBuilder")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Reprodueix només la memòria cau de PokéAPI, sense accedir a la xarxa"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Torna a executar tots els scripts d'ingesta (només s'escriuen els documents que han canviat)"
+    )
+    parser.add_argument(
+        "--max-paralel",
+        type=int,
+        default=4,
+        help="Nombre màxim d'etapes executant-se alhora (per defecte 4)"
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Atura el llançament de noves etapes al primer error (per defecte es continua amb les independents)"
+    )
+    args = parser.parse_args()
+
+    if args.offline:
+        # Els scripts d'ingesta hereten l'entorn i llegeixen només de la memòria cau
+        os.environ["POKEAPI_OFFLINE"] = "1"
+
     print("\n" + "="*60)
     print("SCRIPT D'INGESTA INTEL·LIGENT - POKEBUILDER")
     print("="*60 + "\n")
+    if args.offline:
+        print("Mode OFFLINE: les dades de PokéAPI es llegeixen de la memòria cau local.\n")
     
     # Verificar connexió
     print("1. Verificant connexió amb Elasticsearch...")
     if not verificar_connexio():
         print("✗ ERROR: No es pot connectar a Elasticsearch a localhost:9200")
         print("   Assegura't que Elasticsearch està funcionant.")
-        return
+        return 1
     
     print("✓ Elasticsearch està funcionant\n")
     
-    # Verificar estat de cada índex
-    print("2. Verificant estat dels índexs...\n")
-    
-    indexos_a_importar = []
-    indexos_ok = []
-    
-    for index_name, script_name in SCRIPTS_INGESTA.items():
-        count = comptar_documents(index_name)
-        limit_minim = LIMITS_MINIMS.get(index_name, 0)
-        
-        if count == 0:
-            print(f"  ⚠ {index_name:12} : {count:>5} documents → CAL IMPORTAR")
-            indexos_a_importar.append((index_name, script_name))
-        elif count < limit_minim:
-            print(f"  ⚠ {index_name:12} : {count:>5} documents → CAL ACTUALITZAR (mínim esperat: {limit_minim})")
-            indexos_a_importar.append((index_name, script_name))
-        else:
-            print(f"  ✓ {index_name:12} : {count:>5} documents → OK")
-            indexos_ok.append((index_name, count))
-    
-    print()
-    
-    # Inicialitzar comptadors
-    exitosos = 0
-    fallits = 0
-    
-    # Executar scripts d'ingesta si cal
-    if indexos_a_importar:
-        # Mostrar què s'executarà
-        print("="*60)
-        print("SCRIPTS QUE S'EXECUTARAN:")
-        print("="*60)
-        for index_name, script_name in indexos_a_importar:
-            print(f"  • {script_name} (per a l'índex {index_name})")
-        print()
-        
-        # Executar automàticament sense demanar confirmació
-        print("Executant automàticament els scripts necessaris...\n")
-        
-        # Executar scripts
-        print("\n" + "="*60)
-        print("INICIANT INGESTA...")
-        print("="*60)
-        
-        for index_name, script_name in indexos_a_importar:
-            if executar_script(script_name):
-                exitosos += 1
-            else:
-                fallits += 1
-                # Continuem automàticament amb els altres scripts encara que hi hagi errors
-                print("\n⚠ Error detectat, però continuant amb els altres scripts...")
-    else:
-        print("="*60)
-        print("✓ TOTS ELS ÍNDEXS TENEN DADES SUFICIENTS")
-        print("="*60)
-        print("\nNo cal executar cap script d'ingesta.")
-    
-    # Verificar si cal crear usuaris (si no n'hi ha cap)
-    users_count = comptar_documents("users")
-    if users_count == 0:
-        print("\n" + "="*60)
-        print("VERIFICANT USUARIS...")
-        print("="*60)
-        print(f"Detectat: {users_count} usuaris a la base de dades.")
-        print("Executant script per crear usuaris predefinits...\n")
-        
-        if executar_script("ingesta_usuarios.py"):
-            exitosos += 1
-            print("✓ Usuaris creats correctament")
-        else:
-            fallits += 1
-            print("⚠ Error al crear usuaris")
-    else:
-        print(f"\n✓ Usuaris ja existeixen a la base de dades ({users_count} usuaris trobats)")
-    
-    # Verificar si cal crear equips (si no n'hi ha cap)
-    teams_count = comptar_documents("teams")
-    if teams_count == 0:
-        print("\n" + "="*60)
-        print("VERIFICANT EQUIPS...")
-        print("="*60)
-        print(f"Detectat: {teams_count} equips a la base de dades.")
-        print("Executant script per crear equips predefinits...\n")
-        
-        if executar_script("ingesta_teams.py"):
-            exitosos += 1
-            print("✓ Equips creats correctament")
-        else:
-            fallits += 1
-            print("⚠ Error al crear equips")
-    else:
-        print(f"\n✓ Equips ja existeixen a la base de dades ({teams_count} equips trobats)")
-    
-    # Sempre verificar si cal marcar Pokémon prohibits (independentment de si s'han importat índexs)
-    pokemon_count = comptar_documents("pokemon")
-    if pokemon_count > 0:
-        print("\n" + "="*60)
-        print("VERIFICANT MARCADO DE POKÉMON PROHIBITS...")
-        print("="*60)
-        
-        # Verificar si hi ha Pokémon sense el camp is_banned
-        try:
-            response = requests.get(f"{ELASTIC_URL}/pokemon/_search", json={
-                "query": {
-                    "bool": {
-                        "must_not": {
-                            "exists": {"field": "is_banned"}
-                        }
-                    }
-                },
-                "size": 1
-            })
-            
-            # També verificar si hi ha Pokémon prohibits marcats
-            response_prohibits = requests.get(f"{ELASTIC_URL}/pokemon/_search", json={
-                "query": {
-                    "term": {"is_banned": True}
-                },
-                "size": 1
-            })
-            
-            pokemon_sense_marcar = response.json()['hits']['total']['value']
-            pokemon_prohibits = response_prohibits.json()['hits']['total']['value']
-            
-            # Si no hi ha cap Pokémon prohibit marcat i hi ha molts Pokémon, cal executar el script
-            if pokemon_prohibits == 0 and pokemon_count >= 100:
-                print(f"Detectat: {pokemon_count} Pokémon però cap prohibit marcat.")
-                print("Executant script per marcar Pokémon prohibits...\n")
-                
-                if executar_script("marcar_pokemon_prohibits.py"):
-                    exitosos += 1
-                    print("✓ Pokémon prohibits marcats correctament")
-                else:
-                    fallits += 1
-                    print("⚠ Error al marcar Pokémon prohibits")
-            elif pokemon_sense_marcar > 0:
-                print(f"Detectat: {pokemon_sense_marcar} Pokémon sense camp is_banned.")
-                print("Executant script per marcar Pokémon prohibits...\n")
-                
-                if executar_script("marcar_pokemon_prohibits.py"):
-                    exitosos += 1
-                    print("✓ Pokémon prohibits marcats correctament")
-                else:
-                    fallits += 1
-                    print("⚠ Error al marcar Pokémon prohibits")
-            else:
-                print(f"✓ Pokémon prohibits ja estan marcats correctament ({pokemon_prohibits} prohibits trobats)")
-        except Exception as e:
-            print(f"⚠ Error verificant estat de Pokémon prohibits: {e}")
+    # Executar el graf d'etapes
+    print(f"2. Executant les etapes d'ingesta (fins a {args.max_paralel} en paral·lel, "
+          f"{'fail-fast' if args.fail_fast else 'continuant si hi ha errors'})...\n")
+    inici = time.perf_counter()
+    resultats = executar_dag(args)
+    durada_total = time.perf_counter() - inici
+    guardar_informe(resultats, durada_total)
     
     # Resum final
+    exitosos = sum(1 for r in resultats.values() if r["estat"] == OK)
+    fallits = sum(1 for r in resultats.values() if r["estat"] == ERROR)
+    
     print("\n" + "="*60)
     print("RESUM FINAL")
     print("="*60)
-    print(f"Scripts executats amb èxit: {exitosos}")
+    print(f"{'ETAPA':18} {'ESTAT':12} {'DURADA':>8}")
+    for nom, resultat in resultats.items():
+        durada = f"{resultat['durada']:.1f} s" if resultat["estat"] in (OK, ERROR) else "-"
+        print(f"{nom:18} {resultat['estat']:12} {durada:>8}")
+    print(f"\nScripts executats amb èxit: {exitosos}")
     print(f"Scripts fallits: {fallits}")
-    print(f"Índexs que ja tenien dades: {len(indexos_ok)}")
+    print(f"Durada total: {durada_total:.1f} s")
     
     # Verificar estat final
     print("\n" + "="*60)
@@ -280,7 +410,7 @@ def main():
     print(f"  {status_teams} {'teams':12} : {teams_count:>5} documents")
     
     print("\n" + "="*60)
+    return 1 if fallits else 0
 
 if __name__ == "__main__":
-    main()
-
+    sys.exit(main())
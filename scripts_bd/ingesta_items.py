@@ -1,6 +1,10 @@
+import sys
+
 import requests
-import json
-import time
+
+from bulk_writer import BulkWriter
+from pokeapi_cache import pokeapi_get, esperar_si_cal, resum_cache
+from run_manifest import RunManifest, CHECKPOINT_CADA
 
 # --- Configuració ---
 # L'adreça de la nostra base de dades local
@@ -26,7 +30,7 @@ def importar_items():
         
         while next_url:
             print(f"Obtenint llista d'items de: {next_url}")
-            response_list = requests.get(next_url)
+            response_list = pokeapi_get(next_url)
             
             if response_list.status_code != 200:
                 print(f"ERROR: No s'ha pogut obtenir la llista d'items. Status: {response_list.status_code}")
@@ -37,17 +41,28 @@ def importar_items():
             
             # Comprovem si hi ha una pàgina següent
             next_url = data.get("next")
-            time.sleep(0.1)  # Esperem per no saturar l'API
+            esperar_si_cal(0.1)  # Esperem per no saturar l'API
         
         total_items = len(all_items)
         print(f"Trobats {total_items} items de Pokémon a importar.\n")
         
     except requests.exceptions.RequestException as e:
         print(f"ERROR DE XARXA al obtenir la llista d'items: {e}")
-        return
+        return False
+    
+    # Els documents s'envien a Elasticsearch en lots via l'API _bulk.
+    # Només es reescriuen els que han canviat (mateix content_hash = s'omet).
+    writer = BulkWriter(ELASTIC_URL, INDEX_NAME, skip_unchanged=True)
+    
+    # Manifest del run: si l'anterior es va interrompre, el reprenem
+    manifest = RunManifest(INDEX_NAME)
+    checkpoint = manifest.iniciar() or 0
     
     # Processem cada item
     for idx, item_entry in enumerate(all_items, 1):
+        if idx <= checkpoint:
+            continue  # Ja processat en el run interromput
+        
         item_name = item_entry["name"]
         item_url = item_entry["url"]
         
@@ -61,7 +76,7 @@ def importar_items():
             # ==========================================================
             # 1. Obtenir dades completes de l'item des de PokéAPI
             # ==========================================================
-            response_item = requests.get(item_url)
+            response_item = pokeapi_get(item_url)
             
             if response_item.status_code != 200:
                 print(f"ERROR: No s'ha trobat l'item {item_name}. Status: {response_item.status_code}")
@@ -111,34 +126,45 @@ def importar_items():
             }
             
             # ==========================================================
-            # 3. Inserir dades a Elasticsearch
+            # 3. Encuar el document per inserir-lo a Elasticsearch
             # ==========================================================
-            url_desti = f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{item_id}"
-            headers = {"Content-Type": "application/json"}
-            
-            response_elastic = requests.put(url_desti, data=json.dumps(nostre_item), headers=headers)
+            writer.index(item_id, nostre_item)
             
-            if response_elastic.status_code in [200, 201]:
-                if idx % 50 == 0:
-                    print(f"✓ ÈXIT! Item {item_name.capitalize()} inserit/actualitzat.")
-            else:
-                print(f"ERROR a l'inserir a Elasticsearch (ID: {item_id}): {response_elastic.status_code}")
-                print(response_elastic.text)
+            if idx % 50 == 0:
+                print(f"✓ ÈXIT! Item {item_name.capitalize()} encuat per inserir/actualitzar.")
         
         except requests.exceptions.RequestException as e:
             print(f"ERROR DE XARXA (Item {item_name}): {e}")
-            print("Comprova que Elasticsearch (localhost:9200) està funcionant.")
+            print("Comprova la connexió amb PokéAPI.")
         
         except Exception as e:
             print(f"ERROR INESPERAT (Item {item_name}): {e}")
         
-        # Esperem una estona per no saturar l'API de PokéAPI
-        time.sleep(0.1)
+        # Esperem una estona per no saturar l'API de PokéAPI (només si hem anat a la xarxa)
+        esperar_si_cal(0.1)
+
+        # Checkpoint: un cop confirmats els lots, es pot reprendre des d'aquí
+        if idx % CHECKPOINT_CADA == 0:
+            writer.flush()
+            # Si algun document ha fallat, el checkpoint no avança: el següent run el tornarà a escriure
+            if not writer.errors:
+                manifest.guardar_checkpoint(idx)
+    
+    # Enviem els lots pendents i mostrem el resum (errors i throughput)
+    writer.close()
+    resum_cache()
+    resum = {"indexats": writer.indexats, "sense_canvis": writer.sense_canvis, "errors": len(writer.errors)}
+    if writer.errors:
+        manifest.fallar(**resum)
+    else:
+        manifest.completar(**resum)
     
     print(f"\n--- INGESTA D'ITEMS FINALITZADA ---")
     print(f"Total d'items importats: {total_items}")
+    return not writer.errors
 
 # --- Punt d'entrada per executar l'script ---
 if __name__ == "__main__":
-    importar_items()
+    # Codi de sortida no nul si algun document no s'ha pogut escriure (ingesta_completa.py el comprova)
+    sys.exit(0 if importar_items() else 1)
 
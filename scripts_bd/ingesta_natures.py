@@ -1,6 +1,10 @@
+import sys
+
 import requests
-import json
-import time
+
+from bulk_writer import BulkWriter
+from pokeapi_cache import pokeapi_get, esperar_si_cal, resum_cache
+from run_manifest import RunManifest, CHECKPOINT_CADA
 
 # --- Configuració ---
 # L'adreça de la nostra base de dades local
@@ -26,7 +30,7 @@ def importar_naturalezas():
         
         while next_url:
             print(f"Obtenint llista de naturalezas de: {next_url}")
-            response_list = requests.get(next_url)
+            response_list = pokeapi_get(next_url)
             
             if response_list.status_code != 200:
                 print(f"ERROR: No s'ha pogut obtenir la llista de naturalezas. Status: {response_list.status_code}")
@@ -37,17 +41,28 @@ def importar_naturalezas():
             
             # Comprovem si hi ha una pàgina següent
             next_url = data.get("next")
-            time.sleep(0.1)  # Esperem per no saturar l'API
+            esperar_si_cal(0.1)  # Esperem per no saturar l'API
         
         total_naturalezas = len(all_natures)
         print(f"Trobades {total_naturalezas} naturalezas de Pokémon a importar.\n")
         
     except requests.exceptions.RequestException as e:
         print(f"ERROR DE XARXA al obtenir la llista de naturalezas: {e}")
-        return
+        return False
+    
+    # Els documents s'envien a Elasticsearch en lots via l'API _bulk.
+    # Només es reescriuen els que han canviat (mateix content_hash = s'omet).
+    writer = BulkWriter(ELASTIC_URL, INDEX_NAME, skip_unchanged=True)
+    
+    # Manifest del run: si l'anterior es va interrompre, el reprenem
+    manifest = RunManifest(INDEX_NAME)
+    checkpoint = manifest.iniciar() or 0
     
     # Processem cada naturalesa
     for idx, nature_entry in enumerate(all_natures, 1):
+        if idx <= checkpoint:
+            continue  # Ja processat en el run interromput
+        
         nature_name = nature_entry["name"]
         nature_url = nature_entry["url"]
         
@@ -60,7 +75,7 @@ def importar_naturalezas():
             # ==========================================================
             # 1. Obtenir dades completes de la naturalesa des de PokéAPI
             # ==========================================================
-            response_nature = requests.get(nature_url)
+            response_nature = pokeapi_get(nature_url)
             
             if response_nature.status_code != 200:
                 print(f"ERROR: No s'ha trobat la naturalesa {nature_name}. Status: {response_nature.status_code}")
@@ -102,38 +117,49 @@ def importar_naturalezas():
             }
             
             # ==========================================================
-            # 3. Inserir dades a Elasticsearch
+            # 3. Encuar el document per inserir-lo a Elasticsearch
             # ==========================================================
-            url_desti = f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{nature_id}"
-            headers = {"Content-Type": "application/json"}
-            
-            response_elastic = requests.put(url_desti, data=json.dumps(nostra_naturalesa), headers=headers)
+            writer.index(nature_id, nostra_naturalesa)
             
-            if response_elastic.status_code in [200, 201]:
-                stat_info = ""
-                if increased_stat and decreased_stat:
-                    stat_info = f" (+{increased_stat}, -{decreased_stat})"
-                elif not increased_stat and not decreased_stat:
-                    stat_info = " (neutral)"
-                print(f"✓ ÈXIT! Naturalesa {nature_name.capitalize()}{stat_info} inserida/actualitzada.")
-            else:
-                print(f"ERROR a l'inserir a Elasticsearch (ID: {nature_id}): {response_elastic.status_code}")
-                print(response_elastic.text)
+            stat_info = ""
+            if increased_stat and decreased_stat:
+                stat_info = f" (+{increased_stat}, -{decreased_stat})"
+            elif not increased_stat and not decreased_stat:
+                stat_info = " (neutral)"
+            print(f"✓ ÈXIT! Naturalesa {nature_name.capitalize()}{stat_info} encuada per inserir/actualitzar.")
         
         except requests.exceptions.RequestException as e:
             print(f"ERROR DE XARXA (Naturalesa {nature_name}): {e}")
-            print("Comprova que Elasticsearch (localhost:9200) està funcionant.")
+            print("Comprova la connexió amb PokéAPI.")
         
         except Exception as e:
             print(f"ERROR INESPERAT (Naturalesa {nature_name}): {e}")
         
-        # Esperem una estona per no saturar l'API de PokéAPI
-        time.sleep(0.1)
+        # Esperem una estona per no saturar l'API de PokéAPI (només si hem anat a la xarxa)
+        esperar_si_cal(0.1)
+
+        # Checkpoint: un cop confirmats els lots, es pot reprendre des d'aquí
+        if idx % CHECKPOINT_CADA == 0:
+            writer.flush()
+            # Si algun document ha fallat, el checkpoint no avança: el següent run el tornarà a escriure
+            if not writer.errors:
+                manifest.guardar_checkpoint(idx)
+    
+    # Enviem els lots pendents i mostrem el resum (errors i throughput)
+    writer.close()
+    resum_cache()
+    resum = {"indexats": writer.indexats, "sense_canvis": writer.sense_canvis, "errors": len(writer.errors)}
+    if writer.errors:
+        manifest.fallar(**resum)
+    else:
+        manifest.completar(**resum)
     
     print(f"\n--- INGESTA DE NATURALEZAS FINALITZADA ---")
     print(f"Total de naturalezas importades: {total_naturalezas}")
+    return not writer.errors
 
 # --- Punt d'entrada per executar l'script ---
 if __name__ == "__main__":
-    importar_naturalezas()
+    # Codi de sortida no nul si algun document no s'ha pogut escriure (ingesta_completa.py el comprova)
+    sys.exit(0 if importar_naturalezas() else 1)
 
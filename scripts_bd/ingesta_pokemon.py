@@ -1,6 +1,15 @@
+import os
+import sys
+
 import requests
-import json
-import time
+
+from bulk_writer import BulkWriter
+from pokeapi_cache import pokeapi_get, esperar_si_cal, resum_cache
+from run_manifest import RunManifest, CHECKPOINT_CADA
+
+# La normalització de noms és la mateixa que fa servir el backend (common/ a l'arrel del repositori)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.name_index import normalize_name
 
 # --- Configuració ---
 # L'adreça de la nostra base de dades local
@@ -16,11 +25,19 @@ def importar_pokemons():
     Script principal que llegeix de PokéAPI i insereix a Elasticsearch.
     """
     
-    # IDs dels Pokémon que volem importar (de l'1 al 1026)
-    ids_a_importar = range(1, 1026) # range(1, 10) va de 1 a 9
+    # Manifest del run: si l'anterior es va interrompre, el reprenem
+    manifest = RunManifest(INDEX_NAME)
+    checkpoint = manifest.iniciar() or 0
+    
+    # IDs dels Pokémon que volem importar (de l'1 al 1026, o des del checkpoint)
+    ids_a_importar = range(checkpoint + 1, 1026) # range(1, 10) va de 1 a 9
     
     print(f"--- INICI DE LA INGESTA DE {len(ids_a_importar)} POKÉMONS ---")
     
+    # Els documents s'envien a Elasticsearch en lots via l'API _bulk.
+    # Només es reescriuen els que han canviat (mateix content_hash = s'omet).
+    writer = BulkWriter(ELASTIC_URL, INDEX_NAME, skip_unchanged=True)
+    
     for pokemon_id in ids_a_importar:
         
         print(f"\n--- Processant Pokémon ID: {pokemon_id} ---")
@@ -30,7 +47,7 @@ def importar_pokemons():
             # 1. Obtenir dades de PokéAPI
             # ==========================================================
             url_pokeapi = f"{POKEAPI_BASE_URL}/{pokemon_id}"
-            response_pokeapi = requests.get(url_pokeapi)
+            response_pokeapi = pokeapi_get(url_pokeapi)
             
             # Comprovem si la petició a PokéAPI ha anat bé
             if response_pokeapi.status_code != 200:
@@ -84,52 +101,59 @@ def importar_pokemons():
                     })
             
             # Creem el document final que inserirem
-            # Nota: is_banned per defecte és false. Es pot actualitzar després amb un script específic
+            # Nota: is_banned / banned_formats els escriu marcar_pokemon_prohibits.py i no formen
+            # part d'aquest document (ni del seu content_hash), de manera que reescriure'l no els esborra
             nostre_pokemon = {
                 "pokedex_id": data["id"],
                 "name": data["name"],
+                "name_key": normalize_name(data["name"]), # Clau per a l'índex de noms (sense guions, espais ni majúscules)
+                # Camps de visualització precalculats (el backend no els ha de refer a cada resposta)
+                "display_name": data["name"].capitalize(),
+                "sprite_url": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{data['id']}.png",
                 "types": tipus_pokemon,
                 "stats": stats_pokemon,
                 "abilities": abilities_pokemon,
-                "moves_pool": moves_pool_pokemon,
-                "is_banned": False  # Per defecte no està prohibit. Es pot actualitzar després
+                "moves_pool": moves_pool_pokemon
             }
 
             # ==========================================================
-            # 3. Inserir dades a Elasticsearch
+            # 3. Encuar el document per inserir-lo a Elasticsearch
             # ==========================================================
             
             # Fem servir l'ID de la Pokédex com a ID del document a Elasticsearch
-            # L'índex és 'pokemon', el tipus '_doc', i l'ID és el de la Pokédex
-            url_desti = f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{pokemon_id}"
-            
-            headers = {"Content-Type": "application/json"}
-            
-            # Fem un 'PUT' per posar-li nosaltres l'ID.
-            # Si el document ja existeix, el sobreescriu.
-            response_elastic = requests.put(url_desti, data=json.dumps(nostre_pokemon), headers=headers)
-
-            # Comprovem la resposta d'Elasticsearch
-            # 201 = Creat (Created)
-            # 200 = Actualitzat (OK)
-            if response_elastic.status_code == 201:
-                print(f"ÈXIT! Pokémon {nostre_pokemon['name'].capitalize()} (ID: {pokemon_id}) inserit a Elasticsearch.")
-            elif response_elastic.status_code == 200:
-                print(f"ÈXIT! Pokémon {nostre_pokemon['name'].capitalize()} (ID: {pokemon_id}) actualitzat a Elasticsearch.")
-            else:
-                print(f"ERROR a l'inserir a Elasticsearch (ID: {pokemon_id}): {response_elastic.status_code}")
-                print(response_elastic.text)
+            # Si el document ja existeix, se n'actualitzen els camps i es conserven els de prohibits;
+            # si és nou, es crea amb is_banned = false (per defecte no està prohibit)
+            writer.update(pokemon_id, nostre_pokemon, upsert={"is_banned": False})
+            print(f"ÈXIT! Pokémon {nostre_pokemon['name'].capitalize()} (ID: {pokemon_id}) encuat per inserir a Elasticsearch.")
         
         except requests.exceptions.RequestException as e:
             print(f"ERROR DE XARXA (ID: {pokemon_id}): {e}")
-            print("Comprova que Elasticsearch (localhost:9200) està funcionant.")
+            print("Comprova la connexió amb PokéAPI.")
             
-        # Esperem una estona per no saturar l'API de PokéAPI
-        time.sleep(0.1) 
+        # Esperem una estona per no saturar l'API de PokéAPI (només si hem anat a la xarxa)
+        esperar_si_cal(0.1) 
+
+        # Checkpoint: un cop confirmats els lots, es pot reprendre des d'aquí
+        if pokemon_id % CHECKPOINT_CADA == 0:
+            writer.flush()
+            # Si algun document ha fallat, el checkpoint no avança: el següent run el tornarà a escriure
+            if not writer.errors:
+                manifest.guardar_checkpoint(pokemon_id)
+
+    # Enviem els lots pendents i mostrem el resum (errors i throughput)
+    writer.close()
+    resum_cache()
+    resum = {"indexats": writer.indexats, "sense_canvis": writer.sense_canvis, "errors": len(writer.errors)}
+    if writer.errors:
+        manifest.fallar(**resum)
+    else:
+        manifest.completar(**resum)
 
     print("\n--- INGESTA FINALITZADA ---")
+    return not writer.errors
 
 # --- Punt d'entrada per executar l'script ---
 if __name__ == "__main__":
-    importar_pokemons()
+    # Codi de sortida no nul si algun document no s'ha pogut escriure (ingesta_completa.py el comprova)
+    sys.exit(0 if importar_pokemons() else 1)
 
@@ -1,7 +1,15 @@
 import requests
-import json
+import os
+import sys
 from datetime import datetime
 
+# L'índex de noms i el validador són els mateixos que fa servir el backend (common/ a l'arrel del repositori)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.name_index import PokemonNameIndex
+from common.team_validator import TeamValidator
+
+from bulk_writer import BulkWriter
+
 # --- Configuració ---
 ELASTIC_URL = "http://localhost:9200"
 INDEX_NAME = "teams"
@@ -334,6 +342,61 @@ EQUIPS = [
     }
 ]
 
+def carregar_index_noms():
+    """
+    Construeix l'índex de noms → pokedex_id amb els Pokémon ja ingerits.
+    """
+    response = requests.post(f"{ELASTIC_URL}/pokemon/_search", json={
+        "query": {"match_all": {}},
+        "_source": ["pokedex_id", "name", "name_key"],
+        "size": 10000
+    })
+
+    name_index = PokemonNameIndex()
+    if response.status_code == 200:
+        for hit in response.json()["hits"]["hits"]:
+            data = hit["_source"]
+            name_index.add(data.get("name_key") or data.get("name", ""), data["pokedex_id"])
+    return name_index
+
+def carregar_validador():
+    """
+    Construeix el validador d'equips (habilitats i moviments de cada
+    Pokémon, objectes i natures) amb les dades ja ingerides.
+    """
+    def documents(index, camps):
+        response = requests.post(f"{ELASTIC_URL}/{index}/_search", json={
+            "query": {"match_all": {}},
+            "_source": camps,
+            "size": 10000
+        })
+        if response.status_code != 200:
+            return []
+        return [hit["_source"] for hit in response.json()["hits"]["hits"]]
+
+    return TeamValidator.from_sources(
+        documents("pokemon", ["pokedex_id", "name", "abilities.name", "moves_pool.name"]),
+        documents("items", ["name"]),
+        documents("natures", ["name"])
+    )
+
+def carregar_equips_existents():
+    """
+    Equips que ja hi ha a l'índex: (team_name, user_id) → (ID del document, created_at).
+    """
+    response = requests.post(f"{ELASTIC_URL}/{INDEX_NAME}/_search", json={
+        "query": {"terms": {"user_id": sorted({str(equip["user_id"]) for equip in EQUIPS})}},
+        "_source": ["team_name", "user_id", "created_at"],
+        "size": 10000
+    })
+
+    existents = {}
+    if response.status_code == 200:
+        for hit in response.json()["hits"]["hits"]:
+            data = hit["_source"]
+            existents.setdefault((data.get("team_name"), str(data.get("user_id"))), (hit["_id"], data.get("created_at")))
+    return existents
+
 def importar_teams():
     """
     Script que importa els equips predefinits a Elasticsearch.
@@ -348,10 +411,10 @@ def importar_teams():
         if response.status_code != 200:
             print(f"✗ ERROR: No es pot connectar a Elasticsearch a {ELASTIC_URL}")
             print("   Assegura't que Elasticsearch està funcionant.")
-            return
+            return False
     except Exception as e:
         print(f"✗ ERROR de connexió amb Elasticsearch: {e}")
-        return
+        return False
     
     print("✓ Connexió amb Elasticsearch verificada\n")
     
@@ -361,13 +424,30 @@ def importar_teams():
         if response.status_code != 200:
             print(f"⚠ L'índex {INDEX_NAME} no existeix. Creant-lo primer...")
             print("   Executa les comandes de crear-indexs.json per crear l'índex.")
-            return
+            return False
     except Exception as e:
         print(f"✗ ERROR verificant l'índex: {e}")
-        return
+        return False
+    
+    # Índex de noms per guardar el pokedex_id de cada membre
+    name_index = carregar_index_noms()
+    if len(name_index) == 0:
+        print("⚠ No hi ha Pokémon a la base de dades: els membres es guardaran sense pokedex_id")
+    else:
+        print(f"✓ Índex de noms carregat ({len(name_index)} Pokémon)\n")
+
+    # Validador de legalitat: els equips amb errors no s'importen
+    validador = carregar_validador()
+    if len(validador) == 0:
+        print("⚠ No hi ha Pokémon a la base de dades: els equips no es validaran\n")
+    
+    # Equips que ja existeixen (per team_name i user_id), amb una sola consulta
+    existents = carregar_equips_existents()
+    
+    # Els equips s'envien a Elasticsearch en lots via l'API _bulk
+    writer = BulkWriter(ELASTIC_URL, INDEX_NAME)
     
     # Processar cada equip
-    exitosos = 0
     actualitzats = 0
     creats = 0
     errors = 0
@@ -377,73 +457,67 @@ def importar_teams():
         team_name = equip["team_name"]
         
         try:
-            # Verificar si l'equip ja existeix (per team_name i user_id)
-            url_check = f"{ELASTIC_URL}/{INDEX_NAME}/_search"
-            query_check = {
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"term": {"team_name.keyword": team_name}},
-                            {"term": {"user_id": str(user_id)}}
-                        ]
-                    }
-                }
-            }
-            
-            response_check = requests.post(url_check, json=query_check, headers={"Content-Type": "application/json"})
-            
-            existeix = False
-            doc_id = None
-            
-            if response_check.status_code == 200:
-                hits = response_check.json().get("hits", {}).get("hits", [])
-                if hits:
-                    existeix = True
-                    doc_id = hits[0]["_id"]
-            
             # Si no existeix, generar un ID únic basat en user_id i índex
+            doc_id, creat_el = existents.get((team_name, str(user_id)), (None, None))
+            existeix = doc_id is not None
             if not doc_id:
                 doc_id = f"team_user{user_id}_{idx}"
             
-            # Inserir o actualitzar l'equip
-            url_desti = f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{doc_id}"
-            headers = {"Content-Type": "application/json"}
-            
             # Convertir user_id a string perquè el mapping és keyword
             equip_actualitzat = equip.copy()
             equip_actualitzat["user_id"] = str(user_id)
             
-            response_elastic = requests.put(url_desti, data=json.dumps(equip_actualitzat), headers=headers)
+            # Camps que fa servir el llistat paginat del backend (ordre i desempat)
+            ara = datetime.now().isoformat()
+            equip_actualitzat["team_id"] = doc_id
+            equip_actualitzat["created_at"] = creat_el or ara
+            equip_actualitzat["updated_at"] = ara
             
-            if response_elastic.status_code in [200, 201]:
-                if existeix:
-                    print(f"✓ Equip '{team_name}' (Usuari {user_id}) actualitzat correctament")
-                    actualitzats += 1
-                else:
-                    print(f"✓ Equip '{team_name}' (Usuari {user_id}) creat correctament")
-                    creats += 1
-                exitosos += 1
-            else:
-                print(f"✗ ERROR inserint/actualitzant equip '{team_name}' (Usuari {user_id}): {response_elastic.status_code}")
-                print(f"   Resposta: {response_elastic.text}")
+            # Resoldre el pokedex_id de cada membre a partir del seu nom
+            equip_actualitzat["team_members"] = []
+            for member in equip["team_members"]:
+                pokedex_id = name_index.resolve(member["base_pokemon"])
+                if pokedex_id is None and len(name_index) > 0:
+                    print(f"  ⚠ No s'ha pogut resoldre '{member['base_pokemon']}' a cap pokedex_id")
+                equip_actualitzat["team_members"].append({**member, "pokedex_id": pokedex_id})
+            
+            errors_equip = validador.validate_team(equip_actualitzat["team_members"]) if len(validador) > 0 else []
+            if errors_equip:
+                print(f"✗ Equip '{team_name}' (Usuari {user_id}) no és legal i no s'importa:")
+                for error in errors_equip:
+                    print(f"   • Membre {error['member']} - {error['field']} '{error['value']}': {error['reason']}")
                 errors += 1
+                continue
+            
+            # Inserir o actualitzar l'equip
+            writer.index(doc_id, equip_actualitzat)
+            
+            if existeix:
+                print(f"✓ Equip '{team_name}' (Usuari {user_id}) encuat per actualitzar")
+                actualitzats += 1
+            else:
+                print(f"✓ Equip '{team_name}' (Usuari {user_id}) encuat per crear")
+                creats += 1
         
-        except requests.exceptions.RequestException as e:
-            print(f"✗ ERROR DE XARXA (Equip '{team_name}'): {e}")
-            errors += 1
         except Exception as e:
             print(f"✗ ERROR INESPERAT (Equip '{team_name}'): {e}")
             errors += 1
     
+    # Enviem els lots pendents i mostrem el resum (errors per document)
+    writer.close()
+    errors += len(writer.errors)
+    
     # Resum final
     print(f"\n--- INGESTA D'EQUIPS FINALITZADA ---")
     print(f"✓ Equips creats: {creats}")
     print(f"✓ Equips actualitzats: {actualitzats}")
-    print(f"✓ Total exitosos: {exitosos}")
+    print(f"✓ Total exitosos: {writer.indexats}")
     if errors > 0:
         print(f"✗ Errors: {errors}")
+    return errors == 0
 
 # --- Punt d'entrada per executar l'script ---
 if __name__ == "__main__":
-    importar_teams()
+    # Codi de sortida no nul si algun equip no s'ha pogut importar (ingesta_completa.py el comprova)
+    sys.exit(0 if importar_teams() else 1)
 
@@ -1,6 +1,10 @@
+import sys
+
 import requests
-import json
-import time
+
+from bulk_writer import BulkWriter
+from pokeapi_cache import pokeapi_get, esperar_si_cal, resum_cache
+from run_manifest import RunManifest, CHECKPOINT_CADA
 
 # --- Configuració ---
 # L'adreça de la nostra base de dades local
@@ -21,10 +25,10 @@ def importar_tipus():
     
     # Primer obtenim la llista de tots els tipus disponibles
     try:
-        response_list = requests.get(POKEAPI_TYPES_URL)
+        response_list = pokeapi_get(POKEAPI_TYPES_URL)
         if response_list.status_code != 200:
             print(f"ERROR: No s'ha pogut obtenir la llista de tipus. Status: {response_list.status_code}")
-            return
+            return False
         
         types_list = response_list.json()
         total_tipus = len(types_list["results"])
@@ -32,10 +36,21 @@ def importar_tipus():
         
     except requests.exceptions.RequestException as e:
         print(f"ERROR DE XARXA al obtenir la llista de tipus: {e}")
-        return
+        return False
+    
+    # Els documents s'envien a Elasticsearch en lots via l'API _bulk.
+    # Només es reescriuen els que han canviat (mateix content_hash = s'omet).
+    writer = BulkWriter(ELASTIC_URL, INDEX_NAME, skip_unchanged=True)
+    
+    # Manifest del run: si l'anterior es va interrompre, el reprenem
+    manifest = RunManifest(INDEX_NAME)
+    checkpoint = manifest.iniciar() or 0
     
     # Processem cada tipus
     for idx, type_entry in enumerate(types_list["results"], 1):
+        if idx <= checkpoint:
+            continue  # Ja processat en el run interromput
+        
         type_name = type_entry["name"]
         type_url = type_entry["url"]
         
@@ -48,7 +63,7 @@ def importar_tipus():
             # ==========================================================
             # 1. Obtenir dades completes del tipus des de PokéAPI
             # ==========================================================
-            response_type = requests.get(type_url)
+            response_type = pokeapi_get(type_url)
             
             if response_type.status_code != 200:
                 print(f"ERROR: No s'ha trobat el tipus {type_name}. Status: {response_type.status_code}")
@@ -93,37 +108,48 @@ def importar_tipus():
             }
             
             # ==========================================================
-            # 3. Inserir dades a Elasticsearch
+            # 3. Encuar el document per inserir-lo a Elasticsearch
             # ==========================================================
-            url_desti = f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{type_id}"
-            headers = {"Content-Type": "application/json"}
-            
-            response_elastic = requests.put(url_desti, data=json.dumps(nostre_tipus), headers=headers)
+            writer.index(type_id, nostre_tipus)
             
-            if response_elastic.status_code in [200, 201]:
-                print(f"✓ ÈXIT! Tipus {type_name.capitalize()} inserit/actualitzat.")
-                print(f"  - Dèbils contra: {', '.join(double_damage_from) if double_damage_from else 'cap'}")
-                print(f"  - Resistents a: {', '.join(half_damage_from) if half_damage_from else 'cap'}")
-                print(f"  - Inmunes a: {', '.join(no_damage_from) if no_damage_from else 'cap'}")
-                print(f"  - Efectius contra: {', '.join(double_damage_to) if double_damage_to else 'cap'}")
-            else:
-                print(f"ERROR a l'inserir a Elasticsearch (ID: {type_id}): {response_elastic.status_code}")
-                print(response_elastic.text)
+            print(f"✓ ÈXIT! Tipus {type_name.capitalize()} encuat per inserir/actualitzar.")
+            print(f"  - Dèbils contra: {', '.join(double_damage_from) if double_damage_from else 'cap'}")
+            print(f"  - Resistents a: {', '.join(half_damage_from) if half_damage_from else 'cap'}")
+            print(f"  - Inmunes a: {', '.join(no_damage_from) if no_damage_from else 'cap'}")
+            print(f"  - Efectius contra: {', '.join(double_damage_to) if double_damage_to else 'cap'}")
         
         except requests.exceptions.RequestException as e:
             print(f"ERROR DE XARXA (Tipus {type_name}): {e}")
-            print("Comprova que Elasticsearch (localhost:9200) està funcionant.")
+            print("Comprova la connexió amb PokéAPI.")
         
         except Exception as e:
             print(f"ERROR INESPERAT (Tipus {type_name}): {e}")
         
-        # Esperem una estona per no saturar l'API de PokéAPI
-        time.sleep(0.1)
+        # Esperem una estona per no saturar l'API de PokéAPI (només si hem anat a la xarxa)
+        esperar_si_cal(0.1)
+
+        # Checkpoint: un cop confirmats els lots, es pot reprendre des d'aquí
+        if idx % CHECKPOINT_CADA == 0:
+            writer.flush()
+            # Si algun document ha fallat, el checkpoint no avança: el següent run el tornarà a escriure
+            if not writer.errors:
+                manifest.guardar_checkpoint(idx)
+    
+    # Enviem els lots pendents i mostrem el resum (errors i throughput)
+    writer.close()
+    resum_cache()
+    resum = {"indexats": writer.indexats, "sense_canvis": writer.sense_canvis, "errors": len(writer.errors)}
+    if writer.errors:
+        manifest.fallar(**resum)
+    else:
+        manifest.completar(**resum)
     
     print("\n--- INGESTA DE TIPUS FINALITZADA ---")
     print(f"Total de tipus importats: {total_tipus}")
+    return not writer.errors
 
 # --- Punt d'entrada per executar l'script ---
 if __name__ == "__main__":
-    importar_tipus()
+    # Codi de sortida no nul si algun document no s'ha pogut escriure (ingesta_completa.py el comprova)
+    sys.exit(0 if importar_tipus() else 1)
 
@@ -1,7 +1,10 @@
-import requests
-import json
+import sys
 from datetime import datetime
 
+import requests
+
+from bulk_writer import BulkWriter
+
 # --- Configuració ---
 ELASTIC_URL = "http://localhost:9200"
 INDEX_NAME = "users"
@@ -90,6 +93,29 @@ USUARIS = [
     }
 ]
 
+def carregar_usuaris_existents():
+    """
+    Usuaris que ja hi ha a l'índex, per user_id i per username → (ID del document, created_at).
+    """
+    response = requests.post(f"{ELASTIC_URL}/{INDEX_NAME}/_search", json={
+        "query": {"bool": {"should": [
+            {"terms": {"user_id": [usuari["user_id"] for usuari in USUARIS]}},
+            {"terms": {"username.keyword": [usuari["username"] for usuari in USUARIS]}}
+        ]}},
+        "_source": ["user_id", "username", "created_at"],
+        "size": 1000
+    })
+
+    per_id = {}
+    per_username = {}
+    if response.status_code == 200:
+        for hit in response.json()["hits"]["hits"]:
+            data = hit["_source"]
+            existent = (hit["_id"], data.get("created_at"))
+            per_id.setdefault(str(data.get("user_id")), existent)
+            per_username.setdefault(data.get("username"), existent)
+    return per_id, per_username
+
 def importar_usuarios():
     """
     Script que importa els usuaris predefinits a Elasticsearch.
@@ -104,10 +130,10 @@ def importar_usuarios():
         if response.status_code != 200:
             print(f"✗ ERROR: No es pot connectar a Elasticsearch a {ELASTIC_URL}")
             print("   Assegura't que Elasticsearch està funcionant.")
-            return
+            return False
     except Exception as e:
         print(f"✗ ERROR de connexió amb Elasticsearch: {e}")
-        return
+        return False
     
     print("✓ Connexió amb Elasticsearch verificada\n")
     
@@ -117,16 +143,21 @@ def importar_usuarios():
         if response.status_code != 200:
             print(f"⚠ L'índex {INDEX_NAME} no existeix. Creant-lo primer...")
             print("   Executa les comandes de crear-indexs.json per crear l'índex.")
-            return
+            return False
     except Exception as e:
         print(f"✗ ERROR verificant l'índex: {e}")
-        return
+        return False
+    
+    # Usuaris que ja existeixen (per user_id o username), amb una sola consulta
+    per_id, per_username = carregar_usuaris_existents()
+    
+    # Els usuaris s'envien a Elasticsearch en lots via l'API _bulk
+    writer = BulkWriter(ELASTIC_URL, INDEX_NAME)
     
     # Obtindre la data actual
     now = datetime.utcnow().isoformat() + "Z"
     
     # Processar cada usuari
-    exitosos = 0
     actualitzats = 0
     creats = 0
     errors = 0
@@ -142,89 +173,47 @@ def importar_usuarios():
             usuari_complet["updated_at"] = now
             usuari_complet["is_active"] = True
             
-            # Verificar si l'usuari ja existeix
-            url_check = f"{ELASTIC_URL}/{INDEX_NAME}/_search"
-            query_check = {
-                "query": {
-                    "term": {
-                        "user_id": user_id
-                    }
-                }
-            }
-            
-            response_check = requests.post(url_check, json=query_check, headers={"Content-Type": "application/json"})
-            
-            existeix = False
-            doc_id = None
-            
-            if response_check.status_code == 200:
-                hits = response_check.json().get("hits", {}).get("hits", [])
-                if hits:
-                    existeix = True
-                    doc_id = hits[0]["_id"]
-                    # Obtenir la data de creació original si existeix
-                    created_at_original = hits[0].get("_source", {}).get("created_at")
-                    if created_at_original:
-                        usuari_complet["created_at"] = created_at_original
-            
-            # Si no existeix, buscar per username per veure si hi ha conflicte
-            if not existeix:
-                query_username = {
-                    "query": {
-                        "term": {
-                            "username.keyword": username
-                        }
-                    }
-                }
-                response_username = requests.post(url_check, json=query_username, headers={"Content-Type": "application/json"})
-                if response_username.status_code == 200:
-                    hits_username = response_username.json().get("hits", {}).get("hits", [])
-                    if hits_username:
-                        existeix = True
-                        doc_id = hits_username[0]["_id"]
-                        created_at_original = hits_username[0].get("_source", {}).get("created_at")
-                        if created_at_original:
-                            usuari_complet["created_at"] = created_at_original
-            
-            # Utilitzar el user_id com a ID del document si no existeix
-            if not doc_id:
+            # Si no existeix per user_id, es busca per username per veure si hi ha conflicte
+            existent = per_id.get(str(user_id)) or per_username.get(username)
+            existeix = existent is not None
+            if existeix:
+                doc_id, created_at_original = existent
+                # Conservar la data de creació original si existeix
+                if created_at_original:
+                    usuari_complet["created_at"] = created_at_original
+            else:
+                # Utilitzar el user_id com a ID del document
                 doc_id = str(user_id)
             
             # Inserir o actualitzar l'usuari
-            url_desti = f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{doc_id}"
-            headers = {"Content-Type": "application/json"}
-            
-            response_elastic = requests.put(url_desti, data=json.dumps(usuari_complet), headers=headers)
+            writer.index(doc_id, usuari_complet)
             
-            if response_elastic.status_code in [200, 201]:
-                if existeix:
-                    print(f"✓ Usuari {username} (ID: {user_id}) actualitzat correctament")
-                    actualitzats += 1
-                else:
-                    print(f"✓ Usuari {username} (ID: {user_id}) creat correctament")
-                    creats += 1
-                exitosos += 1
+            if existeix:
+                print(f"✓ Usuari {username} (ID: {user_id}) encuat per actualitzar")
+                actualitzats += 1
             else:
-                print(f"✗ ERROR inserint/actualitzant usuari {username} (ID: {user_id}): {response_elastic.status_code}")
-                print(f"   Resposta: {response_elastic.text}")
-                errors += 1
+                print(f"✓ Usuari {username} (ID: {user_id}) encuat per crear")
+                creats += 1
         
-        except requests.exceptions.RequestException as e:
-            print(f"✗ ERROR DE XARXA (Usuari {username}): {e}")
-            errors += 1
         except Exception as e:
             print(f"✗ ERROR INESPERAT (Usuari {username}): {e}")
             errors += 1
     
+    # Enviem els lots pendents i mostrem el resum (errors per document)
+    writer.close()
+    errors += len(writer.errors)
+    
     # Resum final
     print(f"\n--- INGESTA D'USUARIS FINALITZADA ---")
     print(f"✓ Usuaris creats: {creats}")
     print(f"✓ Usuaris actualitzats: {actualitzats}")
-    print(f"✓ Total exitosos: {exitosos}")
+    print(f"✓ Total exitosos: {writer.indexats}")
     if errors > 0:
         print(f"✗ Errors: {errors}")
+    return errors == 0
 
 # --- Punt d'entrada per executar l'script ---
 if __name__ == "__main__":
-    importar_usuarios()
+    # Codi de sortida no nul si algun usuari no s'ha pogut escriure (ingesta_completa.py el comprova)
+    sys.exit(0 if importar_usuarios() else 1)
 
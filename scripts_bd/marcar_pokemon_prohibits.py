@@ -1,211 +1,195 @@
 """
 Script per marcar Pokémon com a prohibits en competitivo.
-Pots modificar la llista de pokemon_ids_prohibits segons les regles del format que utilitzis.
+
+Les llistes de prohibits es defineixen per format (VGC, OU, ...) a
+`ban_lists.json`, cadascuna amb la seva versió. Totes les llistes s'apliquen
+d'una sola vegada amb un únic `_update_by_query`, que també fa el reset dels
+Pokémon que ja no hi són. Amb `--formats` només es recalculen els formats
+indicats; els altres formats de cada Pokémon es conserven:
+
+- `banned_formats`: formats on el Pokémon està prohibit (p. ex. ["ou", "vgc"])
+- `is_banned`: si està prohibit al format principal (per defecte VGC)
+
+Ús:
+    python marcar_pokemon_prohibits.py                  # tots els formats, principal VGC
+    python marcar_pokemon_prohibits.py --formats vgc    # només alguns formats
+    python marcar_pokemon_prohibits.py --principal ou   # is_banned segons OU
 """
-import requests
+import argparse
 import json
-import time
+import os
+import sys
+
+import requests
+
+from run_manifest import RunManifest
 
 ELASTIC_URL = "http://localhost:9200"
 INDEX_NAME = "pokemon"
 
-# Llista d'IDs de Pokémon prohibits en competitivo
-# Aquests són exemples - ajusta segons el format (VGC, Smogon, etc.)
-# Exemples comuns: Mewtwo (150), Mew (151), Lugia (249), Ho-Oh (250), etc.
-pokemon_ids_prohibits = [
-    # Llegendaris Míticos (exemples)
-    150,  # Mewtwo
-    151,  # Mew
-    249,  # Lugia
-    250,  # Ho-Oh
-    251,  # Celebi
-    382,  # Kyogre
-    383,  # Groudon
-    384,  # Rayquaza
-    385,  # Jirachi
-    386,  # Deoxys
-    483,  # Dialga
-    484,  # Palkia
-    487,  # Giratina
-    489,  # Phione
-    490,  # Manaphy
-    491,  # Darkrai
-    492,  # Shaymin
-    493,  # Arceus
-    494,  # Victini
-    638,  # Cobalion
-    639,  # Terrakion
-    640,  # Virizion
-    641,  # Tornadus
-    642,  # Thundurus
-    643,  # Reshiram
-    644,  # Zekrom
-    645,  # Landorus
-    646,  # Kyurem
-    647,  # Keldeo
-    648,  # Meloetta
-    649,  # Genesect
-    716,  # Xerneas
-    717,  # Yveltal
-    718,  # Zygarde
-    719,  # Diancie
-    720,  # Hoopa
-    721,  # Volcanion
-    772,  # Type: Null
-    773,  # Silvally
-    785,  # Tapu Koko
-    786,  # Tapu Lele
-    787,  # Tapu Bulu
-    788,  # Tapu Fini
-    789,  # Cosmog
-    790,  # Cosmoem
-    791,  # Solgaleo
-    792,  # Lunala
-    800,  # Necrozma
-    801,  # Magearna
-    802,  # Marshadow
-    807,  # Zeraora
-    808,  # Meltan
-    809,  # Melmetal
-    888,  # Zacian
-    889,  # Zamazenta
-    890,  # Eternatus
-    891,  # Kubfu
-    892,  # Urshifu
-    893,  # Zarude
-    894,  # Regieleki
-    895,  # Regidrago
-    896,  # Glastrier
-    897,  # Spectrier
-    898,  # Calyrex
-    905,  # Enamorus
-    1000, # Gholdengo
-    1001, # Wo-Chien
-    1002, # Chien-Pao
-    1003, # Ting-Lu
-    1004, # Chi-Yu
-    1005, # Roaring Moon
-    1006, # Iron Valiant
-    1007, # Koraidon
-    1008, # Miraidon
-    1009, # Walking Wake
-    1010, # Iron Leaves
-    1011, # Dipplin
-    1012, # Poltchageist
-    1013, # Sinistcha
-    1014, # Okidogi
-    1015, # Munkidori
-    1016, # Fezandipiti
-    1017, # Ogerpon
-    1018, # Archaludon
-    1019, # Hydrapple
-    1020, # Gouging Fire
-    1021, # Raging Bolt
-    1022, # Iron Boulder
-    1023, # Iron Crown
-    1024, # Terapagos
-    1025, # Pecharunt
-]
-
-def marcar_pokemon_prohibits():
+BAN_LISTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ban_lists.json")
+FORMAT_PRINCIPAL = "vgc"
+
+# Calcula els formats de cada document i només el reescriu si ha canviat. Només es
+# toquen els formats aplicats: els altres de 'banned_formats' es conserven tal qual
+# (p. ex. amb --formats vgc no es perden els prohibits d'OU)
+SCRIPT_MARCAR = """
+List formats = new ArrayList();
+if (ctx._source.banned_formats != null) {
+    for (def format : ctx._source.banned_formats) {
+        if (!params.ban_lists.containsKey(format)) {
+            formats.add(format);
+        }
+    }
+}
+for (def entrada : params.ban_lists.entrySet()) {
+    if (entrada.getValue().contains(ctx._id)) {
+        formats.add(entrada.getKey());
+    }
+}
+Collections.sort(formats);
+boolean prohibit = formats.contains(params.format_principal);
+
+if (ctx._source.is_banned == prohibit && formats.equals(ctx._source.banned_formats)) {
+    ctx.op = 'noop';
+} else {
+    ctx._source.is_banned = prohibit;
+    ctx._source.banned_formats = formats;
+}
+"""
+
+
+def carregar_ban_lists(path=BAN_LISTS_PATH, formats=None):
     """
-    Marca els Pokémon de la llista com a prohibits en competitivo.
+    Llegeix les llistes de prohibits per format.
+
+    Args:
+        path: Fitxer JSON amb les llistes
+        formats: Formats a aplicar (None = tots)
+
+    Returns:
+        Diccionari {format: {"version", "descripcio", "pokemon": {id: nom}}}
+    """
+    with open(path, encoding="utf-8") as f:
+        ban_lists = json.load(f)
+
+    if formats:
+        desconeguts = set(formats) - set(ban_lists)
+        if desconeguts:
+            raise ValueError(f"Formats desconeguts: {', '.join(sorted(desconeguts))}")
+        ban_lists = {nom: ban_lists[nom] for nom in formats}
+
+    return ban_lists
+
+
+def versions_ban_lists(ban_lists):
+    """Retorna {format: versió} per guardar-ho al manifest."""
+    return {nom: llista["version"] for nom, llista in ban_lists.items()}
+
+
+def marcar_pokemon_prohibits(formats=None, format_principal=FORMAT_PRINCIPAL):
+    """
+    Aplica les llistes de prohibits de tots els formats en una sola petició.
     """
     print("--- MARCANT POKÉMON PROHIBITS EN COMPETITIVO ---\n")
-    
-    # Primer, marquem tots els Pokémon com a no prohibits
-    print("1. Marcant tots els Pokémon com a NO prohibits...")
-    query_reset = {
+
+    try:
+        ban_lists = carregar_ban_lists(formats=formats)
+    except (OSError, ValueError) as e:
+        print(f"✗ No s'han pogut llegir les llistes de prohibits: {e}")
+        return False
+
+    if format_principal not in ban_lists:
+        print(f"✗ El format principal '{format_principal}' no és entre els formats aplicats")
+        return False
+
+    for nom, llista in ban_lists.items():
+        marca = " (principal → is_banned)" if nom == format_principal else ""
+        print(f"  • {nom.upper()} v{llista['version']}: {len(llista['pokemon'])} Pokémon prohibits{marca}")
+
+    query = {
         "script": {
-            "source": "ctx._source.is_banned = false",
-            "lang": "painless"
+            "source": SCRIPT_MARCAR,
+            "lang": "painless",
+            "params": {
+                "ban_lists": {nom: list(llista["pokemon"]) for nom, llista in ban_lists.items()},
+                "format_principal": format_principal
+            }
         },
         "query": {
             "match_all": {}
         }
     }
-    
+
+    # refresh=true: els canvis són visibles en acabar, sense haver d'esperar
     try:
         response = requests.post(
-            f"{ELASTIC_URL}/{INDEX_NAME}/_update_by_query",
-            json=query_reset,
+            f"{ELASTIC_URL}/{INDEX_NAME}/_update_by_query?refresh=true&conflicts=proceed",
+            json=query,
             headers={"Content-Type": "application/json"}
         )
-        if response.status_code == 200:
-            total = response.json().get('updated', 0)
-            print(f"✓ {total} Pokémon marcats com a NO prohibits\n")
-        else:
-            print(f"⚠ Error al resetear: {response.status_code}")
-    except Exception as e:
-        print(f"✗ Error al resetear: {e}\n")
-    
-    # Ara marquem els prohibits
-    print(f"2. Marcant {len(pokemon_ids_prohibits)} Pokémon com a PROHIBITS...")
-    
-    # Comptadors per al resum final
-    marcats_exitosament = 0
-    no_trobats = 0
-    errors = 0
-    
-    for pokemon_id in pokemon_ids_prohibits:
-        try:
-            # Primer obtenim el Pokémon per veure si existeix
-            response_get = requests.get(f"{ELASTIC_URL}/{INDEX_NAME}/_doc/{pokemon_id}")
-            
-            if response_get.status_code == 200:
-                pokemon_data = response_get.json()['_source']
-                pokemon_name = pokemon_data.get('name', 'N/A').capitalize()
-                
-                # Actualitzem el camp is_banned
-                update_data = {
-                    "doc": {
-                        "is_banned": True
-                    }
-                }
-                
-                response_update = requests.post(
-                    f"{ELASTIC_URL}/{INDEX_NAME}/_update/{pokemon_id}",
-                    json=update_data,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response_update.status_code == 200:
-                    print(f"  ✓ {pokemon_name} (ID: {pokemon_id}) marcat com a PROHIBIT")
-                    marcats_exitosament += 1
-                else:
-                    print(f"  ✗ Error actualitzant {pokemon_name} (ID: {pokemon_id}): {response_update.status_code}")
-                    errors += 1
-            else:
-                print(f"  ⚠ Pokémon ID {pokemon_id} no trobat a la base de dades")
-                no_trobats += 1
-        
-        except Exception as e:
-            print(f"  ✗ Error processant Pokémon ID {pokemon_id}: {e}")
-            errors += 1
-    
-    # Mostrem un resum clar
+    except requests.exceptions.RequestException as e:
+        print(f"\n✗ Error connectant amb Elasticsearch: {e}")
+        return False
+
+    if response.status_code != 200:
+        print(f"\n✗ Error aplicant les llistes: {response.status_code} - {response.text[:200]}")
+        return False
+
+    resultat = response.json()
     print(f"\n--- PROCÉS FINALITZAT ---")
-    print(f"✓ Pokémon prohibits marcats exitosament: {marcats_exitosament}")
-    if no_trobats > 0:
-        print(f"⚠ Pokémon no trobats a la BD: {no_trobats}")
-    if errors > 0:
-        print(f"✗ Errors durant el procés: {errors}")
-    
-    # Esperem una mica perquè Elasticsearch indexi els canvis
-    time.sleep(1)
-    
-    # Verificació final: comptem quants hi ha realment a la BD
+    print(f"✓ Pokémon revisats: {resultat.get('total', 0)}")
+    print(f"✓ Pokémon actualitzats: {resultat.get('updated', 0)} | Sense canvis: {resultat.get('noops', 0)}")
+    if resultat.get("failures"):
+        print(f"✗ Errors durant el procés: {len(resultat['failures'])}")
+
+    # Verificació final: quants n'hi ha de prohibits per format
     try:
         response_count = requests.get(f"{ELASTIC_URL}/{INDEX_NAME}/_search", json={
-            "query": {"term": {"is_banned": True}},
-            "size": 0
+            "size": 0,
+            "aggs": {
+                "principal": {"filter": {"term": {"is_banned": True}}},
+                "per_format": {"terms": {"field": "banned_formats", "size": 50}}
+            }
         })
         if response_count.status_code == 200:
-            total_banned_bd = response_count.json()['hits']['total']['value']
-            print(f"✓ Total de Pokémon prohibits a la BD: {total_banned_bd}")
-    except:
+            aggs = response_count.json()["aggregations"]
+            print(f"✓ Total de Pokémon prohibits ({format_principal.upper()}) a la BD: {aggs['principal']['doc_count']}")
+            for bucket in aggs["per_format"]["buckets"]:
+                print(f"  - {bucket['key'].upper()}: {bucket['doc_count']}")
+    except (requests.exceptions.RequestException, KeyError, ValueError):
         pass
 
-if __name__ == "__main__":
-    marcar_pokemon_prohibits()
+    # Les versions dels formats no aplicats en aquest run es conserven al manifest
+    manifest = RunManifest("ban_lists")
+    versions = {**manifest.dades.get("versions", {}), **versions_ban_lists(ban_lists)}
+    if resultat.get("failures"):
+        # Sense 'completar': la propera ingesta completa tornarà a aplicar les llistes
+        manifest.fallar(errors=len(resultat["failures"]))
+        return False
+
+    resum = {}
+    if formats and set(ban_lists) != set(carregar_ban_lists()):
+        # Un run parcial no marca els Pokémon nous amb els altres formats: es manté
+        # la data de l'últim marcatge complet per a cal_marcar_prohibits()
+        resum["finished_at"] = manifest.dades.get("finished_at", "")
+    manifest.completar(
+        versions=versions,
+        format_principal=format_principal,
+        actualitzats=resultat.get("updated", 0),
+        **resum
+    )
+    return True
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Marca els Pokémon prohibits per format")
+    parser.add_argument("--formats", nargs="+", help="Formats a aplicar (per defecte tots els de ban_lists.json)")
+    parser.add_argument("--principal", default=FORMAT_PRINCIPAL, help="Format que determina is_banned (per defecte vgc)")
+    args = parser.parse_args()
+
+    return 0 if marcar_pokemon_prohibits(args.formats, args.principal) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
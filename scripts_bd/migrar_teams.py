@@ -0,0 +1,128 @@
+"""
+Migració de l'índex 'teams' per a la paginació per cursor.
+
+Els llistats d'equips (GET /api/v1/teams/user/{user_id}) s'ordenen per
+`updated_at` i desempaten per `team_id`, que ha de ser `keyword`. Els índexs
+creats abans d'afegir aquests camps a `crear-indexs.json` no els tenen al
+mapping (i el mapping dinàmic faria `team_id` de tipus `text`, que no es pot
+ordenar), i els equips antics no tenen `team_id`. Aquest script:
+
+1. Afegeix al mapping els camps d'ordenació que falten (`team_id` keyword,
+   `created_at` i `updated_at` date).
+2. Si `team_id` ja existeix però no és `keyword`, reconstrueix l'índex amb
+   el mapping correcte (via un índex temporal i `_reindex`).
+3. Omple el `team_id` dels equips que no en tenen amb l'ID del document
+   (un sol `_update_by_query`).
+
+És idempotent: si el mapping ja és correcte i tots els equips tenen
+`team_id`, no canvia res.
+
+Ús:
+    python migrar_teams.py
+"""
+import sys
+
+import requests
+
+ELASTIC_URL = "http://localhost:9200"
+INDEX_NAME = "teams"
+INDEX_TEMPORAL = f"{INDEX_NAME}_migracio"
+
+# Camps que necessita l'ordenació dels llistats (TEAMS_SORT del backend)
+CAMPS_ORDENACIO = {
+    "team_id": {"type": "keyword"},
+    "created_at": {"type": "date"},
+    "updated_at": {"type": "date"}
+}
+
+# Els equips sense team_id fan servir l'ID del document (el mateix que retorna l'API)
+SCRIPT_TEAM_ID = """
+if (ctx._source.team_id == null) {
+    ctx._source.team_id = ctx._id;
+} else {
+    ctx.op = 'noop';
+}
+"""
+
+
+def llegir_mapping():
+    """Retorna el mapping de l'índex, o None si l'índex no existeix."""
+    response = requests.get(f"{ELASTIC_URL}/{INDEX_NAME}/_mapping")
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return next(iter(response.json().values()))["mappings"]
+
+
+def reconstruir_index(mapping):
+    """
+    Torna a crear l'índex amb els camps d'ordenació corregits, copiant els
+    documents a un índex temporal i de tornada.
+    """
+    mapping = {**mapping, "properties": {**mapping.get("properties", {}), **CAMPS_ORDENACIO}}
+
+    def copiar(origen, desti):
+        response = requests.post(f"{ELASTIC_URL}/_reindex?refresh=true", json={
+            "source": {"index": origen},
+            "dest": {"index": desti}
+        })
+        response.raise_for_status()
+        if response.json().get("failures"):
+            raise RuntimeError(f"Errors copiant {origen} → {desti}: {response.json()['failures'][:3]}")
+
+    requests.delete(f"{ELASTIC_URL}/{INDEX_TEMPORAL}")
+    requests.put(f"{ELASTIC_URL}/{INDEX_TEMPORAL}", json={"mappings": mapping}).raise_for_status()
+    copiar(INDEX_NAME, INDEX_TEMPORAL)
+
+    requests.delete(f"{ELASTIC_URL}/{INDEX_NAME}").raise_for_status()
+    requests.put(f"{ELASTIC_URL}/{INDEX_NAME}", json={"mappings": mapping}).raise_for_status()
+    copiar(INDEX_TEMPORAL, INDEX_NAME)
+    requests.delete(f"{ELASTIC_URL}/{INDEX_TEMPORAL}")
+
+
+def migrar_teams():
+    print("--- MIGRACIÓ DE L'ÍNDEX 'teams' (camps d'ordenació) ---\n")
+
+    try:
+        mapping = llegir_mapping()
+        if mapping is None:
+            print("✓ L'índex 'teams' no existeix: es crearà amb el mapping de crear-indexs.json")
+            return True
+
+        propietats = mapping.get("properties", {})
+        tipus_team_id = propietats.get("team_id", {}).get("type")
+
+        if tipus_team_id not in (None, "keyword"):
+            print(f"⚠ 'team_id' és de tipus '{tipus_team_id}' (no es pot ordenar): es reconstrueix l'índex")
+            reconstruir_index(mapping)
+            print("✓ Índex reconstruït amb 'team_id' keyword")
+        else:
+            falten = {camp: definicio for camp, definicio in CAMPS_ORDENACIO.items() if camp not in propietats}
+            if falten:
+                requests.put(f"{ELASTIC_URL}/{INDEX_NAME}/_mapping", json={"properties": falten}).raise_for_status()
+                print(f"✓ Camps afegits al mapping: {', '.join(falten)}")
+            else:
+                print("✓ El mapping ja té els camps d'ordenació")
+
+        response = requests.post(
+            f"{ELASTIC_URL}/{INDEX_NAME}/_update_by_query?refresh=true&conflicts=proceed",
+            json={
+                "script": {"source": SCRIPT_TEAM_ID, "lang": "painless"},
+                "query": {"bool": {"must_not": {"exists": {"field": "team_id"}}}}
+            }
+        )
+        response.raise_for_status()
+    except (requests.exceptions.RequestException, RuntimeError) as e:
+        print(f"✗ Error migrant l'índex 'teams': {e}")
+        return False
+
+    resultat = response.json()
+    print(f"✓ Equips amb team_id nou: {resultat.get('updated', 0)}")
+    if resultat.get("failures"):
+        print(f"✗ Errors durant el procés: {len(resultat['failures'])}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if migrar_teams() else 1)
@@ -0,0 +1,199 @@
+"""
+Memòria cau local de respostes de PokéAPI
+=========================================
+
+Els scripts d'ingesta llegeixen PokéAPI a través d'aquest mòdul en lloc de
+cridar `requests.get` directament. Les respostes es guarden en una base de
+dades SQLite:
+
+- `blobs`: el cos de cada resposta, adreçat pel seu hash SHA-256
+  (respostes idèntiques només es guarden una vegada).
+- `responses`: una fila per URL amb el hash del cos, l'ETag, el
+  Last-Modified i el moment de la descàrrega.
+
+Mentre una entrada és fresca (`POKEAPI_CACHE_TTL`) es serveix sense xarxa.
+Quan caduca, es revalida amb `If-None-Match` / `If-Modified-Since` i un
+`304` reaprofita el cos guardat.
+
+Variables d'entorn:
+    POKEAPI_CACHE_PATH: Fitxer SQLite (per defecte `scripts_bd/.cache/pokeapi.sqlite`)
+    POKEAPI_CACHE_TTL: Segons que una resposta es considera fresca (per defecte 7 dies)
+    POKEAPI_OFFLINE: Si val "1", només es reprodueix la memòria cau (sense xarxa).
+                     Les URL no gravades retornen status 504.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import requests
+
+CACHE_PATH = os.environ.get(
+    "POKEAPI_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "pokeapi.sqlite")
+)
+CACHE_TTL = float(os.environ.get("POKEAPI_CACHE_TTL", 7 * 24 * 3600))
+OFFLINE = os.environ.get("POKEAPI_OFFLINE", "0") == "1"
+
+
+class CachedResponse:
+    """
+    Resposta mínima compatible amb l'ús que en fan els scripts
+    (`status_code`, `json()`, `text`).
+    """
+
+    def __init__(self, status_code: int, content: bytes, from_cache: bool):
+        self.status_code = status_code
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class PokeAPICache:
+    """
+    Memòria cau de respostes HTTP de PokéAPI guardada en SQLite.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL, offline: bool = OFFLINE):
+        """
+        Args:
+            path: Fitxer SQLite de la memòria cau
+            ttl: Segons durant els quals no cal revalidar una resposta
+            offline: Si és True, mai es fa cap petició de xarxa
+        """
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self._session = requests.Session()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Diversos scripts poden compartir el fitxer alhora (WAL + timeout)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL REFERENCES blobs(hash),
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            );
+        """)
+
+        # Estadístiques del run
+        self.hits = 0
+        self.revalidats = 0
+        self.descarregats = 0
+        self.no_trobats_offline = 0
+        self.ultima_de_xarxa = False
+
+    def get(self, url: str) -> CachedResponse:
+        """
+        Retorna la resposta d'una URL, llegint de la memòria cau si es pot.
+        """
+        self.ultima_de_xarxa = False
+        fila = self._db.execute(
+            "SELECT r.etag, r.last_modified, r.fetched_at, b.body "
+            "FROM responses r JOIN blobs b ON b.hash = r.hash WHERE r.url = ?",
+            (url,)
+        ).fetchone()
+
+        if fila is not None:
+            etag, last_modified, fetched_at, body = fila
+            if self.offline or time.time() - fetched_at < self.ttl:
+                self.hits += 1
+                return CachedResponse(200, body, from_cache=True)
+        elif self.offline:
+            self.no_trobats_offline += 1
+            return CachedResponse(504, b"", from_cache=True)
+
+        # Cal anar a la xarxa (entrada inexistent o caducada)
+        headers = {}
+        if fila is not None:
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        self.ultima_de_xarxa = True
+        try:
+            resposta = self._session.get(url, headers=headers)
+        except requests.exceptions.RequestException:
+            if fila is not None:
+                # Sense xarxa però amb còpia antiga: millor això que res
+                self.hits += 1
+                return CachedResponse(200, fila[3], from_cache=True)
+            raise
+
+        if resposta.status_code == 304 and fila is not None:
+            self.revalidats += 1
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+            return CachedResponse(200, fila[3], from_cache=True)
+
+        if resposta.status_code == 200:
+            self.descarregats += 1
+            self._guardar(url, resposta)
+
+        return CachedResponse(resposta.status_code, resposta.content, from_cache=False)
+
+    def resum(self):
+        """Mostra l'ús de la memòria cau durant el run."""
+        mode = " (OFFLINE)" if self.offline else ""
+        print(f"\n--- RESUM CACHE POKÉAPI{mode} ---")
+        print(f"  Hits: {self.hits} | Revalidats (304): {self.revalidats} | Descarregats: {self.descarregats}")
+        if self.no_trobats_offline:
+            print(f"⚠ URL no gravades a la memòria cau: {self.no_trobats_offline}")
+
+    def _guardar(self, url: str, resposta):
+        body = resposta.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        with self._db:
+            self._db.execute("INSERT OR IGNORE INTO blobs (hash, body) VALUES (?, ?)", (body_hash, body))
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, hash, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, body_hash, resposta.headers.get("ETag"), resposta.headers.get("Last-Modified"), time.time())
+            )
+
+
+# --- Instància compartida pels scripts ---
+_cache = None
+
+
+def _instancia() -> PokeAPICache:
+    global _cache
+    if _cache is None:
+        _cache = PokeAPICache()
+    return _cache
+
+
+def pokeapi_get(url: str) -> CachedResponse:
+    """Substitut de `requests.get` per a les URL de PokéAPI."""
+    return _instancia().get(url)
+
+
+def esperar_si_cal(segons: float):
+    """
+    Espera entre peticions per no saturar PokéAPI, però només si l'última
+    petició ha anat realment a la xarxa.
+    """
+    if _cache is not None and _cache.ultima_de_xarxa:
+        time.sleep(segons)
+
+
+def resum_cache():
+    """Mostra el resum de la memòria cau si s'ha fet servir."""
+    if _cache is not None:
+        _cache.resum()
@@ -0,0 +1,106 @@
+"""
+Manifest d'execució dels scripts d'ingesta
+==========================================
+
+Cada script d'ingesta guarda el seu progrés a `.cache/manifests/<index>.json`.
+Si un run s'interromp, el següent el reprèn des de l'últim checkpoint en
+lloc de tornar a començar des de l'ID 1.
+
+Un checkpoint només s'ha de guardar després de `BulkWriter.flush()`, de
+manera que tots els documents anteriors ja estiguin confirmats per
+Elasticsearch, i només si el writer no ha tingut errors: un checkpoint mai
+ha de saltar-se documents fallits.
+"""
+import json
+import os
+from datetime import datetime
+
+MANIFEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "manifests")
+
+# Cada quants elements processats es guarda un checkpoint
+CHECKPOINT_CADA = 100
+
+ESTAT_EN_CURS = "en_curs"
+ESTAT_COMPLETAT = "completat"
+
+
+class RunManifest:
+    """
+    Estat persistent d'un run d'ingesta (en curs / completat i checkpoint).
+    """
+
+    def __init__(self, nom: str, directori: str = MANIFEST_DIR):
+        """
+        Args:
+            nom: Nom del manifest (normalment el nom de l'índex)
+            directori: Carpeta on es guarden els manifests
+        """
+        self.nom = nom
+        self.path = os.path.join(directori, f"{nom}.json")
+        self.dades = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.dades = json.load(f)
+            except (OSError, ValueError):
+                # Un manifest corrupte equival a no tenir-ne
+                self.dades = {}
+
+    @property
+    def en_curs(self) -> bool:
+        """True si l'últim run es va interrompre abans d'acabar."""
+        return self.dades.get("status") == ESTAT_EN_CURS
+
+    @property
+    def checkpoint(self):
+        return self.dades.get("checkpoint")
+
+    def iniciar(self):
+        """
+        Marca l'inici d'un run. Si l'anterior estava a mitges, el reprèn.
+
+        Returns:
+            L'últim checkpoint guardat, o None si es comença de zero.
+        """
+        if self.en_curs and self.checkpoint is not None:
+            print(f"↻ Reprenent el run interromput de '{self.nom}' des del checkpoint {self.checkpoint}")
+            return self.checkpoint
+
+        self.dades = {
+            "status": ESTAT_EN_CURS,
+            "checkpoint": None,
+            "started_at": datetime.now().isoformat()
+        }
+        self._guardar()
+        return None
+
+    def guardar_checkpoint(self, valor):
+        """Guarda fins on s'ha processat (i confirmat) el run actual."""
+        self.dades["checkpoint"] = valor
+        self.dades["updated_at"] = datetime.now().isoformat()
+        self._guardar()
+
+    def completar(self, **resum):
+        """Marca el run com a completat i hi afegeix un resum opcional."""
+        self.dades["status"] = ESTAT_COMPLETAT
+        self.dades["finished_at"] = datetime.now().isoformat()
+        self.dades.update(resum)
+        self._guardar()
+
+    def fallar(self, **resum):
+        """
+        Tanca un run amb documents fallits: queda en curs, de manera que el
+        següent es reprèn des de l'últim checkpoint (anterior als errors).
+        """
+        self.dades["failed_at"] = datetime.now().isoformat()
+        self.dades.update(resum)
+        self._guardar()
+
+    def _guardar(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Escriptura atòmica: mai deixem un manifest a mitges
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.dades, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,185 @@
+"""
+Tests de l'escriptor Bulk dels scripts d'ingesta
+================================================
+
+Els lots es tanquen per nombre de documents o per bytes, els errors
+reintentables (429 i 5xx) es tornen a enviar i els altres es recullen per
+document. Amb skip_unchanged, els documents amb el mateix content_hash no
+es tornen a escriure. Sense Elasticsearch: la sessió HTTP és un doble que respon com
+l'API _bulk.
+
+Ús:
+    python3 -m pytest -q scripts_bd/test_bulk_writer.py
+"""
+
+import sys
+import os
+import json
+import threading
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import requests
+
+from bulk_writer import BulkWriter, content_hash
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.text = json.dumps(self._data)
+
+    def json(self):
+        return self._data
+
+
+class FakeBulkSession:
+    """
+    Sessió que respon a /_bulk. `status_for(doc_id, intent)` decideix el
+    status de cada document; `request_errors` són els status (o excepcions)
+    de les primeres peticions senceres.
+    """
+
+    def __init__(self, status_for=None, request_errors=()):
+        self.status_for = status_for or (lambda doc_id, intent: 201)
+        self.request_errors = list(request_errors)
+        self.lots = []          # IDs de cada petició rebuda
+        self.intents = {}       # doc_id → vegades que s'ha enviat
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, headers=None):
+        assert url.endswith("/_bulk")
+        linies = data.decode("utf-8").splitlines()
+        ids = [next(iter(json.loads(accio).values()))["_id"] for accio in linies[::2]]
+        with self._lock:
+            self.lots.append(ids)
+            if self.request_errors:
+                error = self.request_errors.pop(0)
+                if isinstance(error, Exception):
+                    raise error
+                return FakeResponse(error, {"error": "no disponible"})
+            items = []
+            for doc_id in ids:
+                self.intents[doc_id] = self.intents.get(doc_id, 0) + 1
+                status = self.status_for(doc_id, self.intents[doc_id])
+                info = {"_id": doc_id, "status": status}
+                if status >= 300:
+                    info["error"] = {"type": f"error_{status}"}
+                items.append({"index": info})
+        return FakeResponse(200, {"items": items})
+
+
+class FakeScrollSession(FakeBulkSession):
+    """Sessió _bulk que a més retorna els content_hash existents amb scroll (un per pàgina)."""
+
+    def __init__(self, hashes):
+        super().__init__()
+        self.pages = [[{"_id": doc_id, "_source": {"content_hash": value}}] for doc_id, value in hashes.items()]
+        self.scroll_closed = False
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        if "_search" not in url:
+            return super().post(url, data, headers)
+        hits = self.pages.pop(0) if self.pages else []
+        return FakeResponse(200, {"_scroll_id": "scroll", "hits": {"hits": hits}})
+
+    def delete(self, url, **kwargs):
+        self.scroll_closed = True
+
+
+def writer_with(session, **kwargs):
+    kwargs.setdefault("retry_backoff", 0)
+    writer = BulkWriter("http://es:9200", "prova", **kwargs)
+    writer._session = lambda: session
+    return writer
+
+
+def test_batches_by_document_count():
+    session = FakeBulkSession()
+    with writer_with(session, max_docs=3, max_in_flight=1) as writer:
+        for doc_id in range(7):
+            writer.index(doc_id, {"n": doc_id})
+
+    assert [len(lot) for lot in session.lots] == [3, 3, 1]
+    assert sorted(int(doc_id) for lot in session.lots for doc_id in lot) == list(range(7))
+    assert writer.indexats == 7 and writer.lots_enviats == 3 and writer.errors == []
+
+
+def test_batches_by_bytes():
+    session = FakeBulkSession()
+    document = {"text": "x" * 100}
+    accio = {"index": {"_index": "prova", "_id": "0"}}
+    mida = len(json.dumps(accio) + "\n" + json.dumps({**document, "content_hash": content_hash(document)}) + "\n")
+
+    # Hi caben dos documents per lot, però no tres
+    with writer_with(session, max_docs=1000, max_bytes=int(mida * 2.5), max_in_flight=1) as writer:
+        for doc_id in range(5):
+            writer.index(doc_id, document)
+
+    assert [len(lot) for lot in session.lots] == [2, 2, 1]
+    assert writer.bytes_enviats == 5 * mida and writer.indexats == 5
+
+
+def test_retries_rejected_documents():
+    # El document 1 es rebutja amb 429 dues vegades i el 2 falla amb un error definitiu
+    def status_for(doc_id, intent):
+        if doc_id == "1" and intent <= 2:
+            return 429
+        return 400 if doc_id == "2" else 201
+
+    session = FakeBulkSession(status_for)
+    with writer_with(session, max_retries=3) as writer:
+        for doc_id in range(4):
+            writer.index(doc_id, {"n": doc_id})
+
+    # Només es tornen a enviar els rebutjats
+    assert session.lots == [["0", "1", "2", "3"], ["1"], ["1"]]
+    assert writer.indexats == 3 and writer.reintents == 2
+    assert [(error["_id"], error["status"]) for error in writer.errors] == [("2", 400)]
+
+
+def test_retries_whole_request_on_5xx_and_network_errors():
+    session = FakeBulkSession(request_errors=[503, requests.exceptions.ConnectionError("caigut")])
+    with writer_with(session) as writer:
+        writer.index(1, {"n": 1})
+
+    assert session.lots == [["1"], ["1"], ["1"]]
+    assert writer.indexats == 1 and writer.reintents == 2 and writer.errors == []
+
+
+def test_gives_up_after_max_retries():
+    session = FakeBulkSession(lambda doc_id, intent: 429)
+    with writer_with(session, max_retries=2) as writer:
+        writer.index(1, {"n": 1})
+        writer.update(2, {"n": 2})
+
+    assert len(session.lots) == 3 and writer.indexats == 0
+    assert sorted((error["_id"], error["status"]) for error in writer.errors) == [("1", 429), ("2", 429)]
+
+    session = FakeBulkSession(request_errors=[500])
+    with writer_with(session, max_retries=2) as writer:
+        writer.index(1, {"n": 1})
+    # 500 no és reintentable: es registra a la primera
+    assert len(session.lots) == 1 and writer.errors[0]["status"] == 500
+
+
+def test_content_hash_ignores_key_order_and_itself():
+    document = {"name": "pikachu", "stats": {"hp": 35, "speed": 90}}
+    same = {"stats": {"speed": 90, "hp": 35}, "name": "pikachu"}
+    assert content_hash(document) == content_hash(same)
+    assert content_hash({**document, "content_hash": "antic"}) == content_hash(document)
+    assert content_hash({**document, "name": "raichu"}) != content_hash(document)
+
+
+def test_skip_unchanged_only_writes_changed_documents():
+    unchanged = {"name": "bulbasaur"}
+    session = FakeScrollSession({"1": content_hash(unchanged), "2": content_hash({"name": "antic"})})
+    with writer_with(session, skip_unchanged=True) as writer:
+        writer.index(1, unchanged)
+        writer.index(2, {"name": "ivysaur"})
+        writer.update(3, {"name": "venusaur"})
+
+    assert session.lots == [["2", "3"]] and session.scroll_closed
+    assert writer.sense_canvis == 1 and writer.indexats == 2
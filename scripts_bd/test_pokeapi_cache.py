@@ -0,0 +1,121 @@
+"""
+Tests de la memòria cau de PokéAPI
+==================================
+
+Una resposta fresca es serveix sense xarxa, una de caducada es revalida
+amb l'ETag (un 304 reaprofita el cos guardat) i en mode offline només es
+reprodueix el que ja s'ha gravat. Sense xarxa: la sessió HTTP és un doble
+i la base de dades SQLite és temporal.
+
+Ús:
+    python3 -m pytest -q scripts_bd/test_pokeapi_cache.py
+"""
+
+import sys
+import os
+import json
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import requests
+
+from pokeapi_cache import PokeAPICache
+
+URL = "https://pokeapi.co/api/v2/type/10"
+BODY = json.dumps({"name": "fire"}).encode("utf-8")
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Sessió que retorna les respostes indicades i guarda les capçaleres rebudes."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append((url, headers or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def cache_with(tmp_path, *responses, **kwargs):
+    cache = PokeAPICache(path=str(tmp_path / "pokeapi.sqlite"), **kwargs)
+    cache._session = FakeSession(*responses)
+    return cache
+
+
+def test_fresh_response_is_served_from_cache(tmp_path):
+    cache = cache_with(tmp_path, FakeResponse(200, BODY, {"ETag": '"v1"'}))
+
+    first = cache.get(URL)
+    assert first.status_code == 200 and not first.from_cache and cache.ultima_de_xarxa
+    second = cache.get(URL)
+    assert second.json() == {"name": "fire"} and second.from_cache and not cache.ultima_de_xarxa
+
+    assert len(cache._session.requests) == 1
+    assert (cache.descarregats, cache.hits) == (1, 1)
+
+
+def test_stale_response_is_revalidated(tmp_path):
+    cache = cache_with(
+        tmp_path,
+        FakeResponse(200, BODY, {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        FakeResponse(304),
+        FakeResponse(200, b'{"name": "fire", "id": 10}', {"ETag": '"v2"'}),
+        ttl=0
+    )
+
+    cache.get(URL)
+    revalidated = cache.get(URL)
+    _, headers = cache._session.requests[1]
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert revalidated.status_code == 200 and revalidated.content == BODY and cache.revalidats == 1
+
+    # Contingut nou: es guarda i la següent revalidació envia el nou ETag
+    assert cache.get(URL).json() == {"name": "fire", "id": 10}
+    cache._session.responses.append(FakeResponse(304))
+    cache.get(URL)
+    assert cache._session.requests[-1][1]["If-None-Match"] == '"v2"'
+
+
+def test_network_error_serves_the_stale_copy(tmp_path):
+    cache = cache_with(tmp_path, FakeResponse(200, BODY), requests.exceptions.ConnectionError("sense xarxa"), ttl=0)
+    cache.get(URL)
+    assert cache.get(URL).content == BODY
+
+    # Sense còpia, l'error de xarxa es propaga
+    cache._session.responses.append(requests.exceptions.ConnectionError("sense xarxa"))
+    try:
+        cache.get(URL + "/altre")
+    except requests.exceptions.ConnectionError:
+        pass
+    else:
+        raise AssertionError("S'ha inventat una resposta sense còpia ni xarxa")
+
+
+def test_offline_only_replays_recorded_urls(tmp_path):
+    cache_with(tmp_path, FakeResponse(200, BODY)).get(URL)
+
+    offline = cache_with(tmp_path, offline=True, ttl=0)
+    assert offline.get(URL).content == BODY
+    missing = offline.get(URL + "/altre")
+    assert missing.status_code == 504 and offline.no_trobats_offline == 1
+    assert offline._session.requests == []
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = cache_with(tmp_path, FakeResponse(200, BODY), FakeResponse(200, BODY))
+    cache.get(URL)
+    cache.get(URL + "?alias")
+    assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 2
+    assert cache._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
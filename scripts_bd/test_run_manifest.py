@@ -0,0 +1,59 @@
+"""
+Tests del manifest d'execució dels scripts d'ingesta
+====================================================
+
+Un run interromput o amb documents fallits es reprèn des de l'últim
+checkpoint; un run completat torna a començar de zero. Els manifests es
+guarden en una carpeta temporal.
+
+Ús:
+    python3 -m pytest -q scripts_bd/test_run_manifest.py
+"""
+
+import sys
+import os
+
+# Afegir el directori actual al path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from run_manifest import ESTAT_COMPLETAT, RunManifest
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    manifest = RunManifest("pokemon", str(tmp_path))
+    assert manifest.iniciar() is None
+    manifest.guardar_checkpoint(200)
+
+    # El procés s'atura aquí: el següent run continua des del checkpoint
+    resumed = RunManifest("pokemon", str(tmp_path))
+    assert resumed.en_curs and resumed.iniciar() == 200
+
+
+def test_completed_run_starts_from_scratch(tmp_path):
+    manifest = RunManifest("moves", str(tmp_path))
+    manifest.iniciar()
+    manifest.guardar_checkpoint(100)
+    manifest.completar(indexats=150, errors=0)
+
+    again = RunManifest("moves", str(tmp_path))
+    assert again.dades["status"] == ESTAT_COMPLETAT and again.dades["indexats"] == 150
+    assert not again.en_curs and again.iniciar() is None
+    assert again.checkpoint is None
+
+
+def test_failed_run_resumes_before_the_errors(tmp_path):
+    manifest = RunManifest("items", str(tmp_path))
+    manifest.iniciar()
+    manifest.guardar_checkpoint(300)
+    manifest.fallar(errors=2)
+
+    failed = RunManifest("items", str(tmp_path))
+    assert failed.en_curs and failed.dades["errors"] == 2 and "failed_at" in failed.dades
+    assert failed.iniciar() == 300
+
+
+def test_corrupt_manifest_is_ignored(tmp_path):
+    (tmp_path / "types.json").write_text("{no és json", encoding="utf-8")
+    manifest = RunManifest("types", str(tmp_path))
+    assert manifest.dades == {} and manifest.iniciar() is None
+    assert not (tmp_path / "types.json.tmp").exists()